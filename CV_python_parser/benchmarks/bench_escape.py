@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Escape benchmark - table-driven escape_latex vs. the legacy chained str.replace version
+Replays a tag/skill-heavy workload where most strings repeat
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from latex_escape import escape_latex, escape_string
+
+
+def legacy_escape(text):
+    """escape_latex as it was before the translation tables (kept as the baseline)"""
+    if not isinstance(text, str):
+        return str(text)
+    if '\\' in text and any(cmd in text for cmd in ['\\textbar{}', '\\textbf{', '\\textcolor{', '\\cvtag{', '\\cvevent{', '\\href{', '\\faExternalLink', '\\faMortarBoard', '\\vspace{', '\\cvsection{', '\\begin{', '\\end{', '\\item', '\\switchcolumn', '\\newpage']):
+        text = text.replace('_', r'\_')
+        text = text.replace('^', r'\^{}')
+        text = text.replace('~', r'\textasciitilde{}')
+        text = text.replace('$', r'\$')
+        text = text.replace('%', r'\%')
+        text = text.replace('#', r'\#')
+        text = text.replace('&', r'\&')
+        return text
+    text = text.replace('\\', r'\textbackslash{}')
+    text = text.replace('{', r'\{')
+    text = text.replace('}', r'\}')
+    text = text.replace('_', r'\_')
+    text = text.replace('^', r'\^{}')
+    text = text.replace('~', r'\textasciitilde{}')
+    text = text.replace('$', r'\$')
+    text = text.replace('#', r'\#')
+    text = text.replace('&', r'\&')
+    text = text.replace('%', r'\%')
+    return text
+
+
+TAGS = ["Python", "Docker", "WebRTC", "TTS", "STT", "ASR", "C++", "CUDA & cuDNN",
+        "TensorRT (INT8/FP8)", "Real-time Linux / Yocto", "R&D", "CI/CD", "k8s_ops"]
+
+HIGHLIGHTS = [
+    "Scaled voice pipeline to \\textbf{400+ concurrent WebRTC streams} (< 200 ms RTT) via Redis cache",
+    "Cut cloud cost by > 50 % while meeting latency SLA on edge_cloud hybrid",
+    "Supervised 8 MSc theses on speech enhancement & LLM-powered dialogue systems",
+]
+
+
+def workload(count: int, unique_fraction: float, unique_pool: int):
+    """Mostly repeated tags with a share of highlights drawn from a larger pool"""
+    rng = random.Random(42)
+    items = []
+    for i in range(count):
+        if rng.random() < unique_fraction:
+            items.append(f"{rng.choice(HIGHLIGHTS)} #{rng.randrange(unique_pool)}")
+        else:
+            items.append(rng.choice(TAGS))
+    return items
+
+
+def time_it(func, items, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark escape_latex")
+    arg_parser.add_argument("--count", type=int, default=200000)
+    arg_parser.add_argument("--unique-fraction", type=float, default=0.1)
+    arg_parser.add_argument("--unique-pool", type=int, default=5000,
+                            help="Distinct highlight strings in the workload")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    items = workload(args.count, args.unique_fraction, args.unique_pool)
+    legacy = time_it(legacy_escape, items, args.repeat)
+    escape_string.cache_clear()
+    cold = time_it(escape_latex, items, 1)
+    warm = time_it(escape_latex, items, args.repeat)
+    print(f"{args.count} strings, {args.unique_fraction:.0%} unique highlights")
+    print(f"legacy str.replace chain : {legacy * 1000:8.1f} ms")
+    print(f"table-driven, cold cache : {cold * 1000:8.1f} ms ({legacy / cold:.2f}x)")
+    print(f"table-driven, warm cache : {warm * 1000:8.1f} ms ({legacy / warm:.2f}x)")
+    print(f"cache: {escape_string.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Inline markup benchmark - tokenizer + IR renderer vs. the legacy re.sub + escape_latex path
+Uses highlight-heavy synthetic input with bold spans, links and special characters
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_escape import legacy_escape
+from inline_markup import render_inline, render_inline_string
+
+
+def legacy_highlight(highlight: str) -> str:
+    """Highlight rendering before the tokenizer (kept as the baseline)"""
+    highlight = re.sub(r'\*\*(.*?)\*\*', r'\\textbf{\1}', highlight)
+    return legacy_escape(highlight)
+
+
+FRAGMENTS = [
+    "Scaled voice pipeline to **{n}+ concurrent WebRTC streams** (< 200 ms RTT)",
+    "cut cloud cost by **> {n} % while meeting SLA** on the edge_cloud hybrid",
+    "shipped `asr_{n}` service & dashboards",
+    "see [design notes](https://example.com/notes_{n}#perf)",
+    "supervised {n} MSc theses on *speech enhancement*",
+]
+
+
+def highlights(count: int, seed: int = 7):
+    """Distinct highlights built from two or three markup fragments each"""
+    rng = random.Random(seed)
+    return ['; '.join(rng.choice(FRAGMENTS).format(n=i + j) for j in range(rng.randint(2, 3)))
+            for i in range(count)]
+
+
+def time_it(func, items, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark highlight markup rendering")
+    arg_parser.add_argument("--count", type=int, default=100000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    items = highlights(args.count)
+    legacy = time_it(legacy_highlight, items, args.repeat)
+    render_inline_string.cache_clear()
+    cold = time_it(render_inline, items, 1)
+    print(f"{args.count} distinct highlights")
+    print(f"legacy re.sub + escape_latex : {legacy * 1000:8.1f} ms")
+    print(f"tokenizer + IR, cold cache   : {cold * 1000:8.1f} ms ({legacy / cold:.2f}x)")
+
+    # Variant runs re-render the same candidate's highlights many times
+    repeated = items[:2000] * (args.count // 2000 or 1)
+    legacy = time_it(legacy_highlight, repeated, args.repeat)
+    warm = time_it(render_inline, repeated, args.repeat)
+    print(f"{len(repeated)} highlights from a 2000-string pool")
+    print(f"legacy re.sub + escape_latex : {legacy * 1000:8.1f} ms")
+    print(f"tokenizer + IR, warm cache   : {warm * 1000:8.1f} ms ({legacy / warm:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
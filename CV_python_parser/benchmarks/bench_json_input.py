@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Input format benchmark - CV_json dictionary files vs. strict JSON and JSON Resume
+Builds large experience sections, writes each in the three input formats and times
+loading them: the scanner for "name = {...}" files, the json module fast path for
+strict JSON, and the json module plus the JSON Resume mapping for resume.json.
+
+    python benchmarks/bench_json_input.py --sizes 100 1000 10000
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_loader import best_of, synthetic_experiences
+from cv_model import build_experiences
+from cv_render import date_range
+from cv_resume import resume_sections
+from dict_scanner import parse_dict_assignment, parse_source
+
+
+def as_json_resume(experiences: dict) -> str:
+    """The experiences as the work section of a JSON Resume, dates in ISO 8601"""
+    work = []
+    for key, entry in experiences.items():
+        start, end = date_range(entry['dates'])
+        item = {'name': entry['company'], 'position': key, 'location': entry['location'],
+                'highlights': entry['highlights'], 'keywords': entry['tags']}
+        if start:
+            item['startDate'] = start
+        if end:
+            item['endDate'] = end
+        work.append(item)
+    return json.dumps({'work': work}, ensure_ascii=False, indent=2)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark loading the CV input formats")
+    arg_parser.add_argument("--sizes", type=int, nargs='+', default=[10, 100, 1000, 5000])
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"{'entries':>8} {'dict bytes':>11} {'scanner ms':>11} {'json bytes':>11} {'json ms':>8} "
+          f"{'speedup':>8} {'resume ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        legacy = synthetic_experiences(size)
+        data = parse_dict_assignment(legacy)[1]
+        strict = json.dumps(data, ensure_ascii=False, indent=2)
+        resume = as_json_resume(data).encode('utf-8')
+        if parse_source(strict)[1] != data:
+            raise SystemExit(f"Strict JSON disagrees with the scanner on {size} entries")
+        if build_experiences(resume_sections(resume)['experiences']) != build_experiences(data):
+            raise SystemExit(f"JSON Resume disagrees with the scanner on {size} entries")
+
+        scanner = best_of(parse_source, legacy, args.repeat)
+        fast = best_of(parse_source, strict, args.repeat)
+        mapped = best_of(resume_sections, resume, args.repeat)
+        print(f"{size:>8} {len(legacy):>11} {scanner * 1000:>11.2f} {len(strict):>11} {fast * 1000:>8.2f} "
+              f"{scanner / fast:>7.2f}x {mapped * 1000:>10.2f} {scanner / mapped:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
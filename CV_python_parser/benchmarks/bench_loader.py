@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Loader benchmark - single-pass scanner vs. the legacy regex + ast.literal_eval loader
+Builds large synthetic CV_json-style files and times both loaders on them
+"""
+
+import argparse
+import ast
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dict_scanner import parse_dict_assignment
+
+
+def legacy_load(content: str):
+    """The loader as it was before the scanner (kept here as the baseline)"""
+    lines = content.split('\n')
+    cleaned_content = '\n'.join(line for line in lines if not line.strip().startswith('#'))
+    cleaned_content = re.sub(r'(\w+)"\s*\n\s*"', r'\1",\n        "', cleaned_content)
+    cleaned_content = re.sub(r'(\w+)"\s*/\s*"(\w+)"', r'\1", "\2"', cleaned_content)
+    cleaned_content = re.sub(r'"([^"]+)"\s*\n\s*"([^"]+)"', r'"\1",\n        "\2"', cleaned_content)
+    match = re.search(r'(\w+)\s*=\s*({.*})', cleaned_content, re.DOTALL)
+    result = ast.literal_eval(match.group(2))
+    for key, value in result.items():
+        if isinstance(value, tuple):
+            result[key] = ''.join(str(item) for item in value)
+    return result
+
+
+def synthetic_experiences(count: int) -> str:
+    """Build an experiences file with count entries in the CV_json style"""
+    lines = ["experiences = {"]
+    for i in range(count):
+        lines.append(f"    # Role number {i}")
+        lines.append(f'    "Senior Engineer {i} (Speech AI)": {{')
+        lines.append(f'        "company":   "Company {i % 97} & Partners",')
+        lines.append(f'        "dates":     "Jan {2000 + i % 25} - Present",')
+        lines.append('        "location":  "Paris, France",')
+        lines.append('        "highlights": [')
+        for j in range(6):
+            lines.append(f'            "Scaled pipeline {j} to **{i * j}+ concurrent streams** '
+                         f'(< 200 ms RTT) → 2× speed-up at 15 % cost.",')
+        lines.append('        ],')
+        lines.append('        "tags": ["Python", "WebRTC", "Docker", "TTS", "STT", "ASR"],')
+        lines.append('    },')
+        lines.append('')
+    lines.append("}")
+    return '\n'.join(lines)
+
+
+def best_of(func, content: str, repeat: int) -> float:
+    """Best wall time of repeat calls"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the CV_json loaders")
+    arg_parser.add_argument("--sizes", type=int, nargs='+', default=[10, 100, 1000, 5000])
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"{'entries':>8} {'bytes':>10} {'legacy ms':>10} {'scanner ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        content = synthetic_experiences(size)
+        if legacy_load(content) != parse_dict_assignment(content)[1]:
+            raise SystemExit(f"Loaders disagree on {size} entries")
+        legacy = best_of(legacy_load, content, args.repeat)
+        scanner = best_of(parse_dict_assignment, content, args.repeat)
+        print(f"{size:>8} {len(content):>10} {legacy * 1000:>10.2f} {scanner * 1000:>11.2f} "
+              f"{legacy / scanner:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Layout corpus - Page-fit predictions against known page counts
+Every corpus entry names a bundle, either a folder or a synthetic_bundle.py
+shape, a layout and optionally a page target to fit. It holds the number of
+pages pdflatex produced for the rendered document, once measured, and the
+outcome the estimator predicted when it was recorded (page count, and the
+spacing chosen and highlights dropped when fitting). Accuracy is reported
+over the measured entries only; the recorded predictions only catch changes
+in the estimator. The script fails on a wrong or changed prediction.
+--record compiles the entries and writes both back into the corpus;
+--record-predictions stores the predictions alone, for machines without TeX.
+
+    python benchmarks/layout_corpus.py
+    python benchmarks/layout_corpus.py --record pdflatex
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cv_compile import DEFAULT_COMPILER, LatexCompiler, job_for, pages_from_log
+from cv_layout import estimate_layout
+from cv_parser_simple import SimpleCVParser
+from cv_plan import load_layout
+from cv_template import load_template_params
+from cv_trace import set_quiet
+from synthetic_bundle import PRESETS, BundleSize, generate_bundle
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "layout_corpus.json"
+# Files the rendered document needs next to it when compiled elsewhere
+TEX_SUPPORT = ('*.cls', '*.sty', '*.bib')
+
+
+def load_corpus(path: Path) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def bundle_dir(entry: Dict[str, Any], base: Path, work: Path) -> Path:
+    """Folder of an entry's bundle: its json_dir, or its synthetic bundle written under work
+
+    "synthetic" is a preset name or the five numbers of a BundleSize, with an optional "seed".
+    """
+    if 'json_dir' in entry:
+        return base / entry['json_dir']
+    shape = entry['synthetic']
+    size = PRESETS[shape] if isinstance(shape, str) else BundleSize(*shape)
+    return generate_bundle(str(work / f"bundle-{entry['name']}"), size, entry.get('seed', 0))
+
+
+def corpus_parser(entry: Dict[str, Any], base: Path, work: Path,
+                  output_file: Optional[Path] = None) -> SimpleCVParser:
+    """Parser loaded with one corpus entry and fitted to its page target; paths are relative to the corpus file"""
+    config = entry.get('template_config')
+    params = load_template_params(str(base / config) if config else None)
+    parser = SimpleCVParser(json_dir=str(bundle_dir(entry, base, work)), use_cache=False,
+                            output_file=str(output_file) if output_file else None, template_params=params,
+                            layout=load_layout(entry.get('layout', 'default')))
+    parser.load_all_data()
+    return parser
+
+
+def predict(entry: Dict[str, Any], base: Path, work: Path) -> Dict[str, Any]:
+    """Page count the estimator predicts, after fitting to the entry's fit_pages if it has one"""
+    parser = corpus_parser(entry, base, work)
+    if 'fit_pages' not in entry:
+        return {'pages': estimate_layout(parser, parser.template_params, parser.spacing, parser.plan).pages}
+    result = parser.fit_to_pages(entry['fit_pages'])
+    return {'pages': result.estimate.pages, 'fits': result.fits, 'spacing': result.spacing_name,
+            'dropped': len(result.dropped)}
+
+
+def record_pages(entry: Dict[str, Any], base: Path, command: str) -> Optional[int]:
+    """Render (fitted to fit_pages if given) and compile one entry, returning the page count pdflatex reported"""
+    with tempfile.TemporaryDirectory(prefix="cvlayout-") as work:
+        work = Path(work)
+        parser = corpus_parser(entry, base, work, work / f"{entry['name']}.tex")
+        if 'fit_pages' in entry:
+            parser.fit_to_pages(entry['fit_pages'])
+        for pattern in TEX_SUPPORT:
+            for support in parser.tex_dir.glob(pattern):
+                shutil.copy(str(support), str(work / support.name))
+        parser.generate_custom_tex()
+        result = LatexCompiler(command, cache_dir=str(work / "cache"), use_format=False).compile(
+            job_for(parser.output_file))
+        if not result.ok:
+            print(f"{entry['name']}: compile failed: {result.error}", file=sys.stderr)
+            return None
+        return pages_from_log(Path(result.log_file).read_text(encoding='utf-8', errors='replace'))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare page-fit predictions with known page counts")
+    arg_parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="Corpus JSON file")
+    arg_parser.add_argument("--record", nargs="?", const=DEFAULT_COMPILER, metavar="COMMAND",
+                            help="Compile every entry and store its page count and prediction "
+                                 "(default compiler: pdflatex)")
+    arg_parser.add_argument("--record-predictions", action="store_true",
+                            help="Store the current predictions without compiling, keeping known page counts")
+    args = arg_parser.parse_args()
+
+    set_quiet()
+    corpus_path = Path(args.corpus)
+    base = corpus_path.resolve().parent
+    corpus = load_corpus(corpus_path)
+
+    with tempfile.TemporaryDirectory(prefix="cvcorpus-") as work:
+        work = Path(work)
+        if args.record or args.record_predictions:
+            for entry in corpus:
+                if args.record:
+                    pages = record_pages(entry, base, args.record)
+                    if pages is None:
+                        return 1
+                    entry['pages'] = pages
+                entry['predicted'] = predict(entry, base, work)
+            with open(corpus_path, 'w', encoding='utf-8') as f:
+                f.write('[\n' + ',\n'.join(f"    {json.dumps(entry)}" for entry in corpus) + '\n]\n')
+
+        measured = mismatches = changed = 0
+        print(f"{'entry':<24} {'layout':<8} {'fit':>4} {'known':>6} {'predicted':>10} {'spacing':>8} {'dropped':>8}")
+        for entry in corpus:
+            predicted = predict(entry, base, work)
+            known = entry.get('pages')
+            problems = []
+            if known is not None:
+                measured += 1
+                if predicted['pages'] != known:
+                    mismatches += 1
+                    problems.append('MISMATCH')
+            if predicted != entry.get('predicted', predicted):
+                changed += 1
+                problems.append(f"CHANGED (recorded {entry['predicted']})")
+            print(f"{entry['name']:<24} {entry.get('layout', 'default'):<8} {entry.get('fit_pages', '-'):>4} "
+                  f"{'?' if known is None else known:>6} {predicted['pages']:>10} {predicted.get('spacing', '-'):>8} "
+                  f"{predicted.get('dropped', '-'):>8}  {' '.join(problems)}".rstrip())
+    # Only compiled page counts say whether the estimator is right; recorded predictions catch changes
+    print(f"{measured - mismatches}/{measured} predictions match the page counts pdflatex produced")
+    if measured < len(corpus):
+        print(f"{len(corpus) - measured} entries have no measured page count yet (--record pdflatex)")
+    print(f"{len(corpus) - changed}/{len(corpus)} predictions unchanged since they were recorded")
+    return 1 if mismatches or changed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark - Per-candidate footprint of the loaded CV data
+Loads many synthetic candidates and measures, with tracemalloc, the memory
+still held once they are all in memory: once as the parsed nested dicts and
+once as the cv_model records the parser keeps. Then measures the peak memory
+of writing one document, with sections streamed (no fragment cache) and with
+sections cached, which holds each of them as one string.
+
+    python benchmarks/memory_footprint.py --preset small --candidates 200
+"""
+
+import argparse
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cv_model import build_section
+from cv_parser_simple import SimpleCVParser
+from cv_trace import set_quiet
+from dict_scanner import parse_dict_assignment
+from inline_markup import render_inline_string
+from latex_escape import escape_string
+from synthetic_bundle import PRESETS, generate_bundle, generate_files
+
+
+def parse_source(content: str) -> Dict[str, Any]:
+    return parse_dict_assignment(content)[1]
+
+
+def retained_bytes(bundles: List[Dict[str, str]], load: Callable[[Dict[str, str]], Any]) -> float:
+    """Bytes per candidate still allocated after loading every bundle with load()"""
+    tracemalloc.start()
+    try:
+        loaded = [load(files) for files in bundles]
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del loaded
+    return current / len(bundles)
+
+
+def measure_footprint(bundles: List[Dict[str, str]]) -> Dict[str, Dict[str, float]]:
+    """Attribute (and "total") -> bytes per candidate as dicts and as records"""
+    results = {}
+    sections = SimpleCVParser.DATA_FILES
+    for attribute, filename in sections + [('total', None)]:
+        chosen = sections if filename is None else [(attribute, filename)]
+        as_dicts = retained_bytes(bundles, lambda files: {
+            name: parse_source(files[source]) for name, source in chosen})
+        as_records = retained_bytes(bundles, lambda files: {
+            name: build_section(name, parse_source(files[source])) for name, source in chosen})
+        results[attribute] = {'dicts': as_dicts, 'records': as_records}
+    return results
+
+
+def write_peak(json_dir: str, work: str, fragment_cache: bool) -> float:
+    """Peak bytes allocated while writing the document of a loaded bundle"""
+    parser = SimpleCVParser(json_dir=json_dir, output_file=f"{work}/cv.tex", cache_dir=f"{work}/cache",
+                            fragment_cache=fragment_cache)
+    parser.load_all_data()
+    # Both runs start with empty memo caches, which fill up while writing
+    escape_string.cache_clear()
+    render_inline_string.cache_clear()
+    tracemalloc.start()
+    try:
+        parser.generate_custom_tex()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare the memory held per candidate by dicts and records")
+    arg_parser.add_argument("--preset", choices=sorted(PRESETS), default='small')
+    arg_parser.add_argument("--candidates", type=int, default=100, help="Candidates held in memory at once")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Seed of the first candidate")
+    args = arg_parser.parse_args()
+
+    set_quiet()
+    # Every candidate gets its own seed, so only the shared vocabulary repeats
+    bundles = [generate_files(PRESETS[args.preset], args.seed + i) for i in range(args.candidates)]
+    results = measure_footprint(bundles)
+
+    print(f"{args.candidates} '{args.preset}' candidates, KiB held per candidate")
+    print(f"{'section':<16} {'dicts':>10} {'records':>10} {'saved':>7}")
+    for attribute, sizes in results.items():
+        saved = 1 - sizes['records'] / sizes['dicts'] if sizes['dicts'] else 0.0
+        print(f"{attribute:<16} {sizes['dicts'] / 1024:>10.1f} {sizes['records'] / 1024:>10.1f} {saved:>6.0%}")
+
+    print(f"\nPeak KiB while writing one '{args.preset}' document")
+    with tempfile.TemporaryDirectory(prefix="cvmemory-") as work:
+        json_dir = str(generate_bundle(f"{work}/bundle", PRESETS[args.preset], args.seed))
+        streamed = write_peak(json_dir, work, fragment_cache=False)
+        cached = write_peak(json_dir, work, fragment_cache=True)
+    print(f"{'streamed':<16} {streamed / 1024:>10.1f}")
+    print(f"{'cached sections':<16} {cached / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite - Times load, escape, format and write stages on synthetic bundles
+Each stage is timed separately with warmup and repeat control; peak memory is
+captured on one extra traced run. Results are written as JSON and can be
+compared against a stored baseline with a regression threshold.
+
+    python benchmarks/run_benchmarks.py --sizes tiny small medium --output results.json
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cv_cache import stream_if_changed
+from cv_pack import compile_pack
+from cv_parser_simple import SimpleCVParser
+from inline_markup import render_inline, render_inline_string
+from latex_escape import escape_latex, escape_string
+from synthetic_bundle import PRESETS, generate_bundle
+
+
+DEFAULT_SIZES = ['tiny', 'small', 'medium']
+DEFAULT_THRESHOLD = 0.25
+MIN_ROUND_SECONDS = 0.02
+# The fastest sample is the least sensitive to noise from other processes
+DEFAULT_METRIC = 'min_ms'
+CALIBRATION_KEY = 'calibration'
+
+
+class StageResult(NamedTuple):
+    """Timings of one stage on one bundle size"""
+    min_ms: float
+    median_ms: float
+    mean_ms: float
+    peak_kib: float
+    samples: int
+
+
+def clear_memo_caches():
+    """Drop the escaping memo caches so every run measures cold escaping"""
+    escape_string.cache_clear()
+    render_inline_string.cache_clear()
+
+
+def measure(func: Callable[[], object], repeat: int, warmup: int,
+            setup: Optional[Callable[[], None]] = None) -> StageResult:
+    """Time func after warmup runs, then trace one more run for peak memory
+
+    Each of the repeat rounds calls func until it has run for at least
+    MIN_ROUND_SECONDS, so sub-millisecond stages get enough samples; every
+    call is timed on its own so that setup stays outside the measurement.
+    """
+    def timed_call() -> float:
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    for _ in range(warmup):
+        timed_call()
+    times = []
+    for _ in range(repeat):
+        spent = 0.0
+        while True:
+            sample = timed_call()
+            times.append(sample)
+            spent += sample
+            if spent >= MIN_ROUND_SECONDS:
+                break
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return StageResult(min(times) * 1000, statistics.median(times) * 1000,
+                       statistics.mean(times) * 1000, peak / 1024, len(times))
+
+
+def calibration_workload():
+    """Fixed pure-Python work used to normalise results across machine speeds"""
+    table = {}
+    for i in range(20000):
+        key = f"tag {i % 512}"
+        table[key] = table.get(key, 0) + len(key.replace(' ', '_'))
+    return sorted(table.items())
+
+
+def quiet_parser(json_dir: Path, **kwargs) -> SimpleCVParser:
+    """A loaded parser with progress messages swallowed and fragments disabled"""
+    parser = SimpleCVParser(json_dir=str(json_dir), use_cache=False, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser.load_all_data()
+    return parser
+
+
+def escape_workload(parser: SimpleCVParser) -> List[str]:
+    """Every plain string the formatters escape: titles, tags, skills, dates"""
+    strings = []
+    for experience in parser.experiences:
+        strings.extend((experience.title, experience.company, experience.dates, experience.location))
+        strings.extend(experience.tags)
+    for project in parser.side_projects:
+        strings.extend((project.title, project.role, project.dates, project.location))
+        strings.extend(project.tags)
+    for section in (parser.hard_skills, parser.soft_skills, parser.interests):
+        for category in section:
+            strings.append(category.name)
+            strings.extend(category.items or ())
+    return strings
+
+
+def bundle_stages(json_dir: Path, work_dir: Path) -> Dict[str, Tuple[Callable[[], object], Optional[Callable[[], None]]]]:
+    """Stage name -> (callable, setup) for one generated bundle"""
+    stages = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        warm_parser = SimpleCVParser(json_dir=str(json_dir), use_cache=True,
+                                     cache_dir=str(work_dir / 'cache'))
+        warm_parser.load_all_data()
+    parser = quiet_parser(json_dir)
+    strings = escape_workload(parser)
+    highlights = [h for section in (parser.experiences, parser.side_projects)
+                  for entry in section for h in entry.highlights]
+
+    def load():
+        with contextlib.redirect_stdout(io.StringIO()):
+            SimpleCVParser(json_dir=str(json_dir), use_cache=False).load_all_data()
+
+    def load_cached():
+        with contextlib.redirect_stdout(io.StringIO()):
+            SimpleCVParser(json_dir=str(json_dir), use_cache=True,
+                           cache_dir=str(work_dir / 'cache')).load_all_data()
+
+    pack_file = work_dir / 'bundle.cvpack'
+    compile_pack([('bundle', json_dir)], pack_file, workers=1)
+
+    def load_packed():
+        with contextlib.redirect_stdout(io.StringIO()):
+            SimpleCVParser(json_dir=str(pack_file), use_cache=False).load_all_data()
+
+    stages['load'] = (load, None)
+    stages['load_cached'] = (load_cached, None)
+    stages['load_packed'] = (load_packed, None)
+    stages['escape'] = (lambda: [escape_latex(s) for s in strings], clear_memo_caches)
+    stages['escape_warm'] = (lambda: [escape_latex(s) for s in strings], None)
+    stages['inline'] = (lambda: [render_inline(h) for h in highlights], clear_memo_caches)
+    for section in SimpleCVParser.SECTIONS:
+        method = getattr(parser, SimpleCVParser.SECTIONS[section][0])
+        stages[f'format.{section}'] = (lambda method=method: ''.join(method()), clear_memo_caches)
+    stages['document'] = (parser.build_complete_document, clear_memo_caches)
+
+    target = work_dir / 'out.tex'
+
+    def fresh_target():
+        clear_memo_caches()
+        if target.exists():
+            target.unlink()
+
+    stages['write'] = (lambda: stream_if_changed(target, parser.iter_document()), fresh_target)
+    stages['write_unchanged'] = (lambda: stream_if_changed(target, parser.iter_document()), None)
+    return stages
+
+
+def run_suite(sizes: List[str], repeat: int, warmup: int, stage_filter: Optional[List[str]] = None,
+              seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Run every stage on every size; keys are "<size>/<stage>\""""
+    results = {}
+    calibration = measure(calibration_workload, repeat, warmup)
+    results[CALIBRATION_KEY] = calibration._asdict()
+    print(f"{CALIBRATION_KEY:<32} median {calibration.median_ms:>10.3f} ms  min {calibration.min_ms:>10.3f} ms")
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix=f"cvbench-{size}-") as work:
+            work_dir = Path(work)
+            json_dir = generate_bundle(work_dir / 'bundle', PRESETS[size], seed)
+            for stage, (func, setup) in bundle_stages(json_dir, work_dir).items():
+                if stage_filter and not any(stage.startswith(prefix) for prefix in stage_filter):
+                    continue
+                result = measure(func, repeat, warmup, setup)
+                results[f"{size}/{stage}"] = result._asdict()
+                print(f"{size + '/' + stage:<32} median {result.median_ms:>10.3f} ms  "
+                      f"min {result.min_ms:>10.3f} ms  peak {result.peak_kib:>10.1f} KiB")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, metric: str = DEFAULT_METRIC, normalize: bool = False) -> List[str]:
+    """Print the metric ratio per shared stage and return the regressed ones
+
+    With normalize, ratios are divided by the calibration ratio, so a baseline
+    recorded on a faster or slower machine (or CPU clock) stays comparable.
+    """
+    regressions = []
+    speed = 1.0
+    if normalize and CALIBRATION_KEY in results and CALIBRATION_KEY in baseline:
+        speed = results[CALIBRATION_KEY][metric] / baseline[CALIBRATION_KEY][metric]
+        print(f"\nMachine speed relative to baseline: {1 / speed:.2f}x (ratios normalised)")
+    print(f"\n{'stage':<32} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for key in sorted(set(results) & set(baseline) - {CALIBRATION_KEY}):
+        before = baseline[key][metric]
+        after = results[key][metric]
+        ratio = after / before / speed if before > 0 else 1.0
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f"{key:<32} {before:>12.3f} {after:>12.3f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the CV pipeline stages")
+    arg_parser.add_argument("--sizes", nargs='+', choices=sorted(PRESETS), default=DEFAULT_SIZES)
+    arg_parser.add_argument("--stages", nargs='+', help="Only run stages starting with these names")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--warmup", type=int, default=1)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", help="Write the results JSON here")
+    arg_parser.add_argument("--baseline", help="Compare against this results JSON")
+    arg_parser.add_argument("--save-baseline", help="Write the results JSON as the new baseline")
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="Allowed slowdown before a stage counts as regressed (0.25 = 25%%)")
+    arg_parser.add_argument("--metric", choices=['min_ms', 'median_ms', 'mean_ms'], default=DEFAULT_METRIC,
+                            help="Timing compared against the baseline")
+    arg_parser.add_argument("--normalize", action="store_true",
+                            help="Scale ratios by the calibration workload to cancel machine speed changes")
+    args = arg_parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeat, args.warmup, args.stages, args.seed)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+            print(f"Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.metric, args.normalize)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than baseline by more than {args.threshold:.0%}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
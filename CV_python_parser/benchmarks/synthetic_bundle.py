@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Synthetic CV bundles - Deterministic CV_json-style folders of scaling size
+The same preset and seed always produce byte-identical files, so benchmark
+runs on different commits measure the same input
+"""
+
+import argparse
+import random
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+
+class BundleSize(NamedTuple):
+    """Shape of a generated bundle"""
+    experiences: int
+    highlights_per_entry: int
+    side_projects: int
+    skill_categories: int
+    skills_per_category: int
+
+
+PRESETS = {
+    'tiny': BundleSize(5, 2, 3, 4, 5),              # 10 highlights
+    'small': BundleSize(50, 4, 20, 8, 10),          # 200 highlights
+    'medium': BundleSize(500, 10, 100, 12, 50),     # 5,000 highlights
+    'large': BundleSize(5000, 20, 500, 20, 200),    # 100,000 highlights
+    'skills': BundleSize(5, 2, 3, 50, 1000),        # long skill lists
+}
+
+_WORDS = ('pipeline latency streaming inference model cluster cache codec kernel '
+          'service gateway scheduler dataset training deployment monitoring budget '
+          'throughput accuracy customers speech audio agent robot edge cloud').split()
+_TECH = ['Python', 'C++', 'CUDA', 'TensorRT', 'WebRTC', 'Docker', 'Kubernetes', 'AWS',
+         'Terraform', 'PyTorch', 'ONNX', 'Redis', 'PostgreSQL', 'Rust', 'Go', 'LLMs',
+         'TTS', 'STT', 'ASR', 'C#', 'Node.js', 'R&D', 'CI/CD', 'A/B testing']
+# Strings that exercise escaping and markup: specials, Unicode and inline markup
+_DECORATIONS = [
+    '**{n}+ concurrent streams**', '*{n} % cost reduction*', '`{tech}` integration',
+    '[{tech} docs](https://example.com/{n}#top)', '{n}× speed-up → production',
+    'budget ≤ {n} W & latency ≥ {n} ms', 'C_{n} stage ~ {n} $ per day',
+]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _highlight(rng: random.Random) -> str:
+    decoration = rng.choice(_DECORATIONS).format(n=rng.randint(1, 999), tech=rng.choice(_TECH))
+    return f"{_sentence(rng, 6).capitalize()} with {decoration}; {_sentence(rng, 5)}."
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _string_list(items: List[str], indent: str) -> List[str]:
+    return [f"{indent}{_quote(item)}," for item in items]
+
+
+def _entries_file(name: str, entries: Dict[str, Dict], comment: str) -> str:
+    """Render a dict of entries in the commented CV_json style"""
+    lines = [f"{name} = {{"]
+    for key, fields in entries.items():
+        lines.append(f"    # {comment} {key}")
+        lines.append(f"    {_quote(key)}: {{")
+        for field, value in fields.items():
+            if isinstance(value, list):
+                lines.append(f'        "{field}": [')
+                lines.extend(_string_list(value, '            '))
+                lines.append('        ],')
+            else:
+                lines.append(f'        "{field}":  {_quote(value)},')
+        lines.append('    },')
+        lines.append('')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def _categories_file(name: str, categories: Dict[str, List[str]]) -> str:
+    lines = [f"{name} = {{"]
+    for category, items in categories.items():
+        lines.append(f"    # ---------- {category} ----------")
+        lines.append(f"    {_quote(category)}: [")
+        lines.extend(_string_list(items, '        '))
+        lines.append('    ],')
+        lines.append('')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_files(size: BundleSize, seed: int = 0) -> Dict[str, str]:
+    """Return filename -> content for a complete bundle"""
+    rng = random.Random(seed)
+    files = {}
+
+    files['profile.json'] = '\n'.join([
+        'profile = {',
+        '    "name":     "Ada Example-Lovelace",',
+        '    "tagline":  "Ph.D - Speech AI & Edge Inference Lead",',
+        '    "contact": {',
+        '        "email":     "ada.example@example.com",',
+        '        "phone":     "+33 6 00 00 00 00",',
+        '        "location":  "Paris, France",',
+        '        "linkedin":  "linkedin.com/in/ada_example/",',
+        '        "age":       36,',
+        '    },',
+        '    "summary": (',
+        f'        {_quote(_highlight(rng) + " ")}',
+        f'        {_quote(_highlight(rng))}',
+        '    ),',
+        '}',
+    ]) + '\n'
+
+    experiences = {}
+    for i in range(size.experiences):
+        experiences[f"Senior Engineer {i} ({rng.choice(_TECH)})"] = {
+            'company': f"Company {i % 97} & Partners",
+            'dates': f"Jan {2000 + i % 25} - Dec {2001 + i % 25}",
+            'location': rng.choice(['Paris, France', 'Berlin, Germany', 'Remote']),
+            'highlights': [_highlight(rng) for _ in range(size.highlights_per_entry)],
+            'tags': rng.sample(_TECH, 6),
+        }
+    files['Professional_experience.json'] = _entries_file('experiences', experiences, 'Role')
+
+    projects = {}
+    for i in range(size.side_projects):
+        projects[f"project_{i}"] = {
+            'title': f"Project {i}: {_sentence(rng, 2).title()}",
+            'role': 'Solo developer',
+            'dates': f"{2015 + i % 10}",
+            'location': 'home',
+            'highlights': [_highlight(rng) for _ in range(max(1, size.highlights_per_entry // 2))],
+            'tags': rng.sample(_TECH, 4),
+            'url': f"https://github.com/example/project_{i}",
+        }
+    files['side_projects.json'] = _entries_file('side_projects', projects, 'Project')
+
+    diplomas = {}
+    for i in range(3):
+        diplomas[f"Diploma {i} - {_sentence(rng, 3).title()}"] = {
+            'school': f"École {i} & Institute",
+            'years': f"{2010 + i} - {2012 + i}",
+            'location': 'Rennes, France',
+        }
+    files['diplomas.json'] = _entries_file('diplomas', diplomas, 'Degree')
+
+    def categories(prefix: str) -> Dict[str, List[str]]:
+        return {f"{prefix} {c} & {_sentence(rng, 1).title()}":
+                [f"{rng.choice(_TECH)} {_sentence(rng, 2)} ({j})" for j in range(size.skills_per_category)]
+                for c in range(size.skill_categories)}
+
+    files['hard_skills.json'] = _categories_file('hard_skills', categories('Hard'))
+    files['soft_skills.json'] = _categories_file('soft_skills', categories('Soft'))
+    files['Interest.json'] = _categories_file('interests', {
+        f"Interest {c}": [_sentence(rng, 3) for _ in range(3)] for c in range(4)})
+    files['languages.json'] = '\n'.join([
+        'languages = {',
+        '    "English": {"level": "C1", "descriptor": "Professional Working Proficiency"},',
+        '    "French":  {"level": "Native", "descriptor": "Mother Tongue"},',
+        '}',
+    ]) + '\n'
+    return files
+
+
+def generate_bundle(directory: str, size: BundleSize, seed: int = 0) -> Path:
+    """Write a bundle into directory (created if needed) and return its path"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for filename, content in generate_files(size, seed).items():
+        (directory / filename).write_text(content, encoding='utf-8')
+    return directory
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Write a deterministic synthetic CV bundle")
+    arg_parser.add_argument("output_dir", help="Folder to write the CV_json-style files into")
+    arg_parser.add_argument("--preset", choices=sorted(PRESETS), default='small')
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    size = PRESETS[args.preset]
+    generate_bundle(args.output_dir, size, args.seed)
+    print(f"Wrote {args.preset} bundle to {args.output_dir}: {size.experiences} experiences, "
+          f"{size.experiences * size.highlights_per_entry} highlights, "
+          f"{size.skill_categories} x {size.skills_per_category} skills per skill file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Archive sources - Candidate bundles read straight from zip and tar archives
+Member files are read into memory, nothing is extracted to disk. Every folder
+of the archive holding a profile.json or resume.json is one bundle (as with --bundles), and
+source files at the archive root form a single bundle named after the archive.
+prefetch() reads the bundles of a batch ahead of the renderer on threads.
+
+    python cv_archive.py list candidates.tar.gz
+"""
+
+import argparse
+import os
+import queue
+import sys
+import tarfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from cv_model import SOURCE_FILES
+from cv_resume import BUNDLE_FILES, BUNDLE_MARKERS
+
+
+# Only these members are ever read
+SOURCE_NAMES = frozenset(BUNDLE_FILES)
+# A streamed bundle is complete once it has all of these; a resume.json stands in for missing ones
+SECTION_NAMES = frozenset(filename for _, filename in SOURCE_FILES)
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tbz2', '.txz', '.tar', '.zip')
+DEFAULT_PREFETCH_WORKERS = 4
+
+
+class BundleSource(NamedTuple):
+    """Raw bytes of the source files of one bundle, keyed by file name"""
+    name: str
+    files: Dict[str, bytes]
+
+
+def archive_stem(path: Union[str, Path]) -> str:
+    """Archive file name without its (possibly double) suffix: cv.tar.gz -> cv"""
+    name = Path(path).name
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return Path(path).stem
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    """Whether path is a zip or tar file (gzip, bzip2 and xz included), judged by name then content"""
+    path = Path(path)
+    if path.name.lower().endswith(ARCHIVE_SUFFIXES):
+        return True
+    return path.is_file() and (zipfile.is_zipfile(path) or tarfile.is_tarfile(str(path)))
+
+
+def _source_member(member_name: str) -> Optional[Tuple[str, str]]:
+    """(folder, file name) of a member that is a CV source file, else None"""
+    path = PurePosixPath(member_name.lstrip('/'))
+    if path.name not in SOURCE_NAMES or '__MACOSX' in path.parts:
+        return None
+    folder = path.parent.as_posix()
+    return ('' if folder == '.' else folder), path.name
+
+
+class ArchiveBundles:
+    """The bundles of one archive, readable by name without extracting it
+
+    Zip members are read concurrently; tar members go through one lock since
+    a tar file has a single read position. The index is built on first use,
+    so stream() over a compressed tar reads the archive exactly once.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.is_zip = zipfile.is_zipfile(self.path)
+        if not self.is_zip and not tarfile.is_tarfile(str(self.path)):
+            raise ValueError(f"{self.path} is not a zip or tar archive")
+        self._lock = threading.Lock()
+        self._handle = None  # type: Any
+        self._index = None  # type: Optional[Dict[str, Dict[str, Any]]]
+
+    def bundle_name(self, folder: str) -> str:
+        return folder or archive_stem(self.path)
+
+    def _open(self) -> Any:
+        if self._handle is None:
+            self._handle = zipfile.ZipFile(self.path) if self.is_zip else tarfile.open(str(self.path))
+        return self._handle
+
+    @property
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """Bundle name -> {file name: zip info or tar member}, in archive order"""
+        if self._index is None:
+            with self._lock:
+                handle = self._open()
+                members = handle.infolist() if self.is_zip else handle.getmembers()
+                folders = {}  # type: Dict[str, Dict[str, Any]]
+                for member in members:
+                    if member.is_dir() if self.is_zip else not member.isfile():
+                        continue
+                    found = _source_member(member.filename if self.is_zip else member.name)
+                    if found:
+                        folders.setdefault(found[0], {})[found[1]] = member
+                self._index = {self.bundle_name(folder): files for folder, files in folders.items()
+                               if not files.keys().isdisjoint(BUNDLE_MARKERS)}
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def names(self) -> List[str]:
+        return list(self.index)
+
+    def read(self, name: Optional[str] = None, files: Optional[Iterable[str]] = None) -> BundleSource:
+        """A bundle by name; the name may be omitted when the archive holds exactly one
+
+        With files, only those members of the bundle are read.
+        """
+        index = self.index
+        if name is None:
+            if len(index) != 1:
+                raise ValueError(f"{self.path} holds {len(index)} bundles, name one of them")
+            name = next(iter(index))
+        if name not in index:
+            raise KeyError(f"no bundle {name!r} in {self.path}")
+        members = index[name]
+        if files is not None:
+            wanted = set(files)
+            members = {filename: member for filename, member in members.items() if filename in wanted}
+        if self.is_zip:
+            # ZipFile serializes the seeks itself; decompression runs outside its lock
+            handle = self._open()
+            return BundleSource(name, {filename: handle.read(info) for filename, info in members.items()})
+        with self._lock:
+            handle = self._open()
+            return BundleSource(name, {filename: handle.extractfile(member).read()
+                                       for filename, member in members.items()})
+
+    def stream(self) -> Iterator[BundleSource]:
+        """Every bundle in one sequential pass, without building the index first
+
+        Tar archives are read as a stream: a bundle is yielded as soon as all
+        its section files were seen, the incomplete ones when the stream ends.
+        Each bundle is yielded once; members of a bundle already yielded are
+        skipped, such as a resume.json after the section files, which would
+        supply no section those files do not.
+        """
+        if self.is_zip:
+            for name in self.names():
+                yield self.read(name)
+            return
+        pending = {}  # type: Dict[str, Dict[str, bytes]]
+        done = set()
+        with tarfile.open(str(self.path), mode='r|*') as archive:
+            for member in archive:
+                found = _source_member(member.name) if member.isfile() else None
+                if not found or found[0] in done:
+                    continue
+                folder, filename = found
+                files = pending.setdefault(folder, {})
+                files[filename] = archive.extractfile(member).read()
+                if SECTION_NAMES <= files.keys():
+                    done.add(folder)
+                    yield BundleSource(self.bundle_name(folder), pending.pop(folder))
+        for folder, files in pending.items():
+            if not files.keys().isdisjoint(BUNDLE_MARKERS):
+                yield BundleSource(self.bundle_name(folder), files)
+
+    def prefetch(self, workers: int = DEFAULT_PREFETCH_WORKERS, depth: int = 32) -> Iterator[BundleSource]:
+        """stream() with up to depth bundles read ahead of the consumer
+
+        Zip bundles are read by a pool of workers threads, in archive order;
+        a tar stream has one read position, so a single thread reads ahead.
+        """
+        if self.is_zip:
+            return _ordered_prefetch(self.names(), self.read, max(1, workers), max(1, depth))
+        return _read_ahead(self.stream(), max(1, depth))
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def _ordered_prefetch(names: Iterable[str], read: Callable[[str], BundleSource], workers: int,
+                      depth: int) -> Iterator[BundleSource]:
+    """read() every name on a thread pool, at most depth ahead, yielding in order"""
+    names = iter(names)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-prefetch") as pool:
+        pending = deque(pool.submit(read, name) for name in islice(names, depth))
+        while pending:
+            source = pending.popleft().result()
+            for name in islice(names, 1):
+                pending.append(pool.submit(read, name))
+            yield source
+
+
+_DONE = object()
+
+
+def _read_ahead(iterator: Iterator[BundleSource], depth: int) -> Iterator[BundleSource]:
+    """Drain iterator on a background thread into a queue of at most depth items"""
+    items = queue.Queue(maxsize=depth)  # type: queue.Queue
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterator:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            items.put(_DONE)
+        except BaseException as e:
+            items.put(e)
+
+    thread = threading.Thread(target=produce, name="cv-read-ahead", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+@lru_cache(maxsize=8)
+def _open_cached(path: str, size: int, mtime_ns: int, inode: int) -> ArchiveBundles:
+    return ArchiveBundles(path)
+
+
+def open_archive(path: Union[str, Path]) -> ArchiveBundles:
+    """Open an archive once per process; a rewritten file is indexed again"""
+    path = str(Path(path).resolve())
+    stat = os.stat(path)
+    return _open_cached(path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Command line entry point for inspecting archives"""
+    arg_parser = argparse.ArgumentParser(description="Inspect CV bundles stored in zip or tar archives")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    list_command = commands.add_parser("list", help="List the bundles of an archive")
+    list_command.add_argument("archive", help="zip or tar archive")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        archive = open_archive(args.archive)
+        for name, files in archive.index.items():
+            sizes = sum(member.file_size if archive.is_zip else member.size for member in files.values())
+            print(f"{name}: {len(files)} source files, {sizes} bytes")
+    except (OSError, ValueError) as e:
+        arg_parser.error(str(e))
+    print(f"{len(archive)} bundles in {args.archive}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Batch CV renderer - Renders many candidate bundles in parallel
+Each bundle is a folder shaped like CV_json or a JSON Resume file; work is fanned out over a process pool
+after a validation stage has set the invalid bundles aside. With a journal, finished
+items are recorded as they complete and a restarted run resumes where it stopped;
+--shard splits one manifest over several processes or machines
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cv_archive import DEFAULT_PREFETCH_WORKERS, BundleSource, is_archive, open_archive
+from cv_cache import DEFAULT_CACHE_DIR, DEFAULT_PDF_CACHE_BYTES, ParsedDataCache, PdfCache
+from cv_compile import (
+    DEFAULT_BIBER, DEFAULT_BIBTEX, DEFAULT_COMPILER, DEFAULT_MAX_PASSES, DEFAULT_TIMEOUT, LatexCompiler, job_for,
+    print_compile_results,
+)
+from cv_journal import Journal, JournalEntry, parse_shard, shard_of
+from cv_model import SOURCE_FILES
+from cv_pack import open_pack
+from cv_parser_simple import SimpleCVParser
+from cv_plan import LayoutError, RenderPlan, load_layout
+from cv_resume import BUNDLE_FILES, RESUME_FILE, is_bundle, is_resume_file
+from cv_render import RENDERERS, parse_formats
+from cv_template import TemplateParams, load_template_params
+from cv_trace import TraceEvent, Tracer, percentile, set_quiet
+from cv_validate import BundleReport, print_report, validate_bundle, validate_sources, validation_cache, write_report
+
+
+class BatchItem(NamedTuple):
+    """One candidate bundle to render
+
+    json_dir may be a packed file holding the bundle name; bundles read from
+    an archive carry their source files in source instead.
+    """
+    name: str
+    json_dir: str
+    output_file: str
+    source: Optional[BundleSource] = None
+
+
+class BatchResult(NamedTuple):
+    """Outcome of rendering one bundle"""
+    name: str
+    output_file: str
+    ok: bool
+    seconds: float
+    error: str = ""
+    trace: Tuple[TraceEvent, ...] = ()
+
+
+class BatchSummary(NamedTuple):
+    """Throughput summary for a whole batch"""
+    total: int
+    succeeded: int
+    failed: int
+    wall_seconds: float
+    cvs_per_second: float
+    p50_seconds: float
+    p99_seconds: float
+    failures: List[BatchResult]
+    events: Tuple[TraceEvent, ...] = ()
+    outputs: Tuple[str, ...] = ()
+
+
+def load_manifest(manifest_path: str) -> List[BatchItem]:
+    """Load batch items from a JSON manifest
+
+    The manifest is a list of objects with "json_dir" and optionally "name"
+    and "output". Relative paths are resolved against the manifest folder.
+    """
+    manifest_path = Path(manifest_path)
+    base = manifest_path.parent
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    items = []
+    for index, entry in enumerate(entries):
+        json_dir = base / entry['json_dir']
+        name = entry.get('name', json_dir.name or f"cv_{index}")
+        output = entry.get('output', f"{name}.tex")
+        items.append(BatchItem(name, str(json_dir), str(base / output)))
+    return items
+
+
+def discover_bundles(root: str, output_dir: str) -> List[BatchItem]:
+    """Find every sub-folder of root that looks like a CV_json bundle, and every JSON Resume file in it"""
+    root = Path(root)
+    output_dir = Path(output_dir)
+    items = []
+    for bundle in sorted(root.iterdir()):
+        if is_bundle(bundle):
+            items.append(BatchItem(bundle.name, str(bundle), str(output_dir / f"{bundle.name}.tex")))
+        elif bundle.is_file() and is_resume_file(bundle):
+            items.append(BatchItem(bundle.stem, str(bundle), str(output_dir / f"{bundle.stem}.tex")))
+    return items
+
+
+def packed_bundles(pack_file: str, output_dir: str) -> List[BatchItem]:
+    """One item per candidate of a packed file written by cv_pack"""
+    output_dir = Path(output_dir)
+    return [BatchItem(name, pack_file, str(output_dir / f"{name}.tex"))
+            for name in open_pack(pack_file).names()]
+
+
+def archive_bundles(archive_file: str, output_dir: str, workers: int = DEFAULT_PREFETCH_WORKERS,
+                    depth: int = 64) -> Iterator[BatchItem]:
+    """Items of a zip/tar archive, their files read up to depth bundles ahead on threads"""
+    output_dir = Path(output_dir)
+    for source in open_archive(archive_file).prefetch(workers, depth):
+        yield BatchItem(source.name, archive_file, str(output_dir / f"{source.name}.tex"), source)
+
+
+def sharded(items: Iterable[BatchItem], index: int, count: int) -> Iterator[BatchItem]:
+    """The items owned by shard index of count, chosen by a hash of their names"""
+    for item in items:
+        if shard_of(item.name, count) == index:
+            yield item
+
+
+def batch_fingerprint(template_params: Optional[TemplateParams] = None,
+                      formats: Optional[List[str]] = None, layout: Optional[RenderPlan] = None) -> str:
+    """Everything besides the source files that shapes the outputs of a batch"""
+    layout = layout or load_layout('default')
+    pages = [[[(block.section, block.space_before) for block in column] for column in page] for page in layout.pages]
+    return json.dumps([SimpleCVParser.LOADER_VERSION, SimpleCVParser.RENDERER_VERSION,
+                       list(template_params or TemplateParams()), formats or ['latex'],
+                       [layout.name, layout.header, pages]])
+
+
+def item_input_hash(item: BatchItem, fingerprint: str) -> str:
+    """Hash of the source bytes of an item and the batch fingerprint"""
+    path = Path(item.json_dir)
+    if item.source is not None:
+        files = item.source.files
+    elif path.is_dir():
+        files = {filename: (path / filename).read_bytes() for filename in BUNDLE_FILES if (path / filename).exists()}
+    elif is_archive(path):
+        files = open_archive(path).read(item.name).files
+    elif is_resume_file(path):
+        files = {RESUME_FILE: path.read_bytes()}
+    else:
+        packed = open_pack(path).candidate(item.name)
+        files = {filename: packed.payload(attribute) for attribute, filename in SOURCE_FILES if attribute in packed}
+    digest = hashlib.sha1(fingerprint.encode('utf-8'))
+    for filename in sorted(files):
+        digest.update(f"\0{filename}\0{len(files[filename])}\0".encode('utf-8'))
+        digest.update(files[filename])
+    return digest.hexdigest()
+
+
+def resumed(items: Iterable[BatchItem], journal: Journal, fingerprint: str, hashes: Dict[str, str],
+            skipped: List[str]) -> Iterator[BatchItem]:
+    """Yield the items the journal has no finished record of, for the same inputs and output
+
+    The input hash of each yielded item is left in hashes for recording its
+    result; unreadable items are yielded so that rendering reports the error.
+    """
+    for item in items:
+        try:
+            input_hash = item_input_hash(item, fingerprint)
+        except (OSError, ValueError, KeyError):
+            input_hash = ''
+        if input_hash and journal.is_done(item.name, input_hash, item.output_file):
+            skipped.append(item.name)
+            continue
+        hashes[item.name] = input_hash
+        yield item
+
+
+def validate_item(item: BatchItem, cache: Optional[ParsedDataCache] = None) -> BundleReport:
+    """Validation report of one item, named as the item"""
+    if item.source is not None:
+        report = validate_sources(item.source, item.json_dir, cache)
+    else:
+        report = validate_bundle(item.json_dir, item.name if Path(item.json_dir).is_file() else None, cache)
+    return report._replace(name=item.name)
+
+
+def validated(items: Iterable[BatchItem], reports: List[BundleReport],
+              cache: Optional[ParsedDataCache] = None) -> Iterator[BatchItem]:
+    """Yield the items that pass validation, appending every item's report to reports
+
+    Runs lazily in the submitting process, so an invalid bundle is set aside
+    before it is handed to a render worker; with the cache, unchanged files
+    cost a stat each.
+    """
+    for item in items:
+        report = validate_item(item, cache)
+        reports.append(report)
+        if report.ok:
+            yield item
+
+
+def quarantine(reports: Iterable[BundleReport], directory: str) -> List[str]:
+    """Move the folders of invalid bundles into directory; packed and archived bundles stay in place"""
+    moved = []
+    for report in reports:
+        source = Path(report.source)
+        if report.ok or not source.is_dir():
+            continue
+        target = Path(directory) / source.name
+        if target.exists():
+            print(f"  Not quarantining {source}: {target} already exists")
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(source), str(target))
+        moved.append(str(target))
+    return moved
+
+
+def render_bundle(item: BatchItem, use_cache: bool = True, cache_dir: str = DEFAULT_CACHE_DIR,
+                  template_params: Optional[TemplateParams] = None, trace: bool = False,
+                  formats: Optional[List[str]] = None, layout: Optional[RenderPlan] = None) -> BatchResult:
+    """Load, render and write a single bundle in every format, capturing any error
+
+    Sections are streamed without the fragment cache: each bundle is rendered
+    once, so caching its sections would only hold them in memory and on disk.
+    """
+    tracer = Tracer(enabled=trace)
+    start = time.perf_counter()
+    try:
+        with tracer.span('bundle', 'batch', bundle=item.name):
+            parser = SimpleCVParser(json_dir=item.json_dir, output_file=item.output_file,
+                                    use_cache=use_cache, cache_dir=cache_dir,
+                                    template_params=template_params, tracer=tracer, layout=layout,
+                                    fragment_cache=False)
+            if item.source is not None:
+                parser.load_sources(item.source)
+            else:
+                # Workers map a packed file once and decode only this candidate's sections
+                parser.load_all_data(item.name if Path(item.json_dir).is_file() else None)
+            Path(item.output_file).parent.mkdir(parents=True, exist_ok=True)
+            if formats and formats != ['latex']:
+                parser.generate_outputs(formats)
+            else:
+                parser.generate_custom_tex()
+    except Exception as e:
+        return BatchResult(item.name, item.output_file, False,
+                           time.perf_counter() - start, f"{type(e).__name__}: {e}", tuple(tracer.events))
+    return BatchResult(item.name, item.output_file, True, time.perf_counter() - start,
+                       trace=tuple(tracer.events))
+
+
+def render_chunk(items: List[BatchItem], use_cache: bool = True, cache_dir: str = DEFAULT_CACHE_DIR,
+                 template_params: Optional[TemplateParams] = None, trace: bool = False,
+                 quiet: bool = True, formats: Optional[List[str]] = None,
+                 layout: Optional[RenderPlan] = None) -> List[BatchResult]:
+    """Render a chunk of bundles inside one worker call"""
+    # Per-bundle progress messages from every worker would drown the summary
+    set_quiet(quiet)
+    return [render_bundle(item, use_cache, cache_dir, template_params, trace, formats, layout) for item in items]
+
+
+def chunked(items: Iterable[BatchItem], size: int) -> Iterator[List[BatchItem]]:
+    """Split items into lists of at most size entries, consuming them lazily"""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def summarize(results: List[BatchResult], wall_seconds: float) -> BatchSummary:
+    """Build the throughput summary for a finished batch"""
+    latencies = sorted(r.seconds for r in results)
+    failures = [r for r in results if not r.ok]
+    return BatchSummary(
+        total=len(results),
+        succeeded=len(results) - len(failures),
+        failed=len(failures),
+        wall_seconds=wall_seconds,
+        cvs_per_second=len(results) / wall_seconds if wall_seconds > 0 else 0.0,
+        p50_seconds=percentile(latencies, 0.50),
+        p99_seconds=percentile(latencies, 0.99),
+        failures=failures,
+        events=tuple(event for r in results for event in r.trace),
+        outputs=tuple(r.output_file for r in results if r.ok),
+    )
+
+
+def run_batch(items: Iterable[BatchItem], workers: Optional[int] = None,
+              chunk_size: int = 16, use_cache: bool = True,
+              cache_dir: str = DEFAULT_CACHE_DIR,
+              template_params: Optional[TemplateParams] = None, trace: bool = False,
+              quiet: bool = True, formats: Optional[List[str]] = None,
+              on_results: Optional[Callable[[List[BatchResult]], None]] = None,
+              layout: Optional[RenderPlan] = None) -> BatchSummary:
+    """Render all items over a process pool and return the summary
+
+    Chunks are submitted lazily so that at most two chunks per worker are
+    in flight, and items may be a generator (archive bundles are read while
+    earlier chunks render); a failing bundle is recorded and never aborts the batch.
+    Every worker compiles the document template once and reuses it. With
+    trace, each bundle's pipeline spans are returned in the summary events.
+    Each bundle is loaded once and written in every one of formats (LaTeX
+    only by default), with layout as its page layout (the default one when
+    omitted). on_results is called in this process with the results of every
+    chunk as it completes, e.g. to journal them.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, chunk_size)
+    results = []  # type: List[BatchResult]
+    render = partial(render_chunk, use_cache=use_cache, cache_dir=cache_dir,
+                     template_params=template_params, trace=trace, quiet=quiet, formats=formats, layout=layout)
+    start = time.perf_counter()
+
+    if workers == 1:
+        for chunk in chunked(items, chunk_size):
+            chunk_results = render(chunk)
+            results.extend(chunk_results)
+            if on_results:
+                on_results(chunk_results)
+        return summarize(results, time.perf_counter() - start)
+
+    pending_chunks = chunked(items, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for chunk in pending_chunks:
+            in_flight.add(pool.submit(render, chunk))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_results = future.result()
+                results.extend(chunk_results)
+                if on_results:
+                    on_results(chunk_results)
+                next_chunk = next(pending_chunks, None)
+                if next_chunk is not None:
+                    in_flight.add(pool.submit(render, next_chunk))
+
+    return summarize(results, time.perf_counter() - start)
+
+
+def print_summary(summary: BatchSummary):
+    """Print a human readable batch summary"""
+    print(f"Rendered {summary.succeeded}/{summary.total} CVs in {summary.wall_seconds:.2f}s "
+          f"({summary.cvs_per_second:.1f} CVs/sec)")
+    print(f"Per-CV latency: p50 {summary.p50_seconds * 1000:.1f} ms, "
+          f"p99 {summary.p99_seconds * 1000:.1f} ms")
+    for failure in summary.failures:
+        print(f"  FAILED {failure.name}: {failure.error}")
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Command line entry point for batch rendering"""
+    arg_parser = argparse.ArgumentParser(description="Render many CV bundles in parallel")
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="JSON list of {name, json_dir, output} entries")
+    source.add_argument("--bundles", help="Folder containing one CV_json-shaped folder or JSON Resume file "
+                                          "per candidate")
+    source.add_argument("--pack", help="Packed file of bundles written by cv_pack.py")
+    source.add_argument("--archive", help="zip or tar(.gz) archive of bundle folders, read without extracting")
+    arg_parser.add_argument("--output-dir", default="batch_output",
+                            help="Output folder used with --bundles, --pack and --archive")
+    arg_parser.add_argument("--prefetch-workers", type=int, default=DEFAULT_PREFETCH_WORKERS,
+                            help="Threads reading archive bundles ahead of the renderers")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    arg_parser.add_argument("--chunk-size", type=int, default=16, help="Bundles per submitted work item")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always re-parse the source files")
+    arg_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Folder for the parsed-data cache")
+    arg_parser.add_argument("--template-config",
+                            help="JSON file of template parameters shared by every bundle")
+    arg_parser.add_argument("--formats", default="latex",
+                            help=f"Comma-separated output formats ({', '.join(RENDERERS)}), "
+                                 "written next to each .tex output")
+    arg_parser.add_argument("--layout", default="default",
+                            help="Page layout of every CV: a built-in name (default, short) or a JSON layout file")
+    arg_parser.add_argument("--shard", metavar="INDEX/COUNT",
+                            help="Only render the items of one shard, e.g. 0/4, chosen by a hash of their names")
+    arg_parser.add_argument("--journal", metavar="FILE",
+                            help="Append finished items to FILE and skip those already done with unchanged inputs")
+    arg_parser.add_argument("--no-validate", action="store_true",
+                            help="Render every bundle without checking its source files first")
+    arg_parser.add_argument("--report", metavar="FILE",
+                            help="Write a JSON report of every bundle that failed or warned validation")
+    arg_parser.add_argument("--quarantine", metavar="DIR",
+                            help="Move the folders of invalid bundles into DIR so later runs skip them")
+    arg_parser.add_argument("--compile", nargs="?", const=DEFAULT_COMPILER, metavar="COMMAND",
+                            help="Also compile every rendered CV to PDF (default compiler: pdflatex)")
+    arg_parser.add_argument("--compile-workers", type=int, default=None,
+                            help="Concurrent compile jobs (default: CPU count)")
+    arg_parser.add_argument("--no-format", action="store_true",
+                            help="Compile without the pre-dumped preamble format")
+    arg_parser.add_argument("--no-pdf-cache", action="store_true",
+                            help="Always run the compiler, even for a document compiled before")
+    arg_parser.add_argument("--pdf-cache-size", type=float, default=DEFAULT_PDF_CACHE_BYTES / (1024 * 1024),
+                            metavar="MIB", help="Size bound of the compiled-PDF store under the cache folder")
+    arg_parser.add_argument("--compile-timeout", type=float, default=DEFAULT_TIMEOUT,
+                            help="Seconds before a compile job is aborted")
+    arg_parser.add_argument("--max-passes", type=int, default=DEFAULT_MAX_PASSES,
+                            help="Most compiler passes per PDF; passes stop once the .aux/.out/.bbl files are stable")
+    arg_parser.add_argument("--bibtex", default=DEFAULT_BIBTEX, metavar="COMMAND",
+                            help="Bibliography command for \\bibliography documents, run only when something is cited")
+    arg_parser.add_argument("--biber", default=DEFAULT_BIBER, metavar="COMMAND",
+                            help="Bibliography command for biblatex documents, run only when something is cited")
+    arg_parser.add_argument("--trace", metavar="FILE",
+                            help="Time every pipeline stage of every bundle and write a Chrome trace-event JSON file")
+    arg_parser.add_argument("--verbose", action="store_true", help="Show per-bundle progress messages")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        template_params = load_template_params(args.template_config)
+    except (OSError, ValueError) as e:
+        arg_parser.error(f"invalid template config: {e}")
+    try:
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        arg_parser.error(str(e))
+    if args.compile and 'latex' not in formats:
+        arg_parser.error("--compile needs the latex format")
+    try:
+        layout = load_layout(args.layout)
+    except (OSError, LayoutError) as e:
+        arg_parser.error(f"invalid layout: {e}")
+    try:
+        shard = parse_shard(args.shard) if args.shard else (0, 1)
+    except ValueError as e:
+        arg_parser.error(str(e))
+
+    if args.manifest:
+        items = load_manifest(args.manifest)
+    elif args.pack:
+        items = packed_bundles(args.pack, args.output_dir)
+    elif args.archive:
+        try:
+            open_archive(args.archive)
+        except (OSError, ValueError) as e:
+            arg_parser.error(str(e))
+        workers = args.workers or os.cpu_count() or 1
+        # Enough read-ahead to refill every in-flight chunk
+        items = archive_bundles(args.archive, args.output_dir, args.prefetch_workers,
+                                depth=max(2, workers * 2) * max(1, args.chunk_size))
+    else:
+        items = discover_bundles(args.bundles, args.output_dir)
+
+    if args.shard:
+        items = sharded(items, *shard)
+    journal = None
+    hashes = {}  # type: Dict[str, str]
+    skipped = []  # type: List[str]
+    if args.journal:
+        journal = Journal(args.journal, shard)
+        if args.archive:
+            journal.start()
+        else:
+            items = list(items)
+            journal.start(item.name for item in items)
+        items = resumed(items, journal, batch_fingerprint(template_params, formats, layout), hashes, skipped)
+
+    def record(results: List[BatchResult]):
+        journal.record(JournalEntry(r.name, r.output_file, hashes.pop(r.name, ''), r.ok, r.seconds,
+                                    r.error, journal.shard) for r in results)
+
+    reports = []  # type: List[BundleReport]
+    if not args.no_validate:
+        items = validated(items, reports, validation_cache(args.cache_dir, enabled=not args.no_cache))
+    summary = run_batch(items, workers=args.workers, chunk_size=args.chunk_size,
+                        use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                        template_params=template_params, trace=bool(args.trace),
+                        quiet=not args.verbose, formats=formats, on_results=record if journal else None,
+                        layout=layout)
+    print_summary(summary)
+    invalid = [report for report in reports if not report.ok]
+    if journal:
+        journal.record(JournalEntry(report.name, '', hashes.pop(report.name, ''), False, 0.0,
+                                    f"{len(report.errors)} validation errors", journal.shard)
+                       for report in invalid)
+        journal.finish(summary.total, len(skipped), summary.wall_seconds)
+        journal.close()
+        print(f"Skipped {len(skipped)} items already done; journal: {args.journal}")
+    if invalid:
+        print(f"Skipped {len(invalid)}/{len(reports)} invalid bundles before rendering:")
+        for report in invalid:
+            print_report(report._replace(issues=tuple(report.errors)), limit=5)
+    if args.quarantine:
+        moved = quarantine(invalid, args.quarantine)
+        if moved:
+            print(f"Quarantined {len(moved)} bundle(s) in {args.quarantine}")
+    if args.report:
+        write_report(args.report, reports, len(reports))
+        print(f"Wrote validation report to {args.report}")
+    if args.trace:
+        tracer = Tracer()
+        tracer.merge(summary.events)
+        tracer.write_chrome_trace(args.trace)
+        print(tracer.summary_table())
+        print(f"Wrote trace to {args.trace}")
+    if not args.compile:
+        return 0 if summary.failed == 0 and not invalid else 1
+
+    pdf_cache = PdfCache(args.cache_dir, max_bytes=int(args.pdf_cache_size * 1024 * 1024),
+                         enabled=not args.no_pdf_cache)
+    compiler = LatexCompiler(args.compile, cache_dir=args.cache_dir, use_format=not args.no_format,
+                             timeout=args.compile_timeout, pdf_cache=pdf_cache,
+                             max_passes=args.max_passes, bibtex=args.bibtex, biber=args.biber)
+    results = compiler.compile_many([job_for(output) for output in summary.outputs],
+                                    workers=args.compile_workers)
+    print_compile_results(results, pdf_cache, per_job=args.verbose)
+    return 0 if summary.failed == 0 and not invalid and all(r.ok for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
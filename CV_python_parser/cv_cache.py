@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Persistent caches for parsed CV data, rendered LaTeX fragments and compiled PDFs
+Parsed dictionaries are pickled under .cvcache/, looked up by path + size + mtime
+first and by content hash when the stat information changed
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import stat
+import tempfile
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: entries are still published atomically, only the bookkeeping is unlocked
+    fcntl = None
+
+
+DEFAULT_CACHE_DIR = ".cvcache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_PDF_CACHE_BYTES = 512 * 1024 * 1024
+MAX_MEMORY_FRAGMENTS = 256
+# File kinds evict_lru counts and removes
+CACHE_SUFFIXES = ('.pickle', '.ref', '.fragment')
+# Eviction goes down to this share of the bound, leaving room for many writes before the next scan
+EVICT_TO = 0.9
+
+
+class CacheBudget:
+    """Running byte total of one cache folder, so writes only scan it once the bound is passed
+
+    The folder is measured on the first write, then every write adds its size.
+    Only when the total goes over max_bytes does evict_lru list the folder,
+    which also corrects the total for what other processes wrote meanwhile;
+    it removes files down to EVICT_TO of the bound.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.total = None  # type: Optional[int]
+
+    def add(self, size: int, max_bytes: int):
+        """Account for size new bytes, evicting least recently used files when over max_bytes"""
+        if self.total is None:
+            self.total = cache_size(self.cache_dir)
+        self.total += size
+        if self.total > max_bytes:
+            self.total = evict_lru(self.cache_dir, int(max_bytes * EVICT_TO))
+
+
+# Cache folder -> its budget, shared by every cache instance of this process
+_budgets = {}  # type: Dict[Path, CacheBudget]
+
+
+def cache_budget(cache_dir: Path) -> CacheBudget:
+    """The process-wide budget of a cache folder"""
+    key = Path(cache_dir).resolve()
+    if key not in _budgets:
+        _budgets[key] = CacheBudget(key)
+    return _budgets[key]
+
+
+class ParsedDataCache:
+    """Content-addressed, size-bounded LRU store for parsed source files
+
+    Two kinds of files live in the cache folder:
+      <content sha1>.pickle  the parsed value, keyed by file bytes + version
+      <stat sha1>.ref        the content hash last seen for path/size/mtime
+    A hit on the .ref file avoids reading the source at all; a miss falls back
+    to hashing the source bytes, so touched-but-unchanged files still hit.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 enabled: bool = True, version: str = "1"):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    def _stat_key(self, filepath: Path, stat: os.stat_result) -> str:
+        raw = f"{self.version}|{filepath.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _content_key(self, data: bytes) -> str:
+        digest = hashlib.sha1(self.version.encode('utf-8'))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _read_entry(self, content_key: str) -> Any:
+        entry = self.cache_dir / f"{content_key}.pickle"
+        with open(entry, 'rb') as f:
+            value = pickle.load(f)
+        # Touch the entry so eviction sees it as recently used
+        os.utime(entry)
+        return value
+
+    def load(self, filepath: Path, parse: Callable[[bytes], Any]) -> Any:
+        """Return the parsed value of filepath, calling parse(bytes) only on a miss"""
+        filepath = Path(filepath)
+        if not self.enabled:
+            with open(filepath, 'rb') as f:
+                return parse(f.read())
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        ref_file = self.cache_dir / f"{self._stat_key(filepath, filepath.stat())}.ref"
+
+        # Fast path: same path, size and mtime as a previous run
+        try:
+            content_key = ref_file.read_text(encoding='ascii')
+            value = self._read_entry(content_key)
+            os.utime(ref_file)
+            self.hits += 1
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        content_key = self._content_key(data)
+        value = self._load_content(content_key, partial(parse, data))
+        write_atomic(ref_file, content_key.encode('ascii'))
+        cache_budget(self.cache_dir).add(len(content_key), self.max_bytes)
+        return value
+
+    def load_bytes(self, data: bytes, parse: Callable[[bytes], Any]) -> Any:
+        """Return the parsed value of source bytes that have no file of their own (archive members)"""
+        if not self.enabled:
+            return parse(data)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self._load_content(self._content_key(data), partial(parse, data))
+
+    def load_keyed(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the value stored under a key built by the caller, calling compute() only on a miss
+
+        The key must change whenever the inputs of compute do, e.g. by
+        including their paths, sizes and mtimes.
+        """
+        if not self.enabled:
+            return compute()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self._load_content(self._content_key(key.encode('utf-8')), compute)
+
+    def _load_content(self, content_key: str, compute: Callable[[], Any]) -> Any:
+        try:
+            value = self._read_entry(content_key)
+            self.hits += 1
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # A class the entry refers to may have moved, or been pickled from a script's __main__
+            self.misses += 1
+            value = compute()
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            write_atomic(self.cache_dir / f"{content_key}.pickle", payload)
+            cache_budget(self.cache_dir).add(len(payload), self.max_bytes)
+        return value
+
+    def evict(self, max_bytes: Optional[int] = None):
+        """Remove least recently used files until the cache fits in max_bytes"""
+        budget = cache_budget(self.cache_dir)
+        budget.total = evict_lru(self.cache_dir, self.max_bytes if max_bytes is None else max_bytes)
+
+
+class FragmentCache:
+    """Rendered LaTeX fragments keyed by section, renderer version and input hash
+
+    Fragments are kept in memory for the life of the parser and persisted as
+    <key>.fragment files next to the parsed-data entries, sharing their budget and eviction.
+    With persist=False only the in-memory layer is used, for callers that render
+    many short-lived variants which are not worth writing to disk.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 enabled: bool = True, version: str = "1", persist: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.version = version
+        self.persist = persist
+        self.memory = {}  # type: Dict[str, str]
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, section: str, inputs: Any) -> str:
+        """Hash of the section name, renderer version and input data"""
+        digest = hashlib.sha1(f"{self.version}|{section}|".encode('utf-8'))
+        digest.update(pickle.dumps(inputs, protocol=4))
+        return digest.hexdigest()
+
+    def render(self, section: str, inputs: Any, render: Callable[[], str]) -> str:
+        """Return the cached fragment for inputs, calling render() only on a miss"""
+        if not self.enabled:
+            return render()
+
+        key = self.key(section, inputs)
+        if key in self.memory:
+            self.hits += 1
+            return self.memory[key]
+
+        fragment_file = self.cache_dir / f"{key}.fragment"
+        if not self.persist:
+            self.misses += 1
+            fragment = render()
+        else:
+            try:
+                fragment = fragment_file.read_text(encoding='utf-8')
+                os.utime(fragment_file)
+                self.hits += 1
+            except OSError:
+                self.misses += 1
+                fragment = render()
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                payload = fragment.encode('utf-8')
+                write_atomic(fragment_file, payload)
+                cache_budget(self.cache_dir).add(len(payload), self.max_bytes)
+
+        if len(self.memory) >= MAX_MEMORY_FRAGMENTS:
+            # Dicts keep insertion order, so this drops the oldest fragment
+            del self.memory[next(iter(self.memory))]
+        self.memory[key] = fragment
+        return fragment
+
+
+def _umask() -> int:
+    """The process umask; reading it means setting it, so this is done once at import"""
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _umask()
+
+
+def replace_file(tmp_path: str, target: Path):
+    """Rename a temporary file over target, with target's permissions or those of a new file
+
+    mkstemp creates files readable by their owner only; without this every
+    output would end up 0600 instead of following the umask.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(tmp_path, mode)
+    os.replace(tmp_path, target)
+
+
+def write_atomic(target: Path, payload: bytes):
+    """Write payload to target through a temporary file and a rename"""
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        replace_file(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_if_changed(target: Path, payload: bytes) -> bool:
+    """Atomically write payload unless target already holds exactly these bytes
+
+    Leaving identical files untouched keeps their mtime, so make-style
+    consumers such as a pdflatex step can skip work. Returns True if written.
+    """
+    target = Path(target)
+    try:
+        if target.stat().st_size == len(payload) and target.read_bytes() == payload:
+            return False
+    except OSError:
+        pass
+    write_atomic(target, payload)
+    return True
+
+
+def stream_if_changed(target: Path, chunks: Iterable[str], encoding: str = 'utf-8') -> bool:
+    """Stream text chunks to target unless it already holds exactly these bytes
+
+    The chunks go through a buffered temporary file next to target while
+    being hashed, so memory stays flat however large the document is. The
+    temporary file replaces target only if the content differs.
+    """
+    target = Path(target)
+    digest = hashlib.sha1()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                data = chunk.encode(encoding)
+                digest.update(data)
+                size += len(data)
+                f.write(data)
+        if _file_matches(target, size, digest.hexdigest()):
+            os.unlink(tmp_path)
+            return False
+        replace_file(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+
+class PdfCacheStats(NamedTuple):
+    """Counters of a PDF store, shared by every process using it"""
+    entries: int
+    bytes: int
+    hits: int
+    misses: int
+    stores: int
+    evictions: int
+
+
+class PdfCache:
+    """Content-addressed store of compiled PDFs and their logs under <cache>/pdf/
+
+    Entries are <key>.pdf plus <key>.log, keyed by the caller (cv_compile
+    hashes the document and every file it reads). Hits are hardlinked to the
+    output path when the filesystem allows it, copied otherwise, so outputs
+    must be replaced rather than edited in place. Entries are published with
+    atomic renames; eviction and the stats file are updated under an flock,
+    so worker processes can share one store.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_PDF_CACHE_BYTES,
+                 enabled: bool = True, link: bool = True):
+        self.store_dir = Path(cache_dir) / "pdf"
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.store_dir / ".lock", 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _count(self, **increments: int):
+        """Add to the persistent counters; the caller holds the lock"""
+        stats_file = self.store_dir / "stats.json"
+        try:
+            counters = json.loads(stats_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            counters = {}
+        for name, increment in increments.items():
+            counters[name] = counters.get(name, 0) + increment
+        write_atomic(stats_file, json.dumps(counters).encode('utf-8'))
+
+    def fetch(self, key: str, pdf_file: Path, log_file: Path) -> bool:
+        """Put the stored PDF (and its log) for key at pdf_file; False on a miss"""
+        entry = self.store_dir / f"{key}.pdf"
+        pdf_file = Path(pdf_file)
+        tmp_path = pdf_file.with_name(f".{pdf_file.name}.{os.getpid()}.tmp")
+        try:
+            pdf_file.parent.mkdir(parents=True, exist_ok=True)
+            if self.link:
+                try:
+                    os.link(entry, tmp_path)
+                except FileNotFoundError:
+                    raise
+                except OSError:
+                    # Another filesystem, or links not supported
+                    shutil.copyfile(entry, tmp_path)
+            else:
+                shutil.copyfile(entry, tmp_path)
+            os.replace(tmp_path, pdf_file)
+            log = self.store_dir / f"{key}.log"
+            shutil.copyfile(log, log_file)
+            # The log is never linked out, so its mtime can mark the entry as recently used
+            os.utime(log)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            self.misses += 1
+            with self._locked():
+                self._count(misses=1)
+            return False
+        self.hits += 1
+        with self._locked():
+            self._count(hits=1)
+        return True
+
+    def store(self, key: str, pdf_file: Path, log_file: Path):
+        """Copy a freshly compiled PDF and its log into the store, then evict down to max_bytes"""
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        # The log goes first: a visible .pdf always has its log
+        write_atomic(self.store_dir / f"{key}.log", Path(log_file).read_bytes())
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(pdf_file, tmp_path)
+            replace_file(tmp_path, self.store_dir / f"{key}.pdf")
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._locked():
+            self._count(stores=1, evictions=self._evict())
+
+    def _entries(self) -> Dict[str, list]:
+        """Key -> [last use, total size, paths] of every stored entry"""
+        entries = {}  # type: Dict[str, list]
+        for item in os.scandir(self.store_dir):
+            if not item.is_file() or not item.name.endswith(('.pdf', '.log')):
+                continue
+            try:
+                stat = item.stat()
+            except FileNotFoundError:
+                continue
+            entry = entries.setdefault(item.name[:-4], [0, 0, []])
+            if item.name.endswith('.log'):
+                entry[0] = stat.st_mtime_ns
+            entry[1] += stat.st_size
+            entry[2].append(item.path)
+        return entries
+
+    def _evict(self) -> int:
+        """Drop least recently used entries until the store fits; the caller holds the lock"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries.values())
+        evicted = 0
+        for _, size, paths in sorted(entries.values(), key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            # The .pdf goes first so a half-removed entry is never fetched
+            for path in sorted(paths, key=lambda path: not path.endswith('.pdf')):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self) -> PdfCacheStats:
+        """Entry count and size of the store with the counters of every process"""
+        if not self.store_dir.is_dir():
+            return PdfCacheStats(0, 0, 0, 0, 0, 0)
+        with self._locked():
+            entries = self._entries()
+            try:
+                counters = json.loads((self.store_dir / "stats.json").read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                counters = {}
+        return PdfCacheStats(len(entries), sum(size for _, size, _ in entries.values()),
+                             counters.get('hits', 0), counters.get('misses', 0),
+                             counters.get('stores', 0), counters.get('evictions', 0))
+
+
+def _file_matches(target: Path, size: int, sha1: str) -> bool:
+    """Check whether target has the given size and SHA-1, reading it in blocks"""
+    try:
+        if target.stat().st_size != size:
+            return False
+        digest = hashlib.sha1()
+        with open(target, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        return digest.hexdigest() == sha1
+    except OSError:
+        return False
+
+
+def _cache_files(cache_dir: Path) -> Iterator[Tuple[os.stat_result, str]]:
+    """(stat, path) of every cache file, skipping those another process removes while listing"""
+    try:
+        entries = list(os.scandir(cache_dir))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.endswith(CACHE_SUFFIXES):
+            try:
+                if entry.is_file():
+                    yield entry.stat(), entry.path
+            except FileNotFoundError:
+                # Evicted by another process between the listing and the stat
+                continue
+
+
+def cache_size(cache_dir: Path) -> int:
+    """Total bytes of the cache files in cache_dir"""
+    return sum(stat.st_size for stat, _ in _cache_files(cache_dir))
+
+
+def evict_lru(cache_dir: Path, max_bytes: int) -> int:
+    """Remove least recently used cache files until cache_dir fits in max_bytes; returns the bytes left"""
+    files = []
+    total = 0
+    for stat, path in _cache_files(cache_dir):
+        files.append((stat.st_mtime_ns, stat.st_size, path))
+        total += stat.st_size
+    if total <= max_bytes:
+        return total
+
+    files.sort()
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # Another process evicted it first
+            pass
+        total -= size
+    return total
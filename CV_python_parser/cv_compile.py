@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+PDF compile stage - Runs pdflatex on generated .tex files over a bounded thread pool
+The fixed preamble (altacv, paracol, hyperref, fontawesome, ...) is dumped once
+into a format file, so each job only typesets the document body, and a job
+whose document and inputs were compiled before is served from the PDF cache.
+Passes are repeated only until the .aux, .out and .bbl files stop changing,
+starting from those of the previous build of the same output.
+"""
+
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from cv_cache import DEFAULT_CACHE_DIR, PdfCache, write_atomic
+from cv_trace import logger
+
+
+DEFAULT_COMPILER = "pdflatex"
+DEFAULT_BIBTEX = "bibtex"
+DEFAULT_BIBER = "biber"
+DEFAULT_TIMEOUT = 120.0
+# Passes after which a document whose auxiliary files still change is given up on, as latexmk does
+DEFAULT_MAX_PASSES = 5
+# Files a pass reads back from the previous one; unchanged after a pass means the document is final
+CONVERGENCE_SUFFIXES = ('.aux', '.out', '.bbl')
+BEGIN_DOCUMENT = '\\begin{document}'
+# Files next to the .tex that the preamble depends on
+PREAMBLE_DEPENDENCIES = ('*.cls', '*.sty')
+# ... and every file the finished PDF depends on besides the document
+DOCUMENT_DEPENDENCIES = PREAMBLE_DEPENDENCIES + ('*.bib',)
+# Files pulled in by name: \includegraphics[...]{photo}, \photo{...}, \input{...}, \addbibresource{...}
+_ASSET_RE = re.compile(r'\\(?:includegraphics|photo|input|include|addbibresource|bibliography)\*?'
+                       r'(?:\[[^\]]*\])*\{([^}]+)\}')
+_ASSET_EXTENSIONS = ('', '.pdf', '.png', '.jpg', '.jpeg', '.eps', '.tex', '.bib')
+# Aux lines the bibliography depends on: bibtex's \citation/\bibdata/\bibstyle, biblatex's \abx@aux@cite
+_CITATION_RE = re.compile(rb'^\\(?:citation|abx@aux@cite)\{', re.MULTILINE)
+_BIBLIOGRAPHY_LINE_RE = re.compile(rb'^\\(?:citation|bibdata|bibstyle|abx@aux@cite)\{.*$', re.MULTILINE)
+
+
+class CompileJob(NamedTuple):
+    """One .tex file to compile into a PDF"""
+    tex_file: str
+    pdf_file: str
+
+
+class PassTiming(NamedTuple):
+    """One run of the compiler ("latex") or of the bibliography tool ("bibtex", "biber")"""
+    tool: str
+    seconds: float
+
+
+class CompileResult(NamedTuple):
+    """Outcome of one compile job"""
+    tex_file: str
+    pdf_file: str
+    ok: bool
+    seconds: float
+    used_format: bool
+    log_file: str
+    error: str = ""
+    cached: bool = False
+    passes: Tuple[PassTiming, ...] = ()
+    reused_aux: bool = False
+
+    @property
+    def latex_passes(self) -> int:
+        return sum(1 for timing in self.passes if timing.tool == 'latex')
+
+
+def job_for(tex_file: Union[str, Path], pdf_file: Optional[Union[str, Path]] = None) -> CompileJob:
+    """Compile job writing the PDF next to tex_file unless told otherwise"""
+    tex_file = Path(tex_file)
+    return CompileJob(str(tex_file), str(pdf_file or tex_file.with_suffix('.pdf')))
+
+
+def split_preamble(text: str) -> Optional[Tuple[str, str]]:
+    """Split a document into (preamble, body) at \\begin{document}, or None"""
+    index = text.find(BEGIN_DOCUMENT)
+    if index <= 0:
+        return None
+    return text[:index], text[index:]
+
+
+def _log_tail(log: str, lines: int = 15) -> str:
+    return '\n'.join(log.splitlines()[-lines:])
+
+
+def first_error(log: str) -> str:
+    """The first TeX error line ("! ...") of a log, or its last line"""
+    lines = log.splitlines()
+    for line in lines:
+        if line.startswith('!'):
+            return line
+    return lines[-1] if lines else ''
+
+
+def document_assets(text: str, source_dir: Path) -> List[Tuple[str, Optional[Path]]]:
+    """(name, file or None if missing) of every asset the document references by name"""
+    assets = []
+    for match in _ASSET_RE.finditer(text):
+        for name in match.group(1).split(','):
+            name = name.strip()
+            found = None
+            for extension in _ASSET_EXTENSIONS:
+                candidate = source_dir / f"{name}{extension}"
+                if candidate.is_file():
+                    found = candidate
+                    break
+            assets.append((name, found))
+    return assets
+
+
+def _file_digest(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha1(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def aux_state(work: Path, jobname: str) -> Tuple[Optional[str], ...]:
+    """Digests of the files a pass reads back, None for the missing ones"""
+    return tuple(_file_digest(work / f"{jobname}{suffix}") for suffix in CONVERGENCE_SUFFIXES)
+
+
+def bibliography_tool(work: Path, jobname: str) -> Optional[str]:
+    """"biber", "bibtex" or None, from what the last pass wrote about citations
+
+    biblatex writes a .bcf control file for biber; classic \\bibliography
+    writes \\bibdata into the .aux. Either only counts when something is cited.
+    """
+    aux = work / f"{jobname}.aux"
+    content = aux.read_bytes() if aux.exists() else b''
+    if not _CITATION_RE.search(content):
+        return None
+    if (work / f"{jobname}.bcf").exists():
+        return 'biber'
+    return 'bibtex' if b'\\bibdata{' in content else None
+
+
+def bibliography_inputs(work: Path, jobname: str, source_dir: Path) -> str:
+    """Digest of everything the bibliography tool reads: citations, the .bcf and the .bib files"""
+    digest = hashlib.sha1()
+    aux = work / f"{jobname}.aux"
+    if aux.exists():
+        digest.update(b'\n'.join(_BIBLIOGRAPHY_LINE_RE.findall(aux.read_bytes())))
+    bcf = work / f"{jobname}.bcf"
+    if bcf.exists():
+        digest.update(b'|bcf|' + bcf.read_bytes())
+    for bib in sorted(source_dir.glob('*.bib')):
+        digest.update(f"|{bib.name}|".encode('utf-8'))
+        digest.update(bib.read_bytes())
+    return digest.hexdigest()
+
+
+def pages_from_log(log: str) -> Optional[int]:
+    """Page count of a finished run ("Output written on cv.pdf (2 pages, ...)")"""
+    match = re.search(r'Output written on .*?\((\d+) pages?', log)
+    return int(match.group(1)) if match else None
+
+
+class LatexCompiler:
+    """pdflatex driver with a cache of dumped preamble formats
+
+    Formats are keyed by the compiler, the preamble text and the class and
+    style files next to the document, and stored under <cache>/formats/.
+    Every job runs in its own temporary folder with TEXINPUTS pointing at the
+    document's folder, so concurrent jobs never share auxiliary files; the
+    .aux/.out/.bbl files of a finished job are kept under <cache>/aux/ and
+    seed the next build of the same output, which then usually needs a
+    single pass.
+    """
+
+    def __init__(self, command: str = DEFAULT_COMPILER, cache_dir: str = DEFAULT_CACHE_DIR,
+                 use_format: bool = True, timeout: float = DEFAULT_TIMEOUT,
+                 max_passes: int = DEFAULT_MAX_PASSES, pdf_cache: Optional[PdfCache] = None,
+                 bibtex: str = DEFAULT_BIBTEX, biber: str = DEFAULT_BIBER, reuse_aux: bool = True):
+        self.command = shlex.split(command)
+        self.pdf_cache = pdf_cache
+        self.format_dir = Path(cache_dir) / "formats"
+        self.aux_dir = Path(cache_dir) / "aux"
+        self.use_format = use_format
+        self.timeout = timeout
+        self.max_passes = max(1, max_passes)
+        self.bibliography_commands = {'bibtex': shlex.split(bibtex), 'biber': shlex.split(biber)}
+        self.reuse_aux = reuse_aux
+        self._lock = threading.Lock()
+        self._format_locks = {}  # type: Dict[str, threading.Lock]
+        self._failed_formats = set()
+
+    def _environment(self, source_dir: Path) -> Dict[str, str]:
+        env = dict(os.environ)
+        # A trailing separator keeps the TeX distribution's default search path
+        env['TEXINPUTS'] = f"{source_dir.resolve()}{os.pathsep}{env.get('TEXINPUTS', '')}"
+        env['TEXFORMATS'] = f"{self.format_dir.resolve()}{os.pathsep}{env.get('TEXFORMATS', '')}"
+        # bibtex looks for the .bib and .bst files through their own paths
+        for variable in ('BIBINPUTS', 'BSTINPUTS'):
+            env[variable] = f"{source_dir.resolve()}{os.pathsep}{env.get(variable, '')}"
+        return env
+
+    def _run(self, args: List[str], cwd: Path, env: Dict[str, str],
+             command: Optional[List[str]] = None) -> subprocess.CompletedProcess:
+        return subprocess.run((command or self.command) + args, cwd=cwd, env=env, timeout=self.timeout,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              universal_newlines=True, errors='replace')
+
+    def format_name(self, preamble: str, source_dir: Path) -> str:
+        """Format file name for a preamble and the class/style files it loads"""
+        digest = hashlib.sha1(' '.join(self.command).encode('utf-8'))
+        digest.update(preamble.encode('utf-8'))
+        for pattern in PREAMBLE_DEPENDENCIES:
+            for dependency in sorted(source_dir.glob(pattern)):
+                digest.update(dependency.name.encode('utf-8'))
+                digest.update(dependency.read_bytes())
+        return f"cvpreamble-{digest.hexdigest()[:16]}"
+
+    def document_key(self, text: str, source_dir: Path) -> str:
+        """PDF cache key: compiler, bibliography tools, pass limit, the document and every file it reads"""
+        tools = '|'.join(' '.join(command) for command in self.bibliography_commands.values())
+        digest = hashlib.sha256(f"{' '.join(self.command)}|{tools}|{self.max_passes}|".encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        dependencies = set()
+        for pattern in DOCUMENT_DEPENDENCIES:
+            dependencies.update(source_dir.glob(pattern))
+        for name, found in document_assets(text, source_dir):
+            if found is None:
+                # A missing asset keys differently from the file that later appears
+                digest.update(f"|missing:{name}".encode('utf-8'))
+            else:
+                dependencies.add(found)
+        for dependency in sorted(dependencies):
+            digest.update(f"|{dependency.name}|".encode('utf-8'))
+            digest.update(dependency.read_bytes())
+        return digest.hexdigest()
+
+    def ensure_format(self, preamble: str, source_dir: Path) -> Optional[str]:
+        """Dump the preamble into a format file once; return its name, or None on failure"""
+        name = self.format_name(preamble, source_dir)
+        with self._lock:
+            lock = self._format_locks.setdefault(name, threading.Lock())
+        with lock:
+            if name in self._failed_formats:
+                return None
+            if (self.format_dir / f"{name}.fmt").exists():
+                return name
+
+            self.format_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.TemporaryDirectory(prefix="cvformat-") as work:
+                work = Path(work)
+                (work / f"{name}.tex").write_text(preamble + '\n\\dump\n', encoding='utf-8')
+                try:
+                    result = self._run(['-ini', f'-jobname={name}', '-interaction=nonstopmode',
+                                        '&pdflatex', f'{name}.tex'], work, self._environment(source_dir))
+                    dumped = work / f"{name}.fmt"
+                    if result.returncode != 0 or not dumped.exists():
+                        raise RuntimeError(_log_tail(result.stdout, 5))
+                    # Formats are shared between processes, so publish them atomically
+                    write_atomic(self.format_dir / f"{name}.fmt", dumped.read_bytes())
+                except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+                    logger.warning(f"Could not dump the preamble format, compiling without it: {e}")
+                    self._failed_formats.add(name)
+                    return None
+        return name
+
+    def compile(self, job: CompileJob) -> CompileResult:
+        """Compile one job in an isolated temporary folder"""
+        start = time.perf_counter()
+        tex_file = Path(job.tex_file)
+        pdf_file = Path(job.pdf_file)
+        log_file = pdf_file.with_suffix('.log')
+        jobname = tex_file.stem
+        fmt = None
+        passes = []  # type: List[PassTiming]
+
+        def failure(message: str) -> CompileResult:
+            return CompileResult(job.tex_file, job.pdf_file, False, time.perf_counter() - start,
+                                 fmt is not None, str(log_file), message, passes=tuple(passes))
+
+        try:
+            text = tex_file.read_text(encoding='utf-8')
+        except OSError as e:
+            return failure(str(e))
+
+        source_dir = tex_file.parent
+        key = None
+        if self.pdf_cache is not None and self.pdf_cache.enabled:
+            key = self.document_key(text, source_dir)
+            if self.pdf_cache.fetch(key, pdf_file, log_file):
+                return CompileResult(job.tex_file, job.pdf_file, True, time.perf_counter() - start,
+                                     False, str(log_file), cached=True)
+        parts = split_preamble(text) if self.use_format else None
+        if parts is not None:
+            fmt = self.ensure_format(parts[0], source_dir)
+        args = ['-interaction=nonstopmode', '-halt-on-error', f'-jobname={jobname}']
+        if fmt is not None:
+            args.insert(0, f'-fmt={fmt}')
+            text = parts[1]
+
+        pdf_file.parent.mkdir(parents=True, exist_ok=True)
+        reused = False
+        with tempfile.TemporaryDirectory(prefix="cvcompile-") as work:
+            work = Path(work)
+            (work / f"{jobname}.tex").write_text(text, encoding='utf-8')
+            env = self._environment(source_dir)
+            output = ''
+            try:
+                reused, bibliography = self._restore_aux(pdf_file, work, jobname)
+                result, bibliography = self._typeset(args, jobname, work, env, source_dir, bibliography, passes)
+                if reused and result.returncode != 0 and passes[-1].tool == 'latex':
+                    # Stale auxiliary files can break a run; start over from a clean folder
+                    for suffix in CONVERGENCE_SUFFIXES:
+                        (work / f"{jobname}{suffix}").unlink(missing_ok=True)
+                    reused = False
+                    result, bibliography = self._typeset(args, jobname, work, env, source_dir, None, passes)
+                output = result.stdout
+            except subprocess.TimeoutExpired:
+                return failure(f"timed out after {self.timeout:g}s")
+            except OSError as e:
+                return failure(f"could not run {e.filename or self.command[0]}: {e}")
+            finally:
+                # Keep the log of every run, successful or not
+                tex_log = work / f"{jobname}.log"
+                log = tex_log.read_text(encoding='utf-8', errors='replace') if tex_log.exists() else output
+                log_file.write_text(log, encoding='utf-8')
+
+            produced = work / f"{jobname}.pdf"
+            if result.returncode != 0 or not produced.exists():
+                tool = passes[-1].tool
+                if tool != 'latex':
+                    return failure(f"{tool} exit code {result.returncode}: {first_error(output)}")
+                return failure(f"exit code {result.returncode}: {first_error(log)}")
+            shutil.move(str(produced), str(pdf_file))
+            self._store_aux(pdf_file, work, jobname, bibliography)
+        if key is not None:
+            try:
+                self.pdf_cache.store(key, pdf_file, log_file)
+            except OSError as e:
+                logger.warning(f"Could not store {pdf_file} in the PDF cache: {e}")
+
+        return CompileResult(job.tex_file, job.pdf_file, True, time.perf_counter() - start,
+                             fmt is not None, str(log_file), passes=tuple(passes), reused_aux=reused)
+
+    def _typeset(self, args: List[str], jobname: str, work: Path, env: Dict[str, str], source_dir: Path,
+                 bibliography: Optional[str], passes: List[PassTiming]
+                 ) -> Tuple[subprocess.CompletedProcess, Optional[str]]:
+        """Run passes until the auxiliary files are stable, the bibliography tool when citations changed
+
+        bibliography is the digest of the bibliography inputs the .bbl in work
+        was made from (None if unknown). Every run is timed into passes.
+        Returns the last run and the digest of the .bbl now in work.
+        """
+        for _ in range(self.max_passes):
+            before = aux_state(work, jobname)
+            started = time.perf_counter()
+            result = self._run(args + [f'{jobname}.tex'], work, env)
+            passes.append(PassTiming('latex', time.perf_counter() - started))
+            if result.returncode != 0:
+                return result, bibliography
+            tool = bibliography_tool(work, jobname)
+            if tool is not None:
+                inputs = bibliography_inputs(work, jobname, source_dir)
+                if inputs != bibliography:
+                    started = time.perf_counter()
+                    tool_args = [f'--input-directory={source_dir.resolve()}'] if tool == 'biber' else []
+                    bib_result = self._run(tool_args + [jobname], work, env, self.bibliography_commands[tool])
+                    passes.append(PassTiming(tool, time.perf_counter() - started))
+                    if bib_result.returncode != 0:
+                        return bib_result, None
+                    bibliography = inputs
+                    continue
+            if aux_state(work, jobname) == before:
+                return result, bibliography
+        logger.warning(f"{jobname}: auxiliary files still changing after {self.max_passes} passes")
+        return result, bibliography
+
+    def _aux_store(self, pdf_file: Path) -> Path:
+        """Folder keeping the auxiliary files of the previous build of an output"""
+        digest = hashlib.sha1(f"{' '.join(self.command)}|{pdf_file.resolve()}".encode('utf-8'))
+        return self.aux_dir / digest.hexdigest()[:16]
+
+    def _restore_aux(self, pdf_file: Path, work: Path, jobname: str) -> Tuple[bool, Optional[str]]:
+        """Copy the previous build's auxiliary files into work; (any restored, bibliography digest)"""
+        if not self.reuse_aux:
+            return False, None
+        store = self._aux_store(pdf_file)
+        restored = False
+        for suffix in CONVERGENCE_SUFFIXES:
+            kept = store / f"aux{suffix}"
+            if kept.exists():
+                shutil.copyfile(str(kept), str(work / f"{jobname}{suffix}"))
+                restored = True
+        digest = store / "bibliography"
+        if not restored or not digest.exists():
+            return restored, None
+        return True, digest.read_text(encoding='utf-8') or None
+
+    def _store_aux(self, pdf_file: Path, work: Path, jobname: str, bibliography: Optional[str]):
+        if not self.reuse_aux:
+            return
+        store = self._aux_store(pdf_file)
+        try:
+            store.mkdir(parents=True, exist_ok=True)
+            for suffix in CONVERGENCE_SUFFIXES:
+                produced = work / f"{jobname}{suffix}"
+                if produced.exists():
+                    write_atomic(store / f"aux{suffix}", produced.read_bytes())
+                else:
+                    (store / f"aux{suffix}").unlink(missing_ok=True)
+            write_atomic(store / "bibliography", (bibliography or '').encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Could not keep the auxiliary files of {pdf_file}: {e}")
+
+    def compile_many(self, jobs: Iterable[CompileJob], workers: Optional[int] = None) -> List[CompileResult]:
+        """Compile jobs over a bounded thread pool, results in job order
+
+        Threads are enough here: every job spends its time in a pdflatex child process.
+        """
+        jobs = list(jobs)
+        workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+        if workers == 1:
+            return [self.compile(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self.compile, jobs))
+
+
+def format_passes(passes: Iterable[PassTiming]) -> str:
+    """Pass timings on one line, such as: latex 0.41s, bibtex 0.02s, latex 0.38s"""
+    return ', '.join(f"{timing.tool} {timing.seconds:.2f}s" for timing in passes)
+
+
+def print_compile_results(results: List[CompileResult], pdf_cache: Optional[PdfCache] = None,
+                          per_job: bool = False):
+    """Print a one-line summary, the passes run, and every failure; per_job adds each job's pass timings"""
+    succeeded = sum(1 for r in results if r.ok)
+    total_seconds = sum(r.seconds for r in results)
+    with_format = sum(1 for r in results if r.used_format)
+    cached = sum(1 for r in results if r.cached)
+    print(f"Compiled {succeeded}/{len(results)} PDFs ({cached} from the PDF cache, {with_format} with "
+          f"the preamble format, {total_seconds:.2f}s compile time)")
+    if pdf_cache is not None and pdf_cache.enabled:
+        stats = pdf_cache.stats()
+        print(f"PDF cache: {stats.entries} entries, {stats.bytes / (1024 * 1024):.1f} MiB; "
+              f"{stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions so far")
+    compiled = [r for r in results if r.passes]
+    if compiled:
+        latex = [timing.seconds for r in compiled for timing in r.passes if timing.tool == 'latex']
+        bibliography = sum(1 for r in compiled for timing in r.passes if timing.tool != 'latex')
+        reused = sum(1 for r in compiled if r.reused_aux)
+        print(f"Passes: {len(latex)} latex ({len(latex) / len(compiled):.1f} per PDF, "
+              f"{sum(latex) / max(1, len(latex)):.2f}s each on average), {bibliography} bibliography runs, "
+              f"{reused}/{len(compiled)} started from the previous build's aux files")
+    for result in results:
+        if per_job and result.passes:
+            print(f"  {result.tex_file}: {format_passes(result.passes)}")
+        if not result.ok:
+            print(f"  FAILED {result.tex_file}: {result.error} (log: {result.log_file})")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Batch journal - Append-only record of finished batch items, for resumable and sharded runs
+Every rendered item is appended as one JSON line with the hash of its inputs, so a
+restarted run skips the items already done with unchanged inputs. Items are split
+over shards by a hash of their name; merge combines the journals of every shard.
+
+    python cv_batch.py --manifest jobs.json --shard 0/4 --journal journals/0.jsonl
+    python cv_journal.py merge journals/*.jsonl -o summary.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from cv_trace import percentile
+
+
+JOURNAL_VERSION = 1
+
+
+class JournalEntry(NamedTuple):
+    """Outcome of one item as recorded in a journal"""
+    name: str
+    output_file: str
+    input_hash: str
+    ok: bool
+    seconds: float
+    error: str = ""
+    shard: str = "0/1"
+
+
+class MergedSummary(NamedTuple):
+    """Combined outcome of the journals of every shard; the last record of an item wins"""
+    shards: List[str]
+    total: int
+    succeeded: int
+    failed: int
+    wall_seconds: float
+    render_seconds: float
+    p50_seconds: float
+    p99_seconds: float
+    failures: List[JournalEntry]
+    missing: List[str]
+    missing_shards: List[str]
+    reassigned: List[str]
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """"I/N" -> (I, N), with 0 <= I < N"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"invalid shard {text!r}, expected INDEX/COUNT such as 0/4") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"invalid shard {text!r}, INDEX must be in 0..COUNT-1")
+    return index, count
+
+
+def shard_of(name: str, count: int) -> int:
+    """Shard owning an item; stable across processes, machines and Python versions"""
+    return int.from_bytes(hashlib.sha1(name.encode('utf-8')).digest()[:8], 'big') % count
+
+
+def read_journal(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Records of a journal in order; a line torn by a crash mid-write is skipped"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+    except FileNotFoundError:
+        return
+
+
+def _entry(record: Dict[str, Any]) -> JournalEntry:
+    return JournalEntry(record['name'], record['output'], record['input'], record['ok'],
+                        record['seconds'], record.get('error', ''), record.get('shard', '0/1'))
+
+
+class Journal:
+    """Append-only journal of one shard's runs
+
+    Lines are written with a single O_APPEND write each and synced once per
+    batch of results, so a crash loses at most the results of the chunks
+    still in flight and never corrupts earlier lines.
+    """
+
+    def __init__(self, path: Union[str, Path], shard: Tuple[int, int] = (0, 1)):
+        self.path = Path(path)
+        self.shard = f"{shard[0]}/{shard[1]}"
+        self.done = {}  # type: Dict[str, JournalEntry]
+        for record in read_journal(self.path):
+            if record.get('event') == 'item':
+                self.done[record['name']] = _entry(record)
+        self._fd = None  # type: Optional[int]
+
+    def is_done(self, name: str, input_hash: str, output_file: str) -> bool:
+        """Whether name was rendered before from the same inputs and its output is still there"""
+        entry = self.done.get(name)
+        return (entry is not None and entry.ok and entry.input_hash == input_hash
+                and entry.output_file == output_file and os.path.exists(output_file))
+
+    def _append(self, records: Iterable[Dict[str, Any]]):
+        payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        if not payload:
+            return
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            # End a line torn by a crash, so that it does not swallow the first new record
+            size = os.fstat(self._fd).st_size
+            if size and os.pread(self._fd, 1, size - 1) != b'\n':
+                payload = '\n' + payload
+        os.write(self._fd, payload.encode('utf-8'))
+        os.fsync(self._fd)
+
+    def record(self, entries: Iterable[JournalEntry]):
+        """Append finished items and make them durable"""
+        records = []
+        for entry in entries:
+            self.done[entry.name] = entry
+            records.append({'event': 'item', 'name': entry.name, 'output': entry.output_file,
+                            'input': entry.input_hash, 'ok': entry.ok, 'seconds': round(entry.seconds, 6),
+                            'error': entry.error, 'shard': entry.shard})
+        self._append(records)
+
+    def start(self, names: Optional[Iterable[str]] = None):
+        """Append the start-of-run record, with the names this shard owns when they are known upfront"""
+        self._append([{'event': 'start', 'version': JOURNAL_VERSION, 'shard': self.shard,
+                       'items': None if names is None else list(names), 'time': time.time()}])
+
+    def finish(self, rendered: int, skipped: int, wall_seconds: float):
+        """Append the end-of-run record that merge uses for per-shard wall time"""
+        self._append([{'event': 'run', 'version': JOURNAL_VERSION, 'shard': self.shard, 'rendered': rendered,
+                       'skipped': skipped, 'wall_seconds': round(wall_seconds, 6), 'time': time.time()}])
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def merge_journals(paths: Iterable[Union[str, Path]]) -> MergedSummary:
+    """Combine shard journals
+
+    Items a shard planned at its start but never finished are reported
+    missing, and so are the shards of the run that left no journal. Wall time
+    is that of the slowest shard, summed over its runs, since the shards run
+    side by side. Items found under more than one shard (the shard count
+    changed between runs) are listed as reassigned.
+    """
+    entries = {}  # type: Dict[str, JournalEntry]
+    owners = {}  # type: Dict[str, set]
+    planned = {}  # type: Dict[str, None]
+    shard_wall = {}  # type: Dict[str, float]
+    for path in paths:
+        for record in read_journal(path):
+            event = record.get('event')
+            if event == 'item':
+                entry = _entry(record)
+                entries[entry.name] = entry
+                owners.setdefault(entry.name, set()).add(entry.shard)
+            elif event == 'start':
+                shard_wall.setdefault(record['shard'], 0.0)
+                planned.update(dict.fromkeys(record.get('items') or ()))
+            elif event == 'run':
+                shard_wall[record['shard']] = shard_wall.get(record['shard'], 0.0) + record['wall_seconds']
+
+    latencies = sorted(entry.seconds for entry in entries.values())
+    failures = [entry for entry in entries.values() if not entry.ok]
+    shards = set(shard_wall) | {entry.shard for entry in entries.values()}
+    counts = {parse_shard(shard)[1] for shard in shards}
+    return MergedSummary(
+        shards=sorted(shards, key=parse_shard),
+        total=len(entries),
+        succeeded=len(entries) - len(failures),
+        failed=len(failures),
+        wall_seconds=max(shard_wall.values(), default=0.0),
+        render_seconds=sum(latencies),
+        p50_seconds=percentile(latencies, 0.50),
+        p99_seconds=percentile(latencies, 0.99),
+        failures=failures,
+        missing=[name for name in planned if name not in entries],
+        missing_shards=[f"{index}/{count}" for count in sorted(counts) for index in range(count)
+                        if f"{index}/{count}" not in shards],
+        reassigned=sorted(name for name, shards in owners.items() if len(shards) > 1),
+    )
+
+
+def print_merged(summary: MergedSummary):
+    """Print a human readable merged summary"""
+    print(f"{len(summary.shards)} shards: rendered {summary.succeeded}/{summary.total} CVs, "
+          f"{summary.wall_seconds:.2f}s wall on the slowest shard, {summary.render_seconds:.2f}s of rendering")
+    print(f"Per-CV latency: p50 {summary.p50_seconds * 1000:.1f} ms, p99 {summary.p99_seconds * 1000:.1f} ms")
+    for failure in summary.failures:
+        print(f"  FAILED {failure.name} (shard {failure.shard}): {failure.error}")
+    if summary.missing:
+        print(f"  {len(summary.missing)} items not done yet: {', '.join(summary.missing[:10])}"
+              f"{' ...' if len(summary.missing) > 10 else ''}")
+    if summary.missing_shards:
+        print(f"  No journal from shards {', '.join(summary.missing_shards)}")
+    if summary.reassigned:
+        print(f"  {len(summary.reassigned)} items were rendered by more than one shard")
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Command line entry point for merging shard journals"""
+    arg_parser = argparse.ArgumentParser(description="Combine the journals of sharded batch runs")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    merge = commands.add_parser("merge", help="Merge shard journals into one summary")
+    merge.add_argument("journals", nargs="+", help="Journal files written with cv_batch.py --journal")
+    merge.add_argument("-o", "--output", help="Write the merged summary as JSON")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        summary = merge_journals(args.journals)
+    except (KeyError, ValueError) as e:
+        arg_parser.error(f"invalid journal: {e}")
+    print_merged(summary)
+    if args.output:
+        payload = summary._asdict()
+        payload['failures'] = [failure._asdict() for failure in summary.failures]
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"Wrote merged summary to {args.output}")
+    return 0 if summary.failed == 0 and not summary.missing and not summary.missing_shards else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Page-fit estimator - Predicts column heights without running pdflatex
+Text is measured with bundled character widths, wrapped to the paracol
+column width derived from the template geometry, and stacked using the
+vertical skips of altacv.cls. The fitter then picks entry spacing, and if
+needed drops the lowest-priority highlights, until the estimate fits.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from cv_plan import RenderPlan, load_layout
+from cv_template import TemplateParams
+
+
+class EntrySpacing(NamedTuple):
+    """Vertical space between experience and side-project entries
+
+    The larger gap follows entries with many highlights or tags.
+    """
+    experience_large: str = '4pt'
+    experience_small: str = '2pt'
+    project_large: str = '6pt'
+    project_small: str = '4pt'
+
+
+# Spacing tried by the fitter, loosest first; the first one is the parser default
+SPACING_PRESETS = [
+    ('default', EntrySpacing()),
+    ('compact', EntrySpacing('2pt', '1pt', '3pt', '2pt')),
+    ('tight', EntrySpacing('0pt', '0pt', '1pt', '0pt')),
+]
+
+# Advance widths of printable ASCII (32-126) in 1/1000 em, regular and bold.
+# These are the Helvetica AFM widths; FONT_SCALE narrows them to the Lato
+# used by the template and is the main calibration knob of the estimator.
+_REGULAR_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+# Width used for characters outside printable ASCII (accents, arrows, symbols)
+_DEFAULT_WIDTH = 600
+FONT_SCALE = 0.94
+# Lato's x-height, for ex-based lengths
+EX_PER_EM = 0.51
+
+# (font size, baselineskip) in pt per size command, by document base size
+FONT_SIZES = {
+    9: {'footnotesize': (7, 8), 'small': (8, 9.5), 'normalsize': (9, 11), 'large': (10.95, 13.6),
+        'Large': (12, 14.5), 'LARGE': (14.4, 18), 'Huge': (20.74, 25)},
+    10: {'footnotesize': (8, 9.5), 'small': (9, 11), 'normalsize': (10, 12), 'large': (12, 14),
+         'Large': (14.4, 18), 'LARGE': (17.28, 22), 'Huge': (24.88, 30)},
+    11: {'footnotesize': (9, 11), 'small': (10, 12), 'normalsize': (10.95, 13.6), 'large': (12, 14),
+         'Large': (14.4, 18), 'LARGE': (17.28, 22), 'Huge': (24.88, 30)},
+    12: {'footnotesize': (10, 12), 'small': (10.95, 13.6), 'normalsize': (12, 14.5), 'large': (14.4, 18),
+         'Large': (17.28, 22), 'LARGE': (20.74, 25), 'Huge': (24.88, 30)},
+}
+
+# Paper sizes (width, height) in TeX points
+PAPER_SIZES = {
+    'a4paper': (597.50787, 845.04684),
+    'letterpaper': (614.295, 794.96999),
+}
+UNITS = {'pt': 1.0, 'bp': 1.00375, 'mm': 2.845276, 'cm': 28.45276, 'in': 72.27}
+
+# Skips used by LaTeX and altacv.cls
+SMALLSKIP, MEDSKIP, BIGSKIP = 3.0, 6.0, 12.0
+# ... and how far TeX may shrink them (minus 1pt, 2pt, 4pt) to keep a block on the page
+SMALLSKIP_SHRINK, MEDSKIP_SHRINK, BIGSKIP_SHRINK = 1.0, 2.0, 4.0
+COLUMN_SEP = 10.0
+# enumitem: itemsep and the skip after a list are 0.25\baselineskip
+LIST_SKIP = 0.25
+
+_MARKUP_RE = re.compile(r'\*\*|\*|`|\[([^\]]*)\]\([^)]*\)')
+
+
+def to_points(length: str) -> float:
+    """Convert a TeX length such as "1.5cm" to points"""
+    match = re.fullmatch(r'\s*(-?[\d.]+)\s*([a-z]{2})\s*', length)
+    if not match or match.group(2) not in UNITS:
+        raise ValueError(f"unsupported length: {length!r}")
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+
+def plain_text(text: str) -> str:
+    """Inline markup reduced to the characters that end up on the page"""
+    return _MARKUP_RE.sub(lambda match: match.group(1) or '', str(text))
+
+
+class Page(NamedTuple):
+    """Geometry derived from the template parameters"""
+    text_width: float
+    text_height: float
+    column_width: float
+    sizes: Dict[str, Tuple[float, float]]
+
+    @classmethod
+    def from_params(cls, params: TemplateParams) -> 'Page':
+        options = [option.strip() for option in params.class_options.split(',')]
+        paper = next((PAPER_SIZES[option] for option in options if option in PAPER_SIZES), PAPER_SIZES['a4paper'])
+        base = next((int(option[:-2]) for option in options
+                     if option.endswith('pt') and option[:-2].isdigit() and int(option[:-2]) in FONT_SIZES), 10)
+        text_width = paper[0] - to_points(params.margin_left) - to_points(params.margin_right)
+        text_height = paper[1] - to_points(params.margin_top) - to_points(params.margin_bottom)
+        return cls(text_width, text_height, (text_width - COLUMN_SEP) / 2, FONT_SIZES[base])
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    """Width of text in points at the given font size"""
+    widths = _BOLD_WIDTHS if bold else _REGULAR_WIDTHS
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += widths[code - 32] if 32 <= code <= 126 else _DEFAULT_WIDTH
+    return total * size * FONT_SCALE / 1000
+
+
+@lru_cache(maxsize=65536)
+def line_count(text: str, size: float, width: float, bold: bool = False) -> int:
+    """Lines taken by text wrapped greedily at word boundaries"""
+    words = str(text).split()
+    if not words:
+        return 0
+    space = text_width(' ', size, bold)
+    lines = 1
+    used = 0.0
+    for word in words:
+        word_width = text_width(word, size, bold)
+        if used and used + space + word_width > width:
+            lines += 1
+            used = word_width
+        else:
+            used += (space if used else 0.0) + word_width
+        # A word wider than the line overflows onto the following lines
+        while used > width:
+            lines += 1
+            used -= width
+    return lines
+
+
+class ColumnEstimator:
+    """Heights, in points, of the blocks the layout stacks in each column"""
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.width = page.column_width
+
+    def size(self, name: str) -> Tuple[float, float]:
+        return self.page.sizes[name]
+
+    def lines(self, text: Any, size_name: str, width: Optional[float] = None, bold: bool = False) -> float:
+        """Height of text wrapped at width; values that are not strings are measured as str() writes them"""
+        size, skip = self.size(size_name)
+        return line_count(text if isinstance(text, str) else str(text), size, width or self.width, bold) * skip
+
+    def section(self) -> float:
+        """\\cvsection: big skip, uppercase heading, rule, medium skip"""
+        large, large_skip = self.size('LARGE')
+        return BIGSKIP + large_skip - large * EX_PER_EM + self.size('normalsize')[1] + MEDSKIP
+
+    @staticmethod
+    def section_shrink() -> float:
+        return BIGSKIP_SHRINK + MEDSKIP_SHRINK
+
+    def event(self, title: str, subtitle: str, dates: str, location: str) -> float:
+        """\\cvevent: title, optional subtitle, then dates and location on one line"""
+        height = self.lines(title, 'large', bold=True) + SMALLSKIP
+        if subtitle:
+            height += self.lines(subtitle, 'normalsize', bold=True) + SMALLSKIP
+        if dates or location:
+            height += self.size('small')[1]
+        return height + MEDSKIP
+
+    @staticmethod
+    def event_shrink(subtitle: str) -> float:
+        return (2 if subtitle else 1) * SMALLSKIP_SHRINK + MEDSKIP_SHRINK
+
+    def itemize(self, items: Sequence[str]) -> float:
+        """An itemize list in \\small with enumitem's itemsep and after-skip"""
+        if not items:
+            return 0.0
+        size, skip = self.size('small')
+        indent = text_width('•', size) + 0.5 * size
+        height = sum(line_count(plain_text(item), size, self.width - indent) * skip for item in items)
+        return height + (len(items) - 1) * LIST_SKIP * skip + LIST_SKIP * skip
+
+    def tags(self, tags: Sequence[str]) -> float:
+        """Rows of \\cvtag boxes wrapped at the column width"""
+        if not tags:
+            return 0.0
+        size, _ = self.size('normalsize')
+        ex = size * EX_PER_EM
+        padding = 2 * ex + 0.8 + text_width(' ', size)
+        rows, used = 1, 0.0
+        for tag in tags:
+            box = text_width(str(tag), size) + padding
+            if used and used + box > self.width:
+                rows += 1
+                used = 0.0
+            used += box
+        return rows * (3.25 * ex + 1.0)
+
+    def categories(self, categories: Sequence[Any], spacing: float) -> float:
+        """Category name line plus the wrapped " | "-joined items, separated by spacing"""
+        blocks = [category for category in categories if category.items is not None]
+        height = 0.0
+        for category in blocks:
+            height += self.size('normalsize')[1] * line_count(str(category.name), self.size('normalsize')[0],
+                                                               self.width, True)
+            height += self.lines(' | '.join(str(item) for item in category.items), 'normalsize')
+        return height + spacing * max(0, len(categories) - 1)
+
+
+class ColumnHeights(NamedTuple):
+    """Estimated natural heights of the two columns of one paracol part
+
+    The shrink fields are how much glue TeX can squeeze out of each column;
+    a column fits when its height minus its shrink fits the capacity.
+    """
+    name: str
+    left: float
+    right: float
+    first_page_capacity: float
+    pages: int
+    left_shrink: float = 0.0
+    right_shrink: float = 0.0
+
+    def overflow(self) -> float:
+        """How far the taller column, fully shrunk, runs past the first page"""
+        return max(self.left - self.left_shrink, self.right - self.right_shrink) - self.first_page_capacity
+
+
+class LayoutEstimate(NamedTuple):
+    """Predicted page count and the column heights behind it"""
+    pages: int
+    parts: Tuple[ColumnHeights, ...]
+    text_height: float
+
+
+def _entries_height(estimator: ColumnEstimator, entries: Sequence[Any], subtitle_field: str,
+                    large_gap: float, small_gap: float, many_highlights: int, many_tags: int) -> Tuple[float, float]:
+    """Natural height and shrink of a run of \\cvevent entries with their lists and tags"""
+    height = shrink = 0.0
+    last = len(entries) - 1
+    for i, entry in enumerate(entries):
+        subtitle = getattr(entry, subtitle_field)
+        height += estimator.event(entry.title, subtitle, entry.dates, entry.location)
+        shrink += estimator.event_shrink(subtitle)
+        items = list(entry.highlights)
+        # Side projects list their public links as extra items
+        url = getattr(entry, 'url', '')
+        if items and url and url != "Not public yet":
+            items.extend(link.strip() for link in url.split(','))
+        height += estimator.itemize(items)
+        height += estimator.tags(entry.tags)
+        if i < last:
+            busy = len(entry.highlights) > many_highlights or len(entry.tags) > many_tags
+            height += large_gap if busy else small_gap
+    return height, shrink
+
+
+def _part(name: str, left: Tuple[float, float], right: Tuple[float, float], capacity: float,
+          text_height: float) -> ColumnHeights:
+    """Column heights of one part and the pages it takes, capacity being the room left on its first page"""
+    part = ColumnHeights(name, left[0], right[0], capacity, 1, left[1], right[1])
+    overflow = part.overflow()
+    if overflow > 0:
+        part = part._replace(pages=1 + math.ceil(overflow / text_height))
+    return part
+
+
+def _block_height(estimator: ColumnEstimator, section: str, data: Any,
+                  spacing: EntrySpacing) -> Tuple[float, float]:
+    """Natural height and shrink of one layout block: its heading and rendered section"""
+    height, shrink = estimator.section(), estimator.section_shrink()
+    if section == 'experience':
+        if not data.experiences:
+            return height + 4.0, shrink
+        entries = _entries_height(estimator, data.experiences, 'company', to_points(spacing.experience_large),
+                                  to_points(spacing.experience_small), 3, 5)
+    elif section == 'side_projects':
+        entries = _entries_height(estimator, data.side_projects, 'role', to_points(spacing.project_large),
+                                  to_points(spacing.project_small), 2, 4)
+    elif section == 'diplomas':
+        entries = (sum(estimator.event(diploma.title, diploma.school, diploma.years, diploma.location)
+                       for diploma in data.diplomas),
+                   sum(estimator.event_shrink(diploma.school) for diploma in data.diplomas))
+    elif section == 'languages':
+        entries = (estimator.itemize([language.name for language in data.languages]), 0.0)
+    else:
+        # Skill categories; hard skills are set closer together
+        entries = (estimator.categories(getattr(data, section), 0.5 if section == 'hard_skills' else 1.0), 0.0)
+    return height + entries[0], shrink + entries[1]
+
+
+def estimate_layout(data: Any, params: TemplateParams, spacing: EntrySpacing,
+                    plan: Optional[RenderPlan] = None) -> LayoutEstimate:
+    """Estimate the page count of the document the parser would render
+
+    data is anything with the parser's section attributes (profile,
+    experiences, ...), usually the parser itself; plan is the layout,
+    the default one when omitted. Each page of the plan is one part.
+    """
+    plan = plan or load_layout('default')
+    page = Page.from_params(params)
+    estimator = ColumnEstimator(page)
+    full = page.text_width
+
+    # Full-width header and profile above the columns of the first page
+    header = header_shrink = 0.0
+    if data.profile and plan.header:
+        header += estimator.size('Huge')[1] + MEDSKIP + estimator.lines(data.profile.tagline, 'large', full, True)
+        header += MEDSKIP + MEDSKIP
+        header_shrink += 3 * MEDSKIP_SHRINK
+        contact = data.profile.contact
+        if contact:
+            size, skip = estimator.size('footnotesize')
+            entries = [str(value) for value in contact if value is not None]
+            rows, used = 1, 0.0
+            for entry in entries:
+                box = text_width(entry, size, True) + 1.5 * size + 2 * size
+                if used and used + box > full:
+                    rows += 1
+                    used = 0.0
+                used += box
+            header += rows * skip
+        if data.profile.summary:
+            header += estimator.section() + estimator.lines(plain_text(data.profile.summary), 'normalsize', full)
+            header += 4.0
+            header_shrink += estimator.section_shrink()
+
+    parts = []
+    # The header's own glue also gives way, leaving the first part a little more room
+    text_height = page.text_height
+    capacity = text_height - header + header_shrink
+    for columns in plan.pages:
+        heights = []
+        for column in columns:
+            height = shrink = 0.0
+            for block in column:
+                if block.optional and not getattr(data, block.attribute):
+                    continue
+                block_height, block_shrink = _block_height(estimator, block.section, data, spacing)
+                height += block_height + (to_points(block.space_before) if block.space_before else 0.0)
+                shrink += block_shrink
+            heights.append((height, shrink))
+        if len(heights) < 2:
+            heights.append((0.0, 0.0))
+        parts.append(_part(columns[0][0].section, heights[0], heights[1], capacity, text_height))
+        capacity = text_height
+    return LayoutEstimate(sum(part.pages for part in parts), tuple(parts), text_height)
+
+
+class FitResult(NamedTuple):
+    """Spacing and trimmed entries chosen to fit a page target"""
+    fits: bool
+    spacing_name: str
+    spacing: EntrySpacing
+    experiences: Tuple[Any, ...]
+    side_projects: Tuple[Any, ...]
+    dropped: List[Tuple[str, str]]
+    estimate: LayoutEstimate
+
+
+# Sections whose entries have highlights the fitter may drop
+_ENTRY_ATTRIBUTES = ('experiences', 'side_projects')
+
+
+class _Trimmed(NamedTuple):
+    """The parser's sections with some entries replaced, for re-estimating"""
+    profile: Any
+    experiences: Tuple[Any, ...]
+    diplomas: Tuple[Any, ...]
+    hard_skills: Tuple[Any, ...]
+    soft_skills: Tuple[Any, ...]
+    languages: Tuple[Any, ...]
+    interests: Tuple[Any, ...]
+    side_projects: Tuple[Any, ...]
+
+
+def _drop_highlights(entries: Tuple[Any, ...], estimator: ColumnEstimator, needed: float,
+                     min_highlights: int) -> Tuple[Tuple[Any, ...], List[Tuple[str, str]]]:
+    """Drop highlights until about needed points are freed
+
+    Each round removes the last highlight of the entry with the most; later
+    entries give up ties, and every entry keeps min_highlights of them.
+    """
+    entries = list(entries)
+    dropped = []  # type: List[Tuple[str, str]]
+    freed = 0.0
+    while freed < needed:
+        best = None
+        for i, entry in enumerate(entries):
+            if len(entry.highlights) > min_highlights and (
+                    best is None or len(entry.highlights) >= len(entries[best].highlights)):
+                best = i
+        if best is None:
+            break
+        entry = entries[best]
+        entries[best] = entry._replace(highlights=entry.highlights[:-1])
+        dropped.append((entry.key, entry.highlights[-1]))
+        freed += estimator.itemize([entry.highlights[-1]])
+    return tuple(entries), dropped
+
+
+def fit_layout(data: Any, pages: int, params: TemplateParams, min_highlights: int = 1,
+               plan: Optional[RenderPlan] = None) -> FitResult:
+    """Choose the loosest spacing that fits, else drop highlights under the tightest spacing
+
+    Highlights are only dropped from the entries (experience or side projects)
+    of the taller column of a part spilling onto an extra page, and every
+    entry keeps at least min_highlights of them. Each round drops enough
+    highlights to cover the measured overflow, then re-estimates.
+    """
+    plan = plan or load_layout('default')
+    current = _Trimmed(*(getattr(data, field) for field in _Trimmed._fields))
+    for name, spacing in SPACING_PRESETS:
+        estimate = estimate_layout(current, params, spacing, plan)
+        if estimate.pages <= pages:
+            return FitResult(True, name, spacing, current.experiences, current.side_projects, [], estimate)
+
+    name, spacing = SPACING_PRESETS[-1]
+    # Give up at once if even the fully trimmed entries cannot fit
+    floor = current._replace(**{attribute: tuple(entry._replace(highlights=entry.highlights[:min_highlights])
+                                                  for entry in getattr(current, attribute))
+                                for attribute in _ENTRY_ATTRIBUTES})
+    floor_estimate = estimate_layout(floor, params, spacing, plan)
+    if floor_estimate.pages > pages:
+        return FitResult(False, name, spacing, current.experiences, current.side_projects, [], estimate)
+
+    estimator = ColumnEstimator(Page.from_params(params))
+    dropped = []  # type: List[Tuple[str, str]]
+    while estimate.pages > pages:
+        # Parts that spill, with the entries of their taller column; trim the smallest spill first
+        spills = []
+        for part, columns in zip(estimate.parts, plan.pages):
+            if part.pages > 1:
+                taller = columns[0 if part.left - part.left_shrink >= part.right - part.right_shrink else 1]
+                spills.extend((part.overflow() - (part.pages - 2) * estimate.text_height, block.attribute)
+                              for block in taller if block.attribute in _ENTRY_ATTRIBUTES)
+        trimmed = None
+        for needed, attribute in sorted(spills):
+            entries, trimmed = _drop_highlights(getattr(current, attribute), estimator, needed, min_highlights)
+            if trimmed:
+                current = current._replace(**{attribute: entries})
+                dropped.extend(trimmed)
+                break
+        if not trimmed:
+            break
+        estimate = estimate_layout(current, params, spacing, plan)
+    return FitResult(estimate.pages <= pages, name, spacing, current.experiences, current.side_projects,
+                     dropped, estimate)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+CV data model - Compact records for the loaded CV sections
+Each source dictionary is turned into tuples of NamedTuple records once at load
+time. Records carry no per-instance dict and lists become tuples; tags, skills
+and category names are interned so candidates sharing a vocabulary share the strings
+"""
+
+import sys
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+
+# Parser attribute and source file of every CV section
+SOURCE_FILES = [
+    ('profile', 'profile.json'),
+    ('experiences', 'Professional_experience.json'),
+    ('diplomas', 'diplomas.json'),
+    ('hard_skills', 'hard_skills.json'),
+    ('soft_skills', 'soft_skills.json'),
+    ('languages', 'languages.json'),
+    ('interests', 'Interest.json'),
+    ('side_projects', 'side_projects.json'),
+]
+
+
+class Contact(NamedTuple):
+    """Contact lines of the header; None marks a field missing from the source"""
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    linkedin: Optional[str] = None
+    age: Optional[Union[int, str]] = None
+
+
+class Profile(NamedTuple):
+    """Name, tagline, contact details and summary from profile.json"""
+    name: str = ''
+    tagline: str = ''
+    contact: Optional[Contact] = None
+    summary: Optional[str] = None
+    objective: Optional[str] = None
+
+
+class Experience(NamedTuple):
+    """One professional experience; key is its identifier in the source file"""
+    key: str
+    title: str
+    company: str = ''
+    dates: str = ''
+    location: str = ''
+    highlights: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+
+
+class Diploma(NamedTuple):
+    """One degree, keyed by its title in the source file"""
+    title: str
+    school: str = ''
+    years: str = ''
+    location: str = ''
+
+
+class SideProject(NamedTuple):
+    """One side project; url may hold several comma-separated links"""
+    key: str
+    title: str
+    role: str = 'Solo developer'
+    dates: str = ''
+    location: str = ''
+    highlights: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+    url: str = ''
+
+
+class SkillCategory(NamedTuple):
+    """A named list of skills or interests; items is None when the source value is not a list"""
+    name: str
+    items: Optional[Tuple[str, ...]] = None
+
+
+class Language(NamedTuple):
+    """A spoken language with its level"""
+    name: str
+    level: str = ''
+    descriptor: str = ''
+
+
+def intern_text(value: Any) -> Any:
+    """Intern strings so equal tags and skills share one object; other values pass through"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def intern_all(values: Iterable[Any]) -> Tuple[Any, ...]:
+    return tuple(intern_text(value) for value in values)
+
+
+def build_profile(data: Dict[str, Any]) -> Optional[Profile]:
+    """Profile record, or None when the file held no data"""
+    if not data:
+        return None
+    contact = None
+    if 'contact' in data:
+        fields = data['contact']
+        contact = Contact(*(fields.get(field) for field in Contact._fields))
+    return Profile(data.get('name', ''), data.get('tagline', ''), contact,
+                   data.get('summary'), data.get('objective'))
+
+
+def build_experiences(data: Dict[str, Any]) -> Tuple[Experience, ...]:
+    return tuple(
+        Experience(key, entry.get('title', key), entry.get('company', ''), entry.get('dates', ''),
+                   entry.get('location', ''), tuple(entry.get('highlights', ())),
+                   intern_all(entry.get('tags', ())))
+        for key, entry in data.items()
+    )
+
+
+def build_diplomas(data: Dict[str, Any]) -> Tuple[Diploma, ...]:
+    return tuple(
+        Diploma(title, entry.get('school', ''), entry.get('years', ''), intern_text(entry.get('location', '')))
+        for title, entry in data.items()
+    )
+
+
+def build_side_projects(data: Dict[str, Any]) -> Tuple[SideProject, ...]:
+    return tuple(
+        SideProject(key, entry.get('title', key), intern_text(entry.get('role', 'Solo developer')),
+                    entry.get('dates', ''), intern_text(entry.get('location', '')),
+                    tuple(entry.get('highlights', ())), intern_all(entry.get('tags', ())),
+                    entry.get('url', ''))
+        for key, entry in data.items()
+    )
+
+
+def build_categories(data: Dict[str, Any]) -> Tuple[SkillCategory, ...]:
+    return tuple(
+        SkillCategory(intern_text(name), intern_all(items) if isinstance(items, list) else None)
+        for name, items in data.items()
+    )
+
+
+def build_languages(data: Dict[str, Any]) -> Tuple[Language, ...]:
+    return tuple(
+        Language(intern_text(name), intern_text(entry.get('level', '')), intern_text(entry.get('descriptor', '')))
+        for name, entry in data.items()
+    )
+
+
+# Parser attribute -> builder turning its parsed source dictionary into records
+SECTION_BUILDERS = {
+    'profile': build_profile,
+    'experiences': build_experiences,
+    'diplomas': build_diplomas,
+    'hard_skills': build_categories,
+    'soft_skills': build_categories,
+    'languages': build_languages,
+    'interests': build_categories,
+    'side_projects': build_side_projects,
+}  # type: Dict[str, Callable[[Dict[str, Any]], Any]]
+
+
+def build_section(attribute: str, data: Dict[str, Any]) -> Any:
+    """Records for one parser attribute; an empty dict gives the empty value (None or ())"""
+    return SECTION_BUILDERS[attribute](data)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Packed bundles - Many candidate bundles in one memory-mapped file
+`compile` parses every bundle folder once and writes the sections as marshal
+payloads followed by an offset index. The loader maps the file and decodes a
+section only when it is accessed, so a batch reads one file sequentially
+instead of opening eight small files per candidate.
+
+    python cv_pack.py compile --bundles ../candidates -o candidates.cvpack
+    python cv_pack.py compile ../CV_json -o cv.cvpack
+    python cv_pack.py list candidates.cvpack
+"""
+
+import argparse
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from cv_cache import replace_file
+from cv_model import SOURCE_FILES
+from cv_resume import RESUME_FILE, is_bundle, resume_sections
+from cv_trace import logger
+from dict_scanner import parse_source
+
+
+MAGIC = b'CVPK'
+FORMAT_VERSION = 1
+# magic, format version, marshal version, index offset, index length
+HEADER = struct.Struct('<4sHHQQ')
+PACK_SUFFIX = '.cvpack'
+
+
+class PackEntry(NamedTuple):
+    """Index entry of one candidate: attribute -> (offset, length) of its payloads"""
+    name: str
+    sections: Dict[str, Tuple[int, int]]
+
+
+def encode_bundle(directory: Union[str, Path]) -> List[Tuple[str, bytes]]:
+    """Parse the source files of one bundle folder into (attribute, payload) pairs
+
+    Files that fail to parse are reported and stored as empty sections, which
+    is what loading the folder directly would give. Sections without a file
+    are taken from the bundle's resume.json when it has one.
+    """
+    directory = Path(directory)
+    resume = {}  # type: Dict[str, Dict[str, Any]]
+    if (directory / RESUME_FILE).exists():
+        try:
+            resume = resume_sections((directory / RESUME_FILE).read_bytes())
+        except Exception as e:
+            logger.warning(f"Error loading {directory / RESUME_FILE}: {e}")
+    sections = []
+    for attribute, filename in SOURCE_FILES:
+        filepath = directory / filename
+        if not filepath.exists():
+            if attribute in resume:
+                sections.append((attribute, marshal.dumps(resume[attribute])))
+            continue
+        try:
+            _, data = parse_source(filepath.read_bytes().decode('utf-8'))
+        except Exception as e:
+            logger.warning(f"Error loading {filepath}: {e}")
+            data = {}
+        sections.append((attribute, marshal.dumps(data)))
+    return sections
+
+
+def find_bundles(root: Union[str, Path]) -> List[Tuple[str, Path]]:
+    """(name, folder) for every sub-folder of root that looks like a CV_json bundle"""
+    return [(bundle.name, bundle) for bundle in sorted(Path(root).iterdir()) if is_bundle(bundle)]
+
+
+def write_pack(output: Union[str, Path], bundles: Iterable[Tuple[str, Iterable[Tuple[str, bytes]]]]) -> int:
+    """Write (name, sections) pairs to a packed file atomically; returns the candidate count"""
+    output = Path(output)
+    index = []  # type: List[Tuple[str, Tuple[Tuple[str, int, int], ...]]]
+    seen = set()
+    fd, tmp_path = tempfile.mkstemp(dir=output.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, 0, 0))
+            offset = HEADER.size
+            for name, sections in bundles:
+                if name in seen:
+                    raise ValueError(f"duplicate candidate name: {name}")
+                seen.add(name)
+                entries = []
+                for attribute, payload in sections:
+                    f.write(payload)
+                    entries.append((attribute, offset, len(payload)))
+                    offset += len(payload)
+                index.append((name, tuple(entries)))
+            index_payload = marshal.dumps(index)
+            f.write(index_payload)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, offset, len(index_payload)))
+        replace_file(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(index)
+
+
+def compile_pack(bundles: List[Tuple[str, Union[str, Path]]], output: Union[str, Path],
+                 workers: Optional[int] = None) -> int:
+    """Parse bundle folders (over a process pool) and pack them into output in the given order"""
+    workers = workers or os.cpu_count() or 1
+    names = [name for name, _ in bundles]
+    folders = [str(folder) for _, folder in bundles]
+    if workers == 1 or len(bundles) < 2:
+        return write_pack(output, zip(names, map(encode_bundle, folders)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk_size = max(1, min(64, len(folders) // (workers * 4)))
+        return write_pack(output, zip(names, pool.map(encode_bundle, folders, chunksize=chunk_size)))
+
+
+class PackedCandidate:
+    """One candidate of a packed file; sections are decoded on first access"""
+
+    def __init__(self, pack: 'PackedBundle', entry: PackEntry):
+        self.pack = pack
+        self.name = entry.name
+        self.sections = entry.sections
+        self._decoded = {}  # type: Dict[str, Any]
+
+    def __contains__(self, attribute: str) -> bool:
+        return attribute in self.sections
+
+    def size(self, attribute: str) -> int:
+        return self.sections[attribute][1]
+
+    def payload(self, attribute: str) -> bytes:
+        """The encoded bytes of one section"""
+        offset, length = self.sections[attribute]
+        return self.pack.data[offset:offset + length]
+
+    def section(self, attribute: str) -> Dict[str, Any]:
+        """The parsed dictionary of one section (KeyError if the bundle had no such file)"""
+        if attribute not in self._decoded:
+            offset, length = self.sections[attribute]
+            self._decoded[attribute] = marshal.loads(self.pack.data[offset:offset + length])
+        return self._decoded[attribute]
+
+
+class PackedBundle:
+    """Read-only memory map of a packed file and its candidate index"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size or header[:4] != MAGIC:
+                raise ValueError(f"{self.path} is not a packed CV bundle")
+            _, version, marshal_version, index_offset, index_length = HEADER.unpack(header)
+            if version != FORMAT_VERSION:
+                raise ValueError(f"{self.path} uses pack format {version}, expected {FORMAT_VERSION}")
+            if marshal_version > marshal.version:
+                raise ValueError(f"{self.path} was written by a newer Python; recompile it")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = marshal.loads(self.data[index_offset:index_offset + index_length])
+        self.entries = {name: PackEntry(name, {attribute: (offset, length)
+                                               for attribute, offset, length in sections})
+                        for name, sections in index}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def names(self) -> List[str]:
+        return list(self.entries)
+
+    def candidate(self, name: Optional[str] = None) -> PackedCandidate:
+        """A candidate by name; the name may be omitted when the pack holds exactly one"""
+        if name is None:
+            if len(self.entries) != 1:
+                raise ValueError(f"{self.path} holds {len(self.entries)} candidates, name one of them")
+            name = next(iter(self.entries))
+        if name not in self.entries:
+            raise KeyError(f"no candidate {name!r} in {self.path}")
+        return PackedCandidate(self, self.entries[name])
+
+    def __iter__(self) -> Iterator[PackedCandidate]:
+        for entry in self.entries.values():
+            yield PackedCandidate(self, entry)
+
+    def close(self):
+        self.data.close()
+
+
+@lru_cache(maxsize=8)
+def _open_cached(path: str, size: int, mtime_ns: int, inode: int) -> PackedBundle:
+    return PackedBundle(path)
+
+
+def open_pack(path: Union[str, Path]) -> PackedBundle:
+    """Open a packed file once per process; a rewritten file is mapped again"""
+    path = str(Path(path).resolve())
+    stat = os.stat(path)
+    return _open_cached(path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Command line entry point for packing bundles"""
+    arg_parser = argparse.ArgumentParser(description="Pack CV bundles into one memory-mapped file")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    compile_command = commands.add_parser("compile", help="Pack bundle folders into one file")
+    compile_command.add_argument("folders", nargs="*", help="Bundle folders; each is named after its folder")
+    compile_command.add_argument("--bundles", help="Folder containing one CV_json-shaped folder per candidate")
+    compile_command.add_argument("-o", "--output", required=True, help=f"Packed file to write ({PACK_SUFFIX})")
+    compile_command.add_argument("--workers", type=int, default=None, help="Parsing processes (default: CPU count)")
+    list_command = commands.add_parser("list", help="List the candidates of a packed file")
+    list_command.add_argument("pack", help="Packed file")
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "list":
+        pack = open_pack(args.pack)
+        for candidate in pack:
+            print(f"{candidate.name}: {len(candidate.sections)} sections, "
+                  f"{sum(length for _, length in candidate.sections.values())} bytes")
+        print(f"{len(pack)} candidates in {args.pack}")
+        return 0
+
+    bundles = [(Path(folder).resolve().name, Path(folder)) for folder in args.folders]
+    if args.bundles:
+        bundles.extend(find_bundles(args.bundles))
+    if not bundles:
+        arg_parser.error("give bundle folders or --bundles")
+    try:
+        count = compile_pack(bundles, args.output, args.workers)
+    except ValueError as e:
+        arg_parser.error(str(e))
+    print(f"Packed {count} candidates into {args.output} ({os.path.getsize(args.output)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,360 +2,436 @@
 """
 Simple CV Parser - Uses basic string operations
 Reads JSON files from CV_json folder and generates isso_custom.tex using isso.tex template
+The files may be CV_json dictionary assignments, strict JSON, or a JSON Resume
 """
 
+import argparse
+import contextlib
 import os
-import re
-import ast
+import sys
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+from cv_archive import BundleSource, is_archive, open_archive
+from cv_cache import (
+    DEFAULT_CACHE_DIR, DEFAULT_PDF_CACHE_BYTES, FragmentCache, ParsedDataCache, PdfCache, stream_if_changed,
+)
+from cv_compile import (
+    DEFAULT_BIBER, DEFAULT_BIBTEX, DEFAULT_COMPILER, DEFAULT_MAX_PASSES, DEFAULT_TIMEOUT, LatexCompiler, job_for,
+    print_compile_results,
+)
+from cv_layout import EntrySpacing, FitResult, fit_layout
+from cv_model import (
+    SOURCE_FILES, Diploma, Experience, Language, Profile, SideProject, SkillCategory, build_section,
+)
+from cv_pack import PackedCandidate, open_pack
+from cv_plan import LayoutError, RenderPlan, layout_output_file, load_layout, load_layouts, plan_attributes
+from cv_resume import RESUME_FILE, is_resume_file, resume_sections
+from cv_render import RENDERERS, RenderOutput, parse_formats, write_outputs
+from cv_stream import join_chunks, peek_chunks
+from cv_trace import NULL_TRACER, Tracer, logger, set_quiet
+from cv_template import (
+    LANGUAGES_LIST_TEMPLATE, PERSONAL_INFO_TEMPLATE, PROFILE_TEMPLATE, TemplateParams,
+    compile_document_template, load_template_params,
+)
+from cv_validate import print_report, validate_bundle, validation_cache
+from cv_watch import DEFAULT_DEBOUNCE, watch
+from dict_scanner import parse_source
+from inline_markup import render_inline
+from latex_escape import escape_latex
 
 
 class SimpleCVParser:
-    def __init__(self, json_dir: str = "../CV_json", tex_dir: str = "../CV_tex"):
-        """Initialize the parser with directories"""
+    # Attribute name and source file for every CV section
+    DATA_FILES = SOURCE_FILES
+    
+    # Section name -> (chunk generator method, data attributes it reads)
+    SECTIONS = {
+        'contact': ('iter_contact_info', ('profile',)),
+        'experience': ('iter_experience_section', ('experiences', 'spacing')),
+        'diplomas': ('iter_diplomas_section', ('diplomas',)),
+        'hard_skills': ('iter_hard_skills_section', ('hard_skills',)),
+        'soft_skills': ('iter_soft_skills_section', ('soft_skills',)),
+        'languages': ('iter_languages_section', ('languages',)),
+        'interests': ('iter_interests_section', ('interests',)),
+        'side_projects': ('iter_side_projects_section', ('side_projects', 'spacing')),
+    }
+    
+    # Bump when the loader output changes so cached parses are not reused
+    LOADER_VERSION = "1"
+    # Bump when any format_*/iter_* method changes so cached fragments are not reused
+    RENDERER_VERSION = "5"
+    
+    def __init__(self, json_dir: str = "../CV_json", tex_dir: str = "../CV_tex",
+                 output_file: Optional[str] = None, use_cache: bool = True,
+                 cache_dir: str = DEFAULT_CACHE_DIR, template_params: Optional[TemplateParams] = None,
+                 tracer: Optional[Tracer] = None, layout: Optional[RenderPlan] = None,
+                 fragment_cache: bool = True):
+        """Initialize the parser with directories
+
+        With fragment_cache off, sections are streamed chunk by chunk instead
+        of being rendered into cached strings, so memory stays flat per section.
+        """
         self.json_dir = Path(json_dir)
         self.tex_dir = Path(tex_dir)
-        self.output_file = self.tex_dir / "isso_custom.tex"
-        
-        # Data storage
-        self.profile = {}
-        self.experience = {}
-        self.diplomas = {}
-        self.languages = {}
-        self.hard_skills = {}
-        self.soft_skills = {}
-        self.interests = {}
-        self.side_projects = {}
-        
+        self.output_file = Path(output_file) if output_file else self.tex_dir / "isso_custom.tex"
+        self.cache = ParsedDataCache(cache_dir, enabled=use_cache, version=self.LOADER_VERSION)
+        self.fragments = FragmentCache(cache_dir, enabled=use_cache and fragment_cache, version=self.RENDERER_VERSION)
+        # JSON Resume documents map to several sections, so they are cached apart from source files
+        self.resumes = ParsedDataCache(cache_dir, enabled=use_cache, version=f"resume-{self.LOADER_VERSION}")
+        # Header comment, geometry and colours of the document template
+        self.template_params = template_params or TemplateParams()
+        # Timing spans around load, format, document and write (no-op unless enabled)
+        self.tracer = tracer or NULL_TRACER
+        # Gaps between experience and side-project entries, tightened by fit_to_pages
+        self.spacing = EntrySpacing()
+        # Pages, columns and sections of the LaTeX document; also decides which files are loaded
+        self.plan = layout or load_layout('default')
+        
+        # Data storage, as records built by cv_model at load time
+        self.profile = None  # type: Optional[Profile]
+        self.experiences = ()  # type: Tuple[Experience, ...]
+        self.diplomas = ()  # type: Tuple[Diploma, ...]
+        self.languages = ()  # type: Tuple[Language, ...]
+        self.hard_skills = ()  # type: Tuple[SkillCategory, ...]
+        self.soft_skills = ()  # type: Tuple[SkillCategory, ...]
+        self.interests = ()  # type: Tuple[SkillCategory, ...]
+        self.side_projects = ()  # type: Tuple[SideProject, ...]
+        
+    def parse_python_dict(self, content: bytes) -> Dict[str, Any]:
+        """Parse the bytes of a Python dictionary file, raising on syntax errors"""
+        # Strict JSON goes to the json module; "name = {...}" assignments take one scanner pass, no AST involved
+        with self.tracer.span('parse', 'load', bytes=len(content)):
+            _, result = parse_source(content.decode('utf-8'))
+        return result
+    
+    def parse_json_resume(self, content: bytes) -> Dict[str, Dict[str, Any]]:
+        """Parse the bytes of a JSON Resume into the source dictionary of each section it holds"""
+        with self.tracer.span('parse:resume', 'load', bytes=len(content)):
+            return resume_sections(content)
+    
+    def load_json_resume(self, filepath: Path) -> Dict[str, Dict[str, Any]]:
+        """Sections of a JSON Resume file, empty when it cannot be read"""
+        try:
+            return self.resumes.load(filepath, self.parse_json_resume)
+        except Exception as e:
+            logger.warning(f"Error loading {filepath}: {e}")
+            return {}
+    
     def load_python_dict_file(self, filepath: Path) -> Dict[str, Any]:
         """Load a Python dictionary from a file (handles comments and non-standard JSON)"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Remove comments (lines starting with #)
-            lines = content.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                if not line.strip().startswith('#'):
-                    cleaned_lines.append(line)
-            
-            cleaned_content = '\n'.join(cleaned_lines)
-            
-            # Fix common syntax issues
-            # Fix missing commas in lists
-            cleaned_content = re.sub(r'(\w+)"\s*\n\s*"', r'\1",\n        "', cleaned_content)
-            # Fix missing quotes around strings
-            cleaned_content = re.sub(r'(\w+)"\s*/\s*"(\w+)"', r'\1", "\2"', cleaned_content)
-            # Fix missing commas after strings in lists
-            cleaned_content = re.sub(r'"([^"]+)"\s*\n\s*"([^"]+)"', r'"\1",\n        "\2"', cleaned_content)
-            
-            # Find the dictionary assignment (e.g., "profile = {...}")
-            match = re.search(r'(\w+)\s*=\s*({.*})', cleaned_content, re.DOTALL)
-            if match:
-                dict_content = match.group(2)
-                # Safely evaluate the dictionary
-                result = ast.literal_eval(dict_content)
-                
-                # Convert tuple strings to regular strings
-                if isinstance(result, dict):
-                    for key, value in result.items():
-                        if isinstance(value, tuple):
-                            # Join tuple strings into a single string
-                            result[key] = ''.join(str(item) for item in value)
-                
-                return result
-            else:
-                raise ValueError(f"Could not find dictionary assignment in {filepath}")
-                
+            return self.cache.load(filepath, self.parse_python_dict)
         except Exception as e:
-            print(f"Error loading {filepath}: {e}")
+            logger.warning(f"Error loading {filepath}: {e}")
             return {}
     
-    def load_all_data(self):
-        """Load all JSON files into memory"""
-        print("Loading CV data from JSON files...")
-        
-        # Load profile data
-        profile_file = self.json_dir / "profile.json"
-        if profile_file.exists():
-            self.profile = self.load_python_dict_file(profile_file)
-        
-        # Load professional experience
-        exp_file = self.json_dir / "Professional_experience.json"
-        if exp_file.exists():
-            self.experiences = self.load_python_dict_file(exp_file)
-        
-        # Load diplomas
-        diplomas_file = self.json_dir / "diplomas.json"
-        if diplomas_file.exists():
-            self.diplomas = self.load_python_dict_file(diplomas_file)
-        
-        # Load hard skills
-        hard_skills_file = self.json_dir / "hard_skills.json"
-        if hard_skills_file.exists():
-            self.hard_skills = self.load_python_dict_file(hard_skills_file)
-        
-        # Load soft skills
-        soft_skills_file = self.json_dir / "soft_skills.json"
-        if soft_skills_file.exists():
-            self.soft_skills = self.load_python_dict_file(soft_skills_file)
-        
-        # Load languages
-        languages_file = self.json_dir / "languages.json"
-        if languages_file.exists():
-            self.languages = self.load_python_dict_file(languages_file)
-        
-        # Load interests
-        interests_file = self.json_dir / "Interest.json"
-        if interests_file.exists():
-            self.interests = self.load_python_dict_file(interests_file)
-        
-        # Load side projects
-        side_projects_file = self.json_dir / "side_projects.json"
-        if side_projects_file.exists():
-            self.side_projects = self.load_python_dict_file(side_projects_file)
-        
-        print("Data loading completed!")
+    def load_packed(self, packed: PackedCandidate, attributes: Optional[Iterable[str]] = None):
+        """Decode the sections stored for a candidate of a packed file, by default those the plan needs"""
+        wanted = set(self.plan.attributes if attributes is None else attributes)
+        for attribute, filename in self.DATA_FILES:
+            if attribute not in packed or attribute not in wanted:
+                continue
+            with self.tracer.span(f"load:{filename}", 'load', bytes=packed.size(attribute)):
+                try:
+                    data = packed.section(attribute)
+                except Exception as e:
+                    logger.warning(f"Error loading {filename} of {packed.name}: {e}")
+                    data = {}
+                setattr(self, attribute, build_section(attribute, data))
     
-    def escape_latex(self, text: str) -> str:
-        """Escape special LaTeX characters with minimal processing"""
-        if not isinstance(text, str):
-            return str(text)
-        
-        # Don't escape if the text already contains LaTeX commands
-        if '\\' in text and any(cmd in text for cmd in ['\\textbar{}', '\\textbf{', '\\textcolor{', '\\cvtag{', '\\cvevent{', '\\href{', '\\faExternalLink', '\\faMortarBoard', '\\vspace{', '\\cvsection{', '\\begin{', '\\end{', '\\item', '\\switchcolumn', '\\newpage']):
-            # This is already LaTeX formatted, just escape basic characters
-            text = text.replace('_', r'\_')
-            text = text.replace('^', r'\^{}')
-            text = text.replace('~', r'\textasciitilde{}')
-            text = text.replace('$', r'\$')
-            text = text.replace('%', r'\%')
-            text = text.replace('#', r'\#')
-            text = text.replace('&', r'\&')
-            return text
-        
-        # Handle basic LaTeX special characters for plain text
-        text = text.replace('\\', r'\textbackslash{}')
-        text = text.replace('{', r'\{')
-        text = text.replace('}', r'\}')
-        text = text.replace('_', r'\_')
-        text = text.replace('^', r'\^{}')
-        text = text.replace('~', r'\textasciitilde{}')
-        text = text.replace('$', r'\$')
-        text = text.replace('#', r'\#')
-        text = text.replace('&', r'\&')
-        text = text.replace('%', r'\%')
-        
-        return text
+    def load_sources(self, source: BundleSource, attributes: Optional[Iterable[str]] = None):
+        """Parse the raw source files of a bundle read from an archive, by default those the plan needs"""
+        wanted = set(self.plan.attributes if attributes is None else attributes)
+        resume = {}  # type: Dict[str, Dict[str, Any]]
+        if RESUME_FILE in source.files:
+            try:
+                resume = self.resumes.load_bytes(source.files[RESUME_FILE], self.parse_json_resume)
+            except Exception as e:
+                logger.warning(f"Error loading {RESUME_FILE} of {source.name}: {e}")
+        for attribute, filename in self.DATA_FILES:
+            if attribute not in wanted:
+                continue
+            if filename not in source.files:
+                if attribute in resume:
+                    setattr(self, attribute, build_section(attribute, resume[attribute]))
+                continue
+            content = source.files[filename]
+            with self.tracer.span(f"load:{filename}", 'load', bytes=len(content)):
+                try:
+                    data = self.cache.load_bytes(content, self.parse_python_dict)
+                except Exception as e:
+                    logger.warning(f"Error loading {filename} of {source.name}: {e}")
+                    data = {}
+                setattr(self, attribute, build_section(attribute, data))
+    
+    def load_all_data(self, candidate: Optional[str] = None, attributes: Optional[Iterable[str]] = None):
+        """Load the JSON files into memory
+        
+        Only the sections of the layout plan are read unless attributes names
+        others. json_dir may also be a packed file written by cv_pack, a
+        zip/tar archive of bundles, in which case candidate names the bundle
+        to load (optional if the file holds one), or a JSON Resume document.
+        A resume.json in the folder fills the sections that have no file.
+        """
+        logger.info("Loading CV data from JSON files...")
+        wanted = set(self.plan.attributes if attributes is None else attributes)
+        
+        if self.json_dir.is_file():
+            if is_archive(self.json_dir):
+                files = [filename for attribute, filename in self.DATA_FILES if attribute in wanted]
+                self.load_sources(open_archive(self.json_dir).read(candidate, files + [RESUME_FILE]), wanted)
+            elif is_resume_file(self.json_dir):
+                self.load_sources(BundleSource(self.json_dir.stem, {RESUME_FILE: self.json_dir.read_bytes()}), wanted)
+            else:
+                self.load_packed(open_pack(self.json_dir).candidate(candidate), wanted)
+            logger.info("Data loading completed!")
+            return
+        
+        resume_path = self.json_dir / RESUME_FILE
+        resume = self.load_json_resume(resume_path) if resume_path.exists() else {}
+        for attribute, filename in self.DATA_FILES:
+            if attribute not in wanted:
+                continue
+            filepath = self.json_dir / filename
+            if filepath.exists():
+                with self.tracer.span(f"load:{filename}", 'load') as span:
+                    setattr(self, attribute, build_section(attribute, self.load_python_dict_file(filepath)))
+                    if span:
+                        span.args['bytes'] = filepath.stat().st_size
+            elif attribute in resume:
+                setattr(self, attribute, build_section(attribute, resume[attribute]))
+        
+        logger.info("Data loading completed!")
+    
+    def reload_data_files(self, filenames: Iterable[str]):
+        """Reload only the given source files, clearing sections whose file was removed
+        
+        A changed resume.json reloads every section, since any of them may come from it.
+        """
+        filenames = set(filenames)
+        resume = {}  # type: Dict[str, Dict[str, Any]]
+        resume_path = self.json_dir / RESUME_FILE
+        if RESUME_FILE in filenames:
+            filenames.update(filename for _, filename in self.DATA_FILES)
+        if resume_path.exists():
+            resume = self.load_json_resume(resume_path)
+        for attribute, filename in self.DATA_FILES:
+            if filename in filenames and attribute in self.plan.attributes:
+                filepath = self.json_dir / filename
+                data = self.load_python_dict_file(filepath) if filepath.exists() else resume.get(attribute, {})
+                setattr(self, attribute, build_section(attribute, data))
+    
+    # One compiled-regex pass, memoized for repeated tags and skills
+    escape_latex = staticmethod(escape_latex)
+    # Markdown-style inline markup to escaped LaTeX, shared by every section
+    render_inline = staticmethod(render_inline)
+    
+    def render_section(self, section: str) -> str:
+        """Render a section to a string through the fragment cache"""
+        return ''.join(self.iter_section(section))
+    
+    def iter_section(self, section: str) -> Iterator[str]:
+        """Yield a section's LaTeX chunks, re-running its formatter only when its data changed"""
+        if self.tracer.enabled:
+            return self.tracer.timed(f"format:{section}", lambda: self._section_chunks(section), 'format')
+        return self._section_chunks(section)
+    
+    def _section_chunks(self, section: str) -> Iterator[str]:
+        """Section chunks streamed from the formatter, or one string from the fragment cache
+
+        Caching a section means materialising it: the cache stores and returns
+        the whole section as a single string.
+        """
+        method_name, attributes = self.SECTIONS[section]
+        formatter = getattr(self, method_name)
+        if not self.fragments.enabled:
+            return formatter()
+        inputs = tuple(getattr(self, attribute) for attribute in attributes)
+        return iter((self.fragments.render(section, inputs, lambda: ''.join(formatter())),))
     
     def format_contact_info(self) -> str:
         """Format contact information for LaTeX"""
-        if not self.profile or 'contact' not in self.profile:
-            return ""
+        return ''.join(self.iter_contact_info())
+    
+    def iter_contact_info(self) -> Iterator[str]:
+        """Yield contact information for LaTeX"""
+        if not self.profile or self.profile.contact is None:
+            return
         
-        contact = self.profile['contact']
+        contact = self.profile.contact
         lines = []
         
-        if 'email' in contact:
-            lines.append(f"\\email{{{self.escape_latex(contact['email'])}}}")
-        if 'phone' in contact:
-            lines.append(f"\\phone{{{self.escape_latex(contact['phone'])}}}")
-        if 'location' in contact:
-            lines.append(f"\\location{{{self.escape_latex(contact['location'])}}}")
-        if 'linkedin' in contact:
-            lines.append(f"\\linkedin{{{self.escape_latex(contact['linkedin'])}}}")
-        if 'age' in contact:
-            lines.append(f"\\textbf{{Age}}: {contact['age']}")
-        
-        return '\n    '.join(lines)
+        if contact.email is not None:
+            lines.append(f"\\email{{{self.escape_latex(contact.email)}}}")
+        if contact.phone is not None:
+            lines.append(f"\\phone{{{self.escape_latex(contact.phone)}}}")
+        if contact.location is not None:
+            lines.append(f"\\location{{{self.escape_latex(contact.location)}}}")
+        if contact.linkedin is not None:
+            lines.append(f"\\linkedin{{{self.escape_latex(contact.linkedin)}}}")
+        if contact.age is not None:
+            lines.append(f"\\textbf{{Age}}: {contact.age}")
+        
+        yield '\n    '.join(lines)
     
     def format_experience_section(self) -> str:
         """Format experience section with optimized spacing"""
+        return ''.join(self.iter_experience_section())
+    
+    def iter_experience_section(self) -> Iterator[str]:
+        """Yield the experience section with optimized spacing"""
         if not self.experiences:
-            return ""
+            return
         
-        sections = []
-        for i, (job_id, data) in enumerate(self.experiences.items()):
-            title = data.get('title', job_id)
-            company = data.get('company', '')
-            dates = data.get('dates', '')
-            location = data.get('location', '')
-            highlights = data.get('highlights', [])
-            tags = data.get('tags', [])
+        last = len(self.experiences) - 1
+        for i, experience in enumerate(self.experiences):
+            highlights = experience.highlights
+            tags = experience.tags
             
             # Format the job entry
-            entry = f"\\cvevent{{\\textbf{{{self.escape_latex(title)}}}}}{{{self.escape_latex(company)}}}{{{self.escape_latex(dates)}}}{{{self.escape_latex(location)}}}\n"
+            yield f"\\cvevent{{\\textbf{{{self.escape_latex(experience.title)}}}}}{{{self.escape_latex(experience.company)}}}{{{self.escape_latex(experience.dates)}}}{{{self.escape_latex(experience.location)}}}\n"
             
             if highlights:
-                entry += "\\begin{itemize}\n"
+                yield "\\begin{itemize}\n"
                 for highlight in highlights:
-                    # Convert markdown-style bold to LaTeX
-                    highlight = re.sub(r'\*\*(.*?)\*\*', r'\\textbf{\1}', highlight)
-                    entry += f"  \\item {self.escape_latex(highlight)}\n"
-                entry += "\\end{itemize}\n"
+                    # Bold, italic, code and links are converted while escaping
+                    yield f"  \\item {self.render_inline(highlight)}\n"
+                yield "\\end{itemize}\n"
             
             if tags:
-                tag_entries = []
                 for tag in tags:
-                    tag_entries.append(f"\\cvtag{{{self.escape_latex(tag)}}}")
-                entry += ''.join(tag_entries) + '\n'
-            
-            sections.append(entry)
+                    yield f"\\cvtag{{{self.escape_latex(tag)}}}"
+                yield '\n'
             
             # Add spacing between entries, but not after the last one
-            if i < len(self.experiences) - 1:
+            if i < last:
                 # Adjust spacing based on content length
                 if len(highlights) > 3 or len(tags) > 5:
-                    sections.append(r'\vspace{4pt}')
+                    yield f'\n\\vspace{{{self.spacing.experience_large}}}\n'
                 else:
-                    sections.append(r'\vspace{2pt}')
-        
-        return '\n'.join(sections)
+                    yield f'\n\\vspace{{{self.spacing.experience_small}}}\n'
     
     def format_diplomas_section(self) -> str:
         """Format diplomas section"""
+        return ''.join(self.iter_diplomas_section())
+    
+    def iter_diplomas_section(self) -> Iterator[str]:
+        """Yield the diplomas section"""
         if not self.diplomas:
-            return ""
-        
-        entries = []
-        for title, data in self.diplomas.items():
-            school = data.get('school', '')
-            years = data.get('years', '')
-            location = data.get('location', '')
-            
-            entry = f"\\cvevent{{\\faMortarBoard \\textbf{{{self.escape_latex(title)}}}}}{{{self.escape_latex(school)}}}{{{self.escape_latex(years)}}}{{{self.escape_latex(location)}}}"
-            entries.append(entry)
+            return
         
-        return '\n'.join(entries)
+        yield from join_chunks(
+            f"\\cvevent{{\\faMortarBoard \\textbf{{{self.escape_latex(diploma.title)}}}}}{{{self.escape_latex(diploma.school)}}}{{{self.escape_latex(diploma.years)}}}{{{self.escape_latex(diploma.location)}}}"
+            for diploma in self.diplomas
+        )
+    
+    def iter_category_lists(self, categories: Tuple[SkillCategory, ...], spacing: str) -> Iterator[str]:
+        """Yield "category: a | b | c" blocks separated by a small vertical space"""
+        yield from join_chunks(self._category_list_parts(categories, spacing), '\n\n')
+    
+    def _category_list_parts(self, categories: Tuple[SkillCategory, ...], spacing: str) -> Iterator[str]:
+        """Yield each category block and the spacing after it, joined by the caller"""
+        last = len(categories) - 1
+        for i, category in enumerate(categories):
+            if category.items is not None:
+                # Join items with proper LaTeX separator
+                items_text = ' \\textbar{} '.join(category.items)
+                yield f"\\textcolor{{SlateGrey}}{{\\textbf{{{self.escape_latex(category.name)}}}}}\\\\\n{self.escape_latex(items_text)}"
+                # Add minimal spacing between categories, but not after the last one
+                if i < last:
+                    yield spacing
     
     def format_hard_skills_section(self) -> str:
         """Format hard skills section with ultra-compact spacing"""
-        if not self.hard_skills:
-            return ""
-        
-        sections = []
-        for i, (category, skills) in enumerate(self.hard_skills.items()):
-            if isinstance(skills, list):
-                # Join skills with proper LaTeX separator
-                skills_text = ' \\textbar{} '.join(skills)
-                section = f"\\textcolor{{SlateGrey}}{{\\textbf{{{self.escape_latex(category)}}}}}\\\\\n{self.escape_latex(skills_text)}"
-                sections.append(section)
-                # Add very minimal spacing between categories, but not after the last one
-                if i < len(self.hard_skills) - 1:
-                    sections.append(r'\vspace{0.5pt}')
-        
-        return '\n\n'.join(sections)
+        return ''.join(self.iter_hard_skills_section())
+    
+    def iter_hard_skills_section(self) -> Iterator[str]:
+        """Yield the hard skills section with ultra-compact spacing"""
+        if self.hard_skills:
+            yield from self.iter_category_lists(self.hard_skills, r'\vspace{0.5pt}')
     
     def format_soft_skills_section(self) -> str:
         """Format soft skills section with optimized spacing"""
-        if not self.soft_skills:
-            return ""
-        
-        sections = []
-        for i, (category, skills) in enumerate(self.soft_skills.items()):
-            if isinstance(skills, list):
-                # Join skills with proper LaTeX separator
-                skills_text = ' \\textbar{} '.join(skills)
-                section = f"\\textcolor{{SlateGrey}}{{\\textbf{{{self.escape_latex(category)}}}}}\\\\\n{self.escape_latex(skills_text)}"
-                sections.append(section)
-                # Add minimal spacing between categories, but not after the last one
-                if i < len(self.soft_skills) - 1:
-                    sections.append(r'\vspace{1pt}')
-        
-        return '\n\n'.join(sections)
+        return ''.join(self.iter_soft_skills_section())
+    
+    def iter_soft_skills_section(self) -> Iterator[str]:
+        """Yield the soft skills section with optimized spacing"""
+        if self.soft_skills:
+            yield from self.iter_category_lists(self.soft_skills, r'\vspace{1pt}')
     
     def format_skills_section(self) -> str:
         """Format skills section with optimized spacing"""
-        sections = []
-        
+        return ''.join(self.iter_skills_section())
+    
+    def iter_skills_section(self) -> Iterator[str]:
+        """Yield hard and soft skills as one section with optimized spacing"""
+        yield from join_chunks(self._skills_parts(), '\n\n')
+    
+    def _skills_parts(self) -> Iterator[Union[str, Iterator[str]]]:
+        """Yield the headers and category blocks of the combined skills section"""
         # Add hard skills
         if self.hard_skills:
-            sections.append(r'\textcolor{SlateGrey}{\textbf{Hard Skills}}')
-            for i, (category, skills) in enumerate(self.hard_skills.items()):
-                if isinstance(skills, list):
-                    # Join skills with proper LaTeX separator
-                    skills_text = ' \\textbar{} '.join(skills)
-                    section = f"\\textcolor{{SlateGrey}}{{\\textbf{{{self.escape_latex(category)}}}}}\\\\\n{self.escape_latex(skills_text)}"
-                    sections.append(section)
-                    # Add minimal spacing between categories, but not after the last one
-                    if i < len(self.hard_skills) - 1:
-                        sections.append(r'\vspace{1pt}')
+            yield r'\textcolor{SlateGrey}{\textbf{Hard Skills}}'
+            hard_skills = peek_chunks(self._category_list_parts(self.hard_skills, r'\vspace{1pt}'))
+            if hard_skills is not None:
+                yield join_chunks(hard_skills, '\n\n')
         
         # Add soft skills
         if self.soft_skills:
-            if sections:  # Add minimal spacing if hard skills were added
-                sections.append(r'\vspace{3pt}')
-            sections.append(r'\textcolor{SlateGrey}{\textbf{Soft Skills}}')
-            for i, (category, skills) in enumerate(self.soft_skills.items()):
-                if isinstance(skills, list):
-                    # Join skills with proper LaTeX separator
-                    skills_text = ' \\textbar{} '.join(skills)
-                    section = f"\\textcolor{{SlateGrey}}{{\\textbf{{{self.escape_latex(category)}}}}}\\\\\n{self.escape_latex(skills_text)}"
-                    sections.append(section)
-                    # Add minimal spacing between categories, but not after the last one
-                    if i < len(self.soft_skills) - 1:
-                        sections.append(r'\vspace{1pt}')
-        
-        return '\n\n'.join(sections)
+            if self.hard_skills:  # Add minimal spacing if hard skills were added
+                yield r'\vspace{3pt}'
+            yield r'\textcolor{SlateGrey}{\textbf{Soft Skills}}'
+            soft_skills = peek_chunks(self._category_list_parts(self.soft_skills, r'\vspace{1pt}'))
+            if soft_skills is not None:
+                yield join_chunks(soft_skills, '\n\n')
     
     def format_languages_section(self) -> str:
         """Format languages section"""
+        return ''.join(self.iter_languages_section())
+    
+    def iter_languages_section(self) -> Iterator[str]:
+        """Yield the languages section"""
         if not self.languages:
-            return ""
+            return
         
-        entries = []
-        for language, data in self.languages.items():
-            level = data.get('level', '')
-            descriptor = data.get('descriptor', '')
-            entry = f"  \\item \\textbf{{{self.escape_latex(language)}}} \\hfill {self.escape_latex(level)} {self.escape_latex(descriptor)}"
-            entries.append(entry)
-        
-        return '\n'.join(entries)
+        yield from join_chunks(
+            f"  \\item \\textbf{{{self.escape_latex(language.name)}}} \\hfill {self.escape_latex(language.level)} {self.escape_latex(language.descriptor)}"
+            for language in self.languages
+        )
     
     def format_interests_section(self) -> str:
         """Format interests section like skills with categories"""
-        if not self.interests:
-            return ""
-        
-        sections = []
-        for i, (category, interests_list) in enumerate(self.interests.items()):
-            if isinstance(interests_list, list):
-                # Join interests with proper LaTeX separator
-                interests_text = ' \\textbar{} '.join(interests_list)
-                section = f"\\textcolor{{SlateGrey}}{{\\textbf{{{self.escape_latex(category)}}}}}\\\\\n{self.escape_latex(interests_text)}"
-                sections.append(section)
-                # Add minimal spacing between categories, but not after the last one
-                if i < len(self.interests) - 1:
-                    sections.append(r'\vspace{1pt}')
-        
-        return '\n\n'.join(sections)
+        return ''.join(self.iter_interests_section())
+    
+    def iter_interests_section(self) -> Iterator[str]:
+        """Yield the interests section like skills with categories"""
+        if self.interests:
+            yield from self.iter_category_lists(self.interests, r'\vspace{1pt}')
     
     def format_side_projects_section(self) -> str:
         """Format side projects section with optimized spacing and URLs in description"""
+        return ''.join(self.iter_side_projects_section())
+    
+    def iter_side_projects_section(self) -> Iterator[str]:
+        """Yield the side projects section with optimized spacing and URLs in description"""
         if not self.side_projects:
-            return ""
+            return
         
-        sections = []
-        for i, (project_id, data) in enumerate(self.side_projects.items()):
-            title = data.get('title', project_id)
-            role = data.get('role', 'Solo developer')
-            dates = data.get('dates', '')
-            location = data.get('location', '')
-            highlights = data.get('highlights', [])
-            tags = data.get('tags', [])
-            url = data.get('url', '')
+        last = len(self.side_projects) - 1
+        for i, project in enumerate(self.side_projects):
+            highlights = project.highlights
+            tags = project.tags
+            url = project.url
             
             # Format the project entry without "Side Project" in role
-            entry = f"\\cvevent{{\\textbf{{{self.escape_latex(title)}}}}}{{{self.escape_latex(role)}}}{{{self.escape_latex(dates)}}}{{{self.escape_latex(location)}}}\n"
+            yield f"\\cvevent{{\\textbf{{{self.escape_latex(project.title)}}}}}{{{self.escape_latex(project.role)}}}{{{self.escape_latex(project.dates)}}}{{{self.escape_latex(project.location)}}}\n"
             
             if highlights:
-                entry += "\\begin{itemize}\n"
+                yield "\\begin{itemize}\n"
                 for highlight in highlights:
-                    # Convert markdown-style bold to LaTeX
-                    highlight = re.sub(r'\*\*(.*?)\*\*', r'\\textbf{\1}', highlight)
-                    entry += f"  \\item {self.escape_latex(highlight)}\n"
+                    # Bold, italic, code and links are converted while escaping
+                    yield f"  \\item {self.render_inline(highlight)}\n"
                 
                 # Add URL to the description if available
                 if url and url != "Not public yet":
@@ -365,257 +441,275 @@ class SimpleCVParser:
                         for url_item in urls:
                             # Escape underscores in display text for LaTeX
                             display_url = url_item.replace('_', r'\_')
-                            entry += f"  \\item \\href{{{url_item}}}{{\\faExternalLink\\ {display_url}}}\n"
+                            yield f"  \\item \\href{{{url_item}}}{{\\faExternalLink\\ {display_url}}}\n"
                     else:
                         # Escape underscores in display text for LaTeX
                         display_url = url.replace('_', r'\_')
-                        entry += f"  \\item \\href{{{url}}}{{\\faExternalLink\\ {display_url}}}\n"
+                        yield f"  \\item \\href{{{url}}}{{\\faExternalLink\\ {display_url}}}\n"
                 
-                entry += "\\end{itemize}\n"
+                yield "\\end{itemize}\n"
             
             if tags:
-                tag_entries = []
                 for tag in tags:
-                    tag_entries.append(f"\\cvtag{{{self.escape_latex(tag)}}}")
-                entry += ''.join(tag_entries) + '\n'
-            
-            sections.append(entry)
+                    yield f"\\cvtag{{{self.escape_latex(tag)}}}"
+                yield '\n'
             
             # Add spacing between entries, but not after the last one
-            if i < len(self.side_projects) - 1:
+            if i < last:
                 # Adjust spacing based on content length
                 if len(highlights) > 2 or len(tags) > 4:
-                    sections.append(r'\vspace{6pt}')
+                    yield f'\n\\vspace{{{self.spacing.project_large}}}\n'
                 else:
-                    sections.append(r'\vspace{4pt}')
-        
-        return '\n'.join(sections)
+                    yield f'\n\\vspace{{{self.spacing.project_small}}}\n'
+    
+    def fit_to_pages(self, pages: int) -> FitResult:
+        """Tighten entry spacing, then drop low-priority highlights, until the layout estimate fits"""
+        result = fit_layout(self, pages, self.template_params, plan=self.plan)
+        self.spacing = result.spacing
+        self.experiences = result.experiences
+        self.side_projects = result.side_projects
+        message = (f"Estimated {result.estimate.pages} page(s) with {result.spacing_name} spacing, "
+                   f"{len(result.dropped)} highlight(s) dropped")
+        if result.fits:
+            logger.info(message)
+        else:
+            logger.warning(f"Could not fit {pages} page(s): {message}")
+        for key, highlight in result.dropped:
+            logger.info(f"  dropped from {key}: {highlight}")
+        return result
     
     def generate_custom_tex(self):
         """Generate complete standalone LaTeX CV file"""
-        print("Writing custom LaTeX file to", self.output_file)
-        
-        # Build the complete LaTeX document
-        latex_content = self.build_complete_document()
-        
-        # Write to file
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
-        
-        print(f"Successfully generated {self.output_file}!")
+        logger.info(f"Writing custom LaTeX file to {self.output_file}")
+        
+        # Stream the document to disk, leaving the file untouched (mtime preserved) when nothing changed
+        with self.tracer.span('write', 'write') as span:
+            written = stream_if_changed(self.output_file, self.iter_document())
+            if span:
+                span.args.update(bytes=self.output_file.stat().st_size, written=written)
+        if written:
+            logger.info(f"Successfully generated {self.output_file}!")
+        else:
+            logger.info(f"{self.output_file} is already up to date")
+    
+    def generate_outputs(self, formats: Iterable[str]) -> List[RenderOutput]:
+        """Write the loaded CV in several formats at once, named after the LaTeX output file"""
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        outputs = write_outputs(self, formats)
+        for output in outputs:
+            state = "generated" if output.written else "already up to date"
+            logger.info(f"{output.format}: {output.path} {state} ({output.seconds * 1000:.1f} ms)")
+        return outputs
+    
+    def write_document(self, stream: TextIO, format: str = 'latex'):
+        """Stream the complete document (LaTeX by default) to an open text stream (file, stdout, pipe)"""
+        chunks = self.iter_document() if format == 'latex' else RENDERERS[format].iter_document(self)
+        for chunk in chunks:
+            stream.write(chunk)
     
     def build_complete_document(self) -> str:
         """Build complete standalone LaTeX document"""
-        parts = []
-        
-        # Document header and packages
-        parts.append(r'%%%%%%%%%%%%%%%%%')
-        parts.append(r'% Updated CV tailored for Founding CTO role at JobTalk.ai')
-        parts.append(r'%%%%%%%%%%%%%%%%%')
-        parts.append(r'')
-        parts.append(r'\documentclass[9pt,a4paper,ragged2e]{altacv}')
-        parts.append(r'\usepackage[T1]{fontenc}')
-        parts.append(r'\usepackage[utf8]{inputenc}')
-        parts.append(r'\usepackage{paracol}')
-        parts.append(r'\usepackage{hyperref}')
-        parts.append(r'\usepackage{fontawesome}')
-        parts.append(r'')
-        parts.append(r'% Page geometry')
-        parts.append(r'\geometry{%')
-        parts.append(r'  left=1.5cm,')
-        parts.append(r'  right=1.5cm,')
-        parts.append(r'  top=1.5cm,')
-        parts.append(r'  bottom=1.5cm,')
-        parts.append(r'  marginparwidth=0pt,')
-        parts.append(r'  marginparsep=0pt')
-        parts.append(r'}')
-        parts.append(r'')
-        parts.append(r'% Fonts')
-        parts.append(r'\ifxetexorluatex')
-        parts.append(r'  \setmainfont{Carlito}')
-        parts.append(r'\else')
-        parts.append(r'  \usepackage[utf8]{inputenc}')
-        parts.append(r'  \usepackage[T1]{fontenc}')
-        parts.append(r'  \usepackage[default]{lato}')
-        parts.append(r'\fi')
-        parts.append(r'')
-        parts.append(r'% Colours')
-        parts.append(r'\definecolor{VividPurple}{HTML}{1282a2}')
-        parts.append(r'\definecolor{VividPurplee}{HTML}{006c67}')
-        parts.append(r'\definecolor{SlateGrey}{HTML}{001f54}')
-        parts.append(r'\definecolor{LightGrey}{HTML}{0a1128}')
-        parts.append(r'\colorlet{heading}{VividPurple}')
-        parts.append(r'\colorlet{accent}{VividPurplee}')
-        parts.append(r'\colorlet{emphasis}{SlateGrey}')
-        parts.append(r'\colorlet{body}{LightGrey}')
-        parts.append(r'')
-        parts.append(r'% Bullet styles')
-        parts.append(r'\renewcommand{\itemmarker}{{\small\textbullet}}')
-        parts.append(r'\renewcommand{\ratingmarker}{\faCircle}')
-        parts.append(r'')
-        parts.append(r'\addbibresource{sample.bib}')
-        parts.append(r'')
-        parts.append(r'% ----------------------------------------------------------------------')
-        parts.append(r'%                               HEADER')
-        parts.append(r'% ----------------------------------------------------------------------')
-        parts.append(r'\begin{document}')
-        
-        # Add personal info
-        if self.profile:
-            name = self.profile.get('name', '')
-            tagline = self.profile.get('tagline', '')
-            parts.append(f'\\name{{{self.escape_latex(name)}}}')
-            parts.append(f'\\tagline{{{self.escape_latex(tagline)}}}')
-            parts.append('')
-            parts.append('\\personalinfo{')
-            
-            # Add contact information
-            contact_info = self.format_contact_info()
-            if contact_info:
-                parts.append(contact_info)
-            
-            parts.append('}')
-            parts.append('')
-        
-        parts.append(r'\begin{fullwidth}')
-        parts.append(r'\makecvheader')
-        parts.append(r'\end{fullwidth}')
-        parts.append('')
-        parts.append(r'% Ensure smaller font for itemize')
-        parts.append(r'\AtBeginEnvironment{itemize}{\small}')
-        parts.append('')
-        
-        # Add profile section
-        if self.profile and self.profile.get('summary'):
-            parts.append(r'% ----------------------------------------------------------------------')
-            parts.append(r'%                               PROFILE')
-            parts.append(r'% ----------------------------------------------------------------------')
-            parts.append(r'\cvsection[]{Profil}')
-            parts.append(f'{self.escape_latex(self.profile["summary"])}')
-            parts.append('')
-            parts.append(r'\vspace{4pt}')
-            parts.append('')
-        
-        # Add main content layout
-        main_layout = self.build_new_layout()
-        parts.append(main_layout)
-        
-        # Close document
-        parts.append(r'\end{document}')
-        
-        return '\n'.join(parts)
+        return ''.join(self.iter_document())
+    
+    def iter_document(self) -> Iterator[str]:
+        """Yield the complete standalone LaTeX document in chunks"""
+        if self.tracer.enabled:
+            return self.tracer.timed('document', self._document_chunks, 'document')
+        return self._document_chunks()
+    
+    def _document_chunks(self) -> Iterator[str]:
+        """Fill the compiled document template with the rendered sections"""
+        personal_info = None
+        if self.profile and self.plan.header:
+            personal_info = PERSONAL_INFO_TEMPLATE.render({
+                'name': self.escape_latex(self.profile.name),
+                'tagline': self.escape_latex(self.profile.tagline),
+                'contact': self.iter_section('contact'),
+            })
+        
+        profile = None
+        if self.profile and self.profile.summary and self.plan.header:
+            profile = PROFILE_TEMPLATE.render({'summary': self.render_inline(self.profile.summary)})
+        
+        # The preamble is compiled once per set of template parameters
+        yield from compile_document_template(self.template_params).render({
+            'personal_info': personal_info,
+            'profile': profile,
+            'layout': self.iter_new_layout(),
+        })
     
     def build_new_layout(self):
-        """Build the new two-column layout"""
-        layout_parts = []
-        
-        # First two-column section: Professional Experience and Diplomas
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'%                       PROFESSIONAL EXPERIENCE & DIPLOMAS')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'\begin{paracol}{2}')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'%                             COLUMN 1')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'\cvsection{Professional experience}')
-        
-        # Add professional experience
-        experience_section = self.format_experience_section()
-        if experience_section:
-            layout_parts.append(experience_section)
-        else:
-            layout_parts.append(r'\vspace{4pt}')
-        
-        # Add interests under professional experience in first column
-        if self.interests:
-            layout_parts.append(r'\vspace{4pt}')
-            layout_parts.append(r'\cvsection{Interests}')
-            interests_section = self.format_interests_section()
-            if interests_section:
-                layout_parts.append(interests_section)
-        
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'%                             COLUMN 2')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'\switchcolumn')
-        layout_parts.append(r'\cvsection{Diplomas}')
-        
-        # Add diplomas
-        diplomas_section = self.format_diplomas_section()
-        if diplomas_section:
-            layout_parts.append(diplomas_section)
-        
-        # Add hard skills under diplomas
-        if self.hard_skills:
-            layout_parts.append(r'\vspace{2pt}')
-            layout_parts.append(r'\cvsection{Hard Skills}')
-            hard_skills_section = self.format_hard_skills_section()
-            if hard_skills_section:
-                layout_parts.append(hard_skills_section)
-        
-        layout_parts.append(r'\end{paracol}')
-        
-        # Page break between sections
-        layout_parts.append(r'\newpage')
-        
-        # Second two-column section: Side Projects and Soft Skills
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'%                         SIDE PROJECTS & SOFT SKILLS')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'\begin{paracol}{2}')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'%                             COLUMN 1')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'\cvsection{Side projects}')
-        
-        # Add side projects
-        side_projects_section = self.format_side_projects_section()
-        if side_projects_section:
-            layout_parts.append(side_projects_section)
-        
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'%                             COLUMN 2')
-        layout_parts.append(r'% ----------------------------------------------------------------------')
-        layout_parts.append(r'\switchcolumn')
-        
-        # Add soft skills
-        if self.soft_skills:
-            layout_parts.append(r'\cvsection{Soft Skills}')
-            soft_skills_section = self.format_soft_skills_section()
-            if soft_skills_section:
-                layout_parts.append(soft_skills_section)
-        
-        # Add languages under soft skills in second column
-        if self.languages:
-            layout_parts.append(r'')  # Add empty line for proper separation
-            layout_parts.append(r'\vspace{2pt}')
-            layout_parts.append(r'% ----------------------------------------------------------------------')
-            layout_parts.append(r'%                             LANGUAGES')
-            layout_parts.append(r'% ----------------------------------------------------------------------')
-            layout_parts.append(r'\cvsection{Languages}')
-            languages_section = self.format_languages_section()
-            if languages_section:
-                layout_parts.append(r'\begin{itemize}')
-                layout_parts.append(languages_section)
-                layout_parts.append(r'\end{itemize}')
-        
-        layout_parts.append(r'\end{paracol}')
-        
-        return '\n'.join(layout_parts)
-    
-    def run(self):
-        """Main execution method"""
-        print("Starting CV parsing process...")
-        self.load_all_data()
-        self.generate_custom_tex()
-        print("CV parsing completed!")
+        """Build the page layout of the plan"""
+        return ''.join(self.iter_new_layout())
+    
+    def iter_new_layout(self) -> Iterator[str]:
+        """Yield the page layout of the plan in chunks"""
+        # Optional blocks are only rendered for sections that have data; the
+        # template drops the line of any block whose value turns out empty
+        slots = {}  # type: Dict[str, Any]
+        for block in self.plan.blocks():
+            if block.optional and not getattr(self, block.attribute):
+                continue
+            slots[block.slot] = block.template.render({'body': self._block_body(block.section)})
+        yield from self.plan.template.render(slots)
+    
+    def _block_body(self, section: str) -> Any:
+        """Rendered chunks of a section as placed in a layout block"""
+        if section == 'experience':
+            experience = peek_chunks(self.iter_section('experience'))
+            return experience if experience is not None else r'\vspace{4pt}'
+        if section == 'languages':
+            languages = peek_chunks(self.iter_section('languages'))
+            return LANGUAGES_LIST_TEMPLATE.render({'languages': languages}) if languages is not None else None
+        return self.iter_section(section)
+    
+    def run(self, candidate: Optional[str] = None, fit_pages: Optional[int] = None,
+            formats: Optional[List[str]] = None, layouts: Optional[List[RenderPlan]] = None) -> List[Path]:
+        """Main execution method; formats other than LaTeX alone are written by generate_outputs
+        
+        With several layouts the sections any of them needs are loaded once,
+        and each layout is written next to the output file under its own name
+        (isso_custom.short.tex). Returns the LaTeX output files.
+        """
+        logger.info("Starting CV parsing process...")
+        plans = layouts or [self.plan]
+        self.load_all_data(candidate, plan_attributes(plans))
+        base_output, loaded = self.output_file, (self.experiences, self.side_projects)
+        written = []
+        for plan in plans:
+            # Fitting trims entries for one layout only; every layout starts from the loaded data
+            self.plan = plan
+            self.spacing = EntrySpacing()
+            self.experiences, self.side_projects = loaded
+            if len(plans) > 1:
+                self.output_file = layout_output_file(base_output, plan)
+            if fit_pages:
+                self.fit_to_pages(fit_pages)
+            if formats and formats != ['latex']:
+                self.generate_outputs(formats)
+            else:
+                self.generate_custom_tex()
+            written.append(self.output_file)
+        self.output_file = base_output
+        logger.info("CV parsing completed!")
+        return written
 
 
 def main():
     """Main function"""
-    parser = SimpleCVParser()
-    parser.run()
+    arg_parser = argparse.ArgumentParser(description="Generate isso_custom.tex from the CV_json files")
+    arg_parser.add_argument("--json-dir", default="../CV_json",
+                            help="CV_json-shaped folder, a packed file written by cv_pack.py, a JSON Resume file, "
+                                 "or a zip/tar archive of bundles")
+    arg_parser.add_argument("--candidate", help="Bundle to load from a packed file or archive holding several")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always re-parse the source files")
+    arg_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Folder for the parsed-data cache")
+    arg_parser.add_argument("--no-fragment-cache", action="store_true",
+                            help="Stream every section instead of caching its rendered LaTeX as a string")
+    arg_parser.add_argument("--stdout", action="store_true",
+                            help="Stream the LaTeX document to stdout instead of isso_custom.tex")
+    arg_parser.add_argument("--template-config",
+                            help="JSON file of template parameters (header comment, geometry, colours)")
+    arg_parser.add_argument("--header-comment", help="Comment written at the top of the document")
+    arg_parser.add_argument("--formats", default="latex",
+                            help=f"Comma-separated output formats ({', '.join(RENDERERS)}), written together "
+                                 "next to the LaTeX output")
+    arg_parser.add_argument("--layout", default="default", metavar="LAYOUT[,LAYOUT...]",
+                            help="Page layout: a built-in name (default, short) or a JSON layout file; several, "
+                                 "comma-separated, are each written as isso_custom.<name>.tex from data loaded once")
+    arg_parser.add_argument("--validate", action="store_true",
+                            help="Check the source files against their schemas first and stop on any error")
+    arg_parser.add_argument("--fit-pages", type=int, metavar="PAGES",
+                            help="Tighten spacing and drop low-priority highlights to fit PAGES (estimated, no pdflatex)")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="Stay resident and regenerate the output whenever a source file changes")
+    arg_parser.add_argument("--compile", nargs="?", const=DEFAULT_COMPILER, metavar="COMMAND",
+                            help="Also compile the PDF (default compiler: pdflatex)")
+    arg_parser.add_argument("--no-format", action="store_true",
+                            help="Compile without the pre-dumped preamble format")
+    arg_parser.add_argument("--no-pdf-cache", action="store_true",
+                            help="Always run the compiler, even for a document compiled before")
+    arg_parser.add_argument("--pdf-cache-size", type=float, default=DEFAULT_PDF_CACHE_BYTES / (1024 * 1024),
+                            metavar="MIB", help="Size bound of the compiled-PDF store under the cache folder")
+    arg_parser.add_argument("--compile-timeout", type=float, default=DEFAULT_TIMEOUT,
+                            help="Seconds before a compile is aborted")
+    arg_parser.add_argument("--max-passes", type=int, default=DEFAULT_MAX_PASSES,
+                            help="Most compiler passes per PDF; passes stop once the .aux/.out/.bbl files are stable")
+    arg_parser.add_argument("--bibtex", default=DEFAULT_BIBTEX, metavar="COMMAND",
+                            help="Bibliography command for \\bibliography documents, run only when something is cited")
+    arg_parser.add_argument("--biber", default=DEFAULT_BIBER, metavar="COMMAND",
+                            help="Bibliography command for biblatex documents, run only when something is cited")
+    arg_parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                            help="Seconds of quiet to wait for after a save before rebuilding")
+    arg_parser.add_argument("--no-inotify", action="store_true", help="Poll the source folder instead of using inotify")
+    arg_parser.add_argument("--trace", metavar="FILE",
+                            help="Time every pipeline stage and write a Chrome trace-event JSON file")
+    arg_parser.add_argument("--quiet", action="store_true", help="Only print warnings and errors")
+    args = arg_parser.parse_args()
+    
+    set_quiet(args.quiet)
+    
+    try:
+        template_params = load_template_params(args.template_config, header_comment=args.header_comment)
+    except (OSError, ValueError) as e:
+        arg_parser.error(f"invalid template config: {e}")
+    try:
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        arg_parser.error(str(e))
+    if args.stdout and len(formats) > 1:
+        arg_parser.error("--stdout streams a single format")
+    if args.compile and 'latex' not in formats:
+        arg_parser.error("--compile needs the latex format")
+    if args.watch and formats != ['latex']:
+        arg_parser.error("--watch only regenerates the LaTeX output")
+    if args.watch and Path(args.json_dir).is_file():
+        arg_parser.error("--watch needs a bundle folder, not a packed file or archive")
+    try:
+        layouts = load_layouts(name.strip() for name in args.layout.split(',') if name.strip())
+    except (OSError, LayoutError) as e:
+        arg_parser.error(f"invalid layout: {e}")
+    if not layouts:
+        arg_parser.error("--layout needs at least one layout")
+    if len(layouts) > 1 and (args.stdout or args.watch):
+        arg_parser.error("--stdout and --watch render a single layout")
+    if args.validate:
+        report = validate_bundle(args.json_dir, args.candidate,
+                                 validation_cache(args.cache_dir, enabled=not args.no_cache))
+        print_report(report, file=sys.stderr)
+        if not report.ok:
+            sys.exit(f"{len(report.errors)} validation errors in {args.json_dir}, nothing rendered")
+    tracer = Tracer() if args.trace else None
+    parser = SimpleCVParser(json_dir=args.json_dir, use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                            template_params=template_params, tracer=tracer, layout=layouts[0],
+                            fragment_cache=not args.no_fragment_cache)
+    compiler = None
+    if args.compile:
+        pdf_cache = PdfCache(args.cache_dir, max_bytes=int(args.pdf_cache_size * 1024 * 1024),
+                             enabled=not args.no_pdf_cache)
+        compiler = LatexCompiler(args.compile, cache_dir=args.cache_dir, use_format=not args.no_format,
+                                 timeout=args.compile_timeout, pdf_cache=pdf_cache,
+                                 max_passes=args.max_passes, bibtex=args.bibtex, biber=args.biber)
+    if args.watch:
+        watch(parser, compiler=compiler, debounce=args.debounce, use_inotify=not args.no_inotify)
+    elif args.stdout:
+        # Keep progress messages out of the streamed document
+        with contextlib.redirect_stdout(sys.stderr):
+            parser.load_all_data(args.candidate)
+            if args.fit_pages:
+                parser.fit_to_pages(args.fit_pages)
+        parser.write_document(sys.stdout, formats[0])
+    else:
+        outputs = parser.run(args.candidate, args.fit_pages, formats, layouts)
+        if compiler:
+            print_compile_results([compiler.compile(job_for(output)) for output in outputs], compiler.pdf_cache,
+                                  per_job=True)
+    if tracer:
+        tracer.write_chrome_trace(args.trace)
+        # The summary never goes into a document streamed to stdout
+        print(tracer.summary_table(), file=sys.stderr if args.stdout else sys.stdout)
+        print(f"Wrote trace to {args.trace}", file=sys.stderr if args.stdout else sys.stdout)
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
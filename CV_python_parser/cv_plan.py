@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Layout plans - Page layouts described as data and compiled into render plans
+A layout lists pages, each split into one or two columns holding an ordered run of
+sections with optional space before them. compile_layout() validates it once and
+returns a RenderPlan: the compiled layout template, one block per placed section
+and the source files those sections need, so loading reads nothing the layout
+leaves out.
+
+    python cv_plan.py show short
+    python cv_plan.py show my_layout.json
+"""
+
+import argparse
+import json
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from cv_model import SOURCE_FILES
+from cv_template import BANNER_RULE, SECTION_BLOCK_SKELETONS, CompiledTemplate, compile_skeleton
+
+
+# The two-page layout the parser has always rendered, its banners kept as they were written
+DEFAULT_LAYOUT = {
+    'name': 'default',
+    'header': True,
+    'pages': [
+        {'title': 'PROFESSIONAL EXPERIENCE & DIPLOMAS',
+         'banner': '%                       PROFESSIONAL EXPERIENCE & DIPLOMAS',
+         'columns': [['experience', {'section': 'interests', 'space_before': '4pt'}],
+                     ['diplomas', {'section': 'hard_skills', 'space_before': '2pt'}]]},
+        {'title': 'SIDE PROJECTS & SOFT SKILLS',
+         'banner': '%                         SIDE PROJECTS & SOFT SKILLS',
+         'columns': [['side_projects'],
+                     ['soft_skills', {'section': 'languages', 'space_before': '2pt'}]]},
+    ],
+}
+
+# One page, without side projects, soft skills or interests
+SHORT_LAYOUT = {
+    'name': 'short',
+    'header': True,
+    'pages': [
+        {'title': 'PROFESSIONAL EXPERIENCE & SKILLS',
+         'columns': [['experience'],
+                     ['diplomas', {'section': 'hard_skills', 'space_before': '2pt'},
+                      {'section': 'languages', 'space_before': '2pt'}]]},
+    ],
+}
+
+LAYOUTS = {layout['name']: layout for layout in (DEFAULT_LAYOUT, SHORT_LAYOUT)}
+
+# Placeable section -> the parser attribute (source file) it renders
+SECTION_ATTRIBUTES = {
+    'experience': 'experiences',
+    'diplomas': 'diplomas',
+    'side_projects': 'side_projects',
+    'interests': 'interests',
+    'hard_skills': 'hard_skills',
+    'soft_skills': 'soft_skills',
+    'languages': 'languages',
+}
+# Sections whose whole block, heading included, is left out when they have no data
+OPTIONAL_SECTIONS = frozenset({'interests', 'hard_skills', 'soft_skills', 'languages'})
+MAX_COLUMNS = 2
+
+# Lengths the page-fit estimator can measure
+_LENGTH_RE = re.compile(r'-?\d+(\.\d+)?(pt|bp|mm|cm|in)')
+_NAME_RE = re.compile(r'[A-Za-z0-9_-]+')
+
+
+class LayoutError(ValueError):
+    """A layout description that cannot be compiled"""
+
+
+class Block(NamedTuple):
+    """One section placed in a column, its template compiled with the space before it"""
+    section: str
+    attribute: str
+    space_before: Optional[str]
+    optional: bool
+    slot: str
+    template: CompiledTemplate
+
+
+class RenderPlan(NamedTuple):
+    """A validated layout, compiled once and shared by every render using it"""
+    name: str
+    header: bool
+    pages: Tuple[Tuple[Tuple[Block, ...], ...], ...]
+    template: CompiledTemplate
+    attributes: Tuple[str, ...]
+
+    def blocks(self) -> Iterator[Block]:
+        """Every block in page and column order"""
+        for page in self.pages:
+            for column in page:
+                yield from column
+
+    @property
+    def files(self) -> Tuple[str, ...]:
+        """Source files a render with this plan reads"""
+        return tuple(filename for attribute, filename in SOURCE_FILES if attribute in self.attributes)
+
+
+def _banner(title: str) -> str:
+    """The comment line of a page title, centred on the 80-column line"""
+    return '%' + ' ' * max(1, (80 - len(title)) // 2) + title
+
+
+def _placement(value: Any, where: str) -> Tuple[str, Optional[str]]:
+    """(section, space before) of a placement given as a name or {"section", "space_before"}"""
+    if isinstance(value, str):
+        value = {'section': value}
+    if not isinstance(value, dict):
+        raise LayoutError(f"{where}: expected a section name or an object, got {type(value).__name__}")
+    unknown = set(value) - {'section', 'space_before'}
+    if unknown:
+        raise LayoutError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+    section = value.get('section')
+    if section not in SECTION_ATTRIBUTES:
+        raise LayoutError(f"{where}: unknown section {section!r}, expected one of {', '.join(SECTION_ATTRIBUTES)}")
+    space = value.get('space_before')
+    if space is not None and not (isinstance(space, str) and _LENGTH_RE.fullmatch(space)):
+        raise LayoutError(f"{where}: space_before must be a length such as \"4pt\", got {space!r}")
+    return section, space
+
+
+def validate_layout(layout: Any) -> Tuple[str, bool, List[Tuple[Optional[str], List[List[Tuple[str, Optional[str]]]]]]]:
+    """Check a layout description, returning (name, header, [(page banner line, columns of placements)])
+
+    Raises LayoutError naming the offending entry; each section may be
+    placed at most once in a layout. A page banner is its title centred,
+    unless the page gives the comment line itself as "banner".
+    """
+    if not isinstance(layout, dict):
+        raise LayoutError("a layout must be an object")
+    unknown = set(layout) - {'name', 'header', 'pages'}
+    if unknown:
+        raise LayoutError(f"unknown keys {', '.join(sorted(unknown))}")
+    name = layout.get('name')
+    if not isinstance(name, str) or not _NAME_RE.fullmatch(name):
+        raise LayoutError(f"name must be letters, digits, '-' or '_', got {name!r}")
+    header = layout.get('header', True)
+    if not isinstance(header, bool):
+        raise LayoutError("header must be true or false")
+    pages = layout.get('pages')
+    if not isinstance(pages, list) or not pages:
+        raise LayoutError("pages must be a non-empty list")
+
+    placed = {}  # type: Dict[str, str]
+    result = []
+    for p, page in enumerate(pages):
+        where = f"pages[{p}]"
+        if not isinstance(page, dict) or set(page) - {'title', 'banner', 'columns'}:
+            raise LayoutError(f"{where}: expected an object with columns and an optional title")
+        title = page.get('title')
+        if title is not None and not (isinstance(title, str) and title.strip() and '\n' not in title):
+            raise LayoutError(f"{where}.title: expected a single line of text")
+        banner = page.get('banner')
+        if banner is not None and not (isinstance(banner, str) and banner.startswith('%')
+                                       and banner.splitlines() == [banner]):
+            raise LayoutError(f"{where}.banner: expected a single comment line starting with %")
+        if banner is None and title:
+            banner = _banner(title)
+        columns = page.get('columns')
+        if not isinstance(columns, list) or not 1 <= len(columns) <= MAX_COLUMNS:
+            raise LayoutError(f"{where}.columns: expected a list of 1 to {MAX_COLUMNS} columns")
+        page_columns = []
+        for c, column in enumerate(columns):
+            if not isinstance(column, list) or not column:
+                raise LayoutError(f"{where}.columns[{c}]: expected a non-empty list of sections")
+            placements = []
+            for s, value in enumerate(column):
+                location = f"{where}.columns[{c}][{s}]"
+                section, space = _placement(value, location)
+                if section in placed:
+                    raise LayoutError(f"{location}: {section} is already placed at {placed[section]}")
+                placed[section] = location
+                placements.append((section, space))
+            page_columns.append(placements)
+        result.append((banner, page_columns))
+    return name, header, result
+
+
+def compile_layout(layout: Dict[str, Any]) -> RenderPlan:
+    """Validate a layout description and compile it into a render plan"""
+    return _compile(json.dumps(layout, sort_keys=True))
+
+
+@lru_cache(maxsize=32)
+def _compile(canonical: str) -> RenderPlan:
+    """Compile a layout once per process, keyed by its canonical JSON"""
+    name, header, pages = validate_layout(json.loads(canonical))
+    lines = []  # type: List[str]
+    compiled_pages = []
+    for p, (banner, columns) in enumerate(pages):
+        if p:
+            lines.append(r'\newpage')
+        if banner:
+            lines.extend([BANNER_RULE, banner, BANNER_RULE])
+        lines.append(rf'\begin{{paracol}}{{{len(columns)}}}')
+        compiled_columns = []
+        for c, placements in enumerate(columns):
+            lines.extend([BANNER_RULE, f'%                             COLUMN {c + 1}', BANNER_RULE])
+            if c:
+                lines.append(r'\switchcolumn')
+            blocks = []
+            for section, space in placements:
+                slot = f'block_{section}'
+                skeleton = SECTION_BLOCK_SKELETONS[section].replace(
+                    '<<?space>>', rf'\vspace{{{space}}}' if space else '<<?space>>')
+                blocks.append(Block(section, SECTION_ATTRIBUTES[section], space, section in OPTIONAL_SECTIONS,
+                                    slot, compile_skeleton(skeleton)))
+                lines.append(f'<<?{slot}>>')
+            compiled_columns.append(tuple(blocks))
+        lines.append(r'\end{paracol}')
+        compiled_pages.append(tuple(compiled_columns))
+
+    needed = {block.attribute for page in compiled_pages for column in page for block in column}
+    if header:
+        needed.add('profile')
+    attributes = tuple(attribute for attribute, _ in SOURCE_FILES if attribute in needed)
+    return RenderPlan(name, header, tuple(compiled_pages), compile_skeleton('\n'.join(lines)), attributes)
+
+
+def load_layout(name_or_path: str) -> RenderPlan:
+    """The plan of a built-in layout by name, or of a layout stored in a JSON file"""
+    if name_or_path in LAYOUTS:
+        return compile_layout(LAYOUTS[name_or_path])
+    path = Path(name_or_path)
+    if not path.is_file():
+        raise LayoutError(f"no layout named {name_or_path!r} (built-in: {', '.join(LAYOUTS)}) and no such file")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            layout = json.load(f)
+    except ValueError as e:
+        raise LayoutError(f"{path}: {e}") from None
+    return compile_layout(layout)
+
+
+def load_layouts(names: Iterable[str]) -> List[RenderPlan]:
+    """Plans for a list of layout names or files, refusing two layouts of the same name"""
+    plans = [load_layout(name) for name in names]
+    seen = set()
+    for plan in plans:
+        if plan.name in seen:
+            raise LayoutError(f"layout {plan.name!r} is given twice")
+        seen.add(plan.name)
+    return plans
+
+
+def plan_attributes(plans: Sequence[RenderPlan]) -> Tuple[str, ...]:
+    """Attributes needed by any of the plans, loaded once for all of them"""
+    needed = {attribute for plan in plans for attribute in plan.attributes}
+    return tuple(attribute for attribute, _ in SOURCE_FILES if attribute in needed)
+
+
+def layout_output_file(output_file: Path, plan: RenderPlan) -> Path:
+    """Output path of one of several layouts rendered together: isso_custom.tex -> isso_custom.short.tex"""
+    return output_file.with_name(f"{output_file.stem}.{plan.name}{output_file.suffix}")
+
+
+def describe_plan(plan: RenderPlan) -> str:
+    """Human readable outline of a plan"""
+    lines = [f"{plan.name}: {len(plan.pages)} page(s){', header and profile' if plan.header else ''}"]
+    for p, page in enumerate(plan.pages):
+        for c, column in enumerate(page):
+            sections = ', '.join(block.section + (f" (+{block.space_before})" if block.space_before else '')
+                                 for block in column)
+            lines.append(f"  page {p + 1} column {c + 1}: {sections}")
+    lines.append(f"  reads: {', '.join(plan.files)}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Command line entry point for checking layouts"""
+    arg_parser = argparse.ArgumentParser(description="Validate and inspect CV page layouts")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="Validate layouts and print what they place and read")
+    show.add_argument("layouts", nargs="*", help=f"Built-in layout names ({', '.join(LAYOUTS)}) or JSON files; "
+                                                  "all built-in layouts by default")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        plans = load_layouts(args.layouts or list(LAYOUTS))
+    except (OSError, LayoutError) as e:
+        arg_parser.error(str(e))
+    for plan in plans:
+        print(describe_plan(plan))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
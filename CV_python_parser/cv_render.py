@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Renderer backends - One loaded CV written as LaTeX, HTML, Markdown or JSON Resume
+Every backend reads the records the parser already loaded, so a candidate is
+parsed and normalized once however many formats are requested; the outputs
+are then streamed to their files concurrently, one thread per format.
+"""
+
+import html
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from cv_cache import stream_if_changed
+from cv_model import Contact, Profile, SkillCategory
+from inline_markup import render_inline_html, render_inline_text
+
+
+# Section headings, the same as in the LaTeX document
+HEADINGS = {
+    'profile': 'Profil',
+    'experiences': 'Professional experience',
+    'side_projects': 'Side projects',
+    'diplomas': 'Diplomas',
+    'hard_skills': 'Hard Skills',
+    'soft_skills': 'Soft Skills',
+    'languages': 'Languages',
+    'interests': 'Interests',
+}
+
+# Reading order of the single-column formats
+SECTION_ORDER = ('experiences', 'side_projects', 'diplomas', 'hard_skills', 'soft_skills', 'languages', 'interests')
+
+NOT_PUBLIC = "Not public yet"
+
+_MONTHS = {month: i for i, month in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+_DATE_RE = re.compile(r'^(?:([A-Za-z]{3})[a-z]*\.?\s+)?(\d{4})$')
+
+
+def project_links(url: str) -> List[str]:
+    """The public links of a side project (its url field may list several, comma-separated)"""
+    if not url or url == NOT_PUBLIC:
+        return []
+    return [link.strip() for link in url.split(',') if link.strip()]
+
+
+def absolute_url(url: str) -> str:
+    """Prefix a bare "linkedin.com/in/..." style address with https://"""
+    return url if '://' in url else f"https://{url}"
+
+
+def iso_date(text: str) -> Optional[str]:
+    """"Dec 2023" -> "2023-12", "2020" -> "2020"; None for anything else ("Present")"""
+    match = _DATE_RE.match(text.strip())
+    if not match:
+        return None
+    month, year = match.groups()
+    if month is None:
+        return year
+    number = _MONTHS.get(month.lower())
+    return f"{year}-{number:02d}" if number else year
+
+
+def date_range(dates: str) -> Tuple[Optional[str], Optional[str]]:
+    """ISO start and end of a "Mar 2020 - Nov 2023" range; an open range has no end, a single date is both"""
+    parts = re.split(r'\s+[-–]+\s+', dates.strip(), maxsplit=1)
+    start = iso_date(parts[0]) if parts[0] else None
+    end = iso_date(parts[1]) if len(parts) > 1 else start
+    return start, end
+
+
+def contact_links(contact: Contact) -> List[Tuple[str, Optional[str]]]:
+    """(text, href) for each contact line present, in the order of the LaTeX header"""
+    links = []
+    if contact.email is not None:
+        links.append((str(contact.email), f"mailto:{contact.email}"))
+    if contact.phone is not None:
+        links.append((str(contact.phone), f"tel:{re.sub(r'[^0-9+]', '', str(contact.phone))}"))
+    if contact.location is not None:
+        links.append((str(contact.location), None))
+    if contact.linkedin is not None:
+        links.append((str(contact.linkedin), absolute_url(str(contact.linkedin))))
+    if contact.age is not None:
+        links.append((f"Age: {contact.age}", None))
+    return links
+
+
+class Renderer:
+    """A backend: its format name, output file suffix and document chunks"""
+    name = ''
+    suffix = ''
+
+    def iter_document(self, parser: Any) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class LatexRenderer(Renderer):
+    """The parser's own LaTeX document, byte for byte"""
+    name = 'latex'
+    suffix = '.tex'
+
+    def iter_document(self, parser: Any) -> Iterator[str]:
+        return parser.iter_document()
+
+
+class MarkdownRenderer(Renderer):
+    """GitHub-flavoured Markdown; highlights keep their inline markup as written"""
+    name = 'markdown'
+    suffix = '.md'
+
+    def iter_document(self, parser: Any) -> Iterator[str]:
+        profile = parser.profile  # type: Optional[Profile]
+        if profile:
+            yield f"# {profile.name}\n\n"
+            if profile.tagline:
+                yield f"**{profile.tagline}**\n\n"
+            if profile.contact is not None:
+                yield ' · '.join(f"[{text}]({href})" if href else text
+                                 for text, href in contact_links(profile.contact)) + '\n\n'
+            if profile.summary:
+                yield f"## {HEADINGS['profile']}\n\n{profile.summary}\n\n"
+        for attribute in SECTION_ORDER:
+            entries = getattr(parser, attribute)
+            if entries:
+                yield f"## {HEADINGS[attribute]}\n\n"
+                yield from getattr(self, attribute)(entries)
+
+    def _entries(self, entries: Sequence[Any], subtitle_field: str) -> Iterator[str]:
+        for entry in entries:
+            subtitle = getattr(entry, subtitle_field)
+            yield f"### {entry.title}" + (f" — {subtitle}" if subtitle else '') + '\n\n'
+            when = ' · '.join(part for part in (entry.dates, entry.location) if part)
+            if when:
+                yield f"*{when}*\n\n"
+            links = project_links(getattr(entry, 'url', ''))
+            if entry.highlights or links:
+                for highlight in entry.highlights:
+                    yield f"- {highlight}\n"
+                for link in links:
+                    yield f"- <{link}>\n"
+                yield '\n'
+            if entry.tags:
+                yield ' '.join(f"`{tag}`" for tag in entry.tags) + '\n\n'
+
+    def experiences(self, entries: Sequence[Any]) -> Iterator[str]:
+        return self._entries(entries, 'company')
+
+    def side_projects(self, entries: Sequence[Any]) -> Iterator[str]:
+        return self._entries(entries, 'role')
+
+    def diplomas(self, entries: Sequence[Any]) -> Iterator[str]:
+        for diploma in entries:
+            details = ' · '.join(part for part in (diploma.school, diploma.years, diploma.location) if part)
+            yield f"### {diploma.title}\n\n" + (f"{details}\n\n" if details else '')
+
+    def _categories(self, categories: Sequence[SkillCategory]) -> Iterator[str]:
+        for category in categories:
+            if category.items is not None:
+                yield f"- **{category.name}:** {' | '.join(category.items)}\n"
+        yield '\n'
+
+    hard_skills = soft_skills = interests = _categories
+
+    def languages(self, entries: Sequence[Any]) -> Iterator[str]:
+        for language in entries:
+            level = ' '.join(part for part in (language.level, language.descriptor) if part)
+            yield f"- **{language.name}**" + (f" — {level}" if level else '') + '\n'
+        yield '\n'
+
+
+_HTML_STYLE = """body{font-family:Lato,Helvetica,Arial,sans-serif;max-width:52em;margin:2em auto;padding:0 1em;color:#222;line-height:1.45}
+h1{margin-bottom:0}h2{color:#2e3d4f;border-bottom:1px solid #ccc;text-transform:uppercase;font-size:1.1em}
+h3{margin:1em 0 0;font-size:1em}.tagline{color:#2e3d4f;font-weight:bold;margin-top:.2em}
+.contact,.when{color:#555;font-size:.9em}.contact span+span:before{content:" · "}
+.tag{display:inline-block;border:1px solid #999;border-radius:3px;padding:0 .4em;margin:.1em;font-size:.85em}"""
+
+
+class HtmlRenderer(Renderer):
+    """A standalone, single-column web page with the same sections as the PDF"""
+    name = 'html'
+    suffix = '.html'
+
+    def iter_document(self, parser: Any) -> Iterator[str]:
+        profile = parser.profile  # type: Optional[Profile]
+        title = html.escape(profile.name) if profile else 'CV'
+        yield ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+               '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+               f'<title>{title}</title>\n<style>\n{_HTML_STYLE}\n</style>\n</head>\n<body>\n')
+        if profile:
+            yield f'<header>\n<h1>{html.escape(profile.name)}</h1>\n'
+            if profile.tagline:
+                yield f'<p class="tagline">{html.escape(profile.tagline)}</p>\n'
+            if profile.contact is not None:
+                yield '<p class="contact">' + ''.join(
+                    f'<span><a href="{html.escape(href)}">{html.escape(text)}</a></span>' if href
+                    else f'<span>{html.escape(text)}</span>'
+                    for text, href in contact_links(profile.contact)) + '</p>\n'
+            yield '</header>\n'
+            if profile.summary:
+                yield (f'<section id="profile">\n<h2>{HEADINGS["profile"]}</h2>\n'
+                       f'<p>{render_inline_html(profile.summary)}</p>\n</section>\n')
+        for attribute in SECTION_ORDER:
+            entries = getattr(parser, attribute)
+            if entries:
+                yield f'<section id="{attribute}">\n<h2>{HEADINGS[attribute]}</h2>\n'
+                yield from getattr(self, attribute)(entries)
+                yield '</section>\n'
+        yield '</body>\n</html>\n'
+
+    def _entries(self, entries: Sequence[Any], subtitle_field: str) -> Iterator[str]:
+        for entry in entries:
+            subtitle = getattr(entry, subtitle_field)
+            yield f'<article>\n<h3>{html.escape(entry.title)}'
+            if subtitle:
+                yield f' — {html.escape(subtitle)}'
+            yield '</h3>\n'
+            when = ' · '.join(part for part in (entry.dates, entry.location) if part)
+            if when:
+                yield f'<p class="when">{html.escape(when)}</p>\n'
+            links = project_links(getattr(entry, 'url', ''))
+            if entry.highlights or links:
+                yield '<ul>\n'
+                for highlight in entry.highlights:
+                    yield f'<li>{render_inline_html(highlight)}</li>\n'
+                for link in links:
+                    yield f'<li><a href="{html.escape(link)}">{html.escape(link)}</a></li>\n'
+                yield '</ul>\n'
+            if entry.tags:
+                yield '<p>' + ''.join(f'<span class="tag">{html.escape(str(tag))}</span>'
+                                      for tag in entry.tags) + '</p>\n'
+            yield '</article>\n'
+
+    def experiences(self, entries: Sequence[Any]) -> Iterator[str]:
+        return self._entries(entries, 'company')
+
+    def side_projects(self, entries: Sequence[Any]) -> Iterator[str]:
+        return self._entries(entries, 'role')
+
+    def diplomas(self, entries: Sequence[Any]) -> Iterator[str]:
+        for diploma in entries:
+            details = ' · '.join(part for part in (diploma.school, diploma.years, diploma.location) if part)
+            yield f'<h3>{html.escape(diploma.title)}</h3>\n'
+            if details:
+                yield f'<p class="when">{html.escape(details)}</p>\n'
+
+    def _categories(self, categories: Sequence[SkillCategory]) -> Iterator[str]:
+        yield '<ul>\n'
+        for category in categories:
+            if category.items is not None:
+                yield (f'<li><strong>{html.escape(category.name)}:</strong> '
+                       f'{html.escape(" | ".join(str(item) for item in category.items))}</li>\n')
+        yield '</ul>\n'
+
+    hard_skills = soft_skills = interests = _categories
+
+    def languages(self, entries: Sequence[Any]) -> Iterator[str]:
+        yield '<ul>\n'
+        for language in entries:
+            level = ' '.join(part for part in (language.level, language.descriptor) if part)
+            yield f'<li><strong>{html.escape(language.name)}</strong>'
+            if level:
+                yield f' — {html.escape(level)}'
+            yield '</li>\n'
+        yield '</ul>\n'
+
+
+class JsonResumeRenderer(Renderer):
+    """A JSON Resume (jsonresume.org, schema v1) document for ATS uploads
+
+    Free-text dates are converted to ISO 8601 where they can be ("Dec 2023"
+    -> "2023-12"); "Present" leaves endDate out and a single date such as
+    "2022" is both startDate and endDate. Inline markup is dropped.
+    """
+    name = 'jsonresume'
+    suffix = '.resume.json'
+
+    def iter_document(self, parser: Any) -> Iterator[str]:
+        yield json.dumps(self.resume(parser), ensure_ascii=False, indent=2)
+        yield '\n'
+
+    @staticmethod
+    def _dated(entry: Dict[str, Any], dates: str) -> Dict[str, Any]:
+        start, end = date_range(dates)
+        if start:
+            entry['startDate'] = start
+        if end:
+            entry['endDate'] = end
+        return entry
+
+    def resume(self, parser: Any) -> Dict[str, Any]:
+        resume = {'$schema': 'https://raw.githubusercontent.com/jsonresume/resume-schema/v1.0.0/schema.json'}
+        profile = parser.profile  # type: Optional[Profile]
+        if profile:
+            basics = {'name': profile.name, 'label': profile.tagline}  # type: Dict[str, Any]
+            contact = profile.contact
+            if contact is not None:
+                if contact.email is not None:
+                    basics['email'] = str(contact.email)
+                if contact.phone is not None:
+                    basics['phone'] = str(contact.phone)
+                if contact.location is not None:
+                    city, _, region = str(contact.location).partition(',')
+                    basics['location'] = {'city': city.strip(), 'region': region.strip()} if region else {
+                        'city': city.strip()}
+                if contact.linkedin is not None:
+                    basics['profiles'] = [{'network': 'LinkedIn', 'url': absolute_url(str(contact.linkedin))}]
+            if profile.summary:
+                basics['summary'] = render_inline_text(profile.summary)
+            resume['basics'] = basics
+
+        resume['work'] = [self._dated({
+            'name': experience.company,
+            'position': experience.title,
+            'location': experience.location,
+            'highlights': [render_inline_text(highlight) for highlight in experience.highlights],
+            'keywords': list(experience.tags),
+        }, experience.dates) for experience in parser.experiences]
+        resume['education'] = [self._dated({
+            'institution': diploma.school,
+            'studyType': diploma.title,
+            'location': diploma.location,
+        }, diploma.years) for diploma in parser.diplomas]
+        resume['skills'] = [{'name': category.name, 'keywords': list(category.items)}
+                            for category in parser.hard_skills + parser.soft_skills if category.items is not None]
+        resume['languages'] = [{'language': language.name,
+                                'fluency': ' '.join(part for part in (language.level, language.descriptor) if part)}
+                               for language in parser.languages]
+        resume['interests'] = [{'name': category.name, 'keywords': list(category.items)}
+                               for category in parser.interests if category.items is not None]
+        projects = []
+        for project in parser.side_projects:
+            entry = {
+                'name': project.title,
+                'roles': [project.role],
+                'highlights': [render_inline_text(highlight) for highlight in project.highlights],
+                'keywords': list(project.tags),
+            }  # type: Dict[str, Any]
+            links = project_links(project.url)
+            if links:
+                entry['url'] = links[0]
+            projects.append(self._dated(entry, project.dates))
+        resume['projects'] = projects
+        return resume
+
+
+# Format name -> backend; register new backends here
+RENDERERS = {renderer.name: renderer for renderer in (
+    LatexRenderer(), HtmlRenderer(), MarkdownRenderer(), JsonResumeRenderer())}  # type: Dict[str, Renderer]
+
+
+class RenderOutput(NamedTuple):
+    """One written output file"""
+    format: str
+    path: str
+    written: bool
+    seconds: float
+
+
+def parse_formats(value: str) -> List[str]:
+    """Validate a comma-separated list of format names ("latex,html"), keeping its order"""
+    formats = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if name not in RENDERERS:
+            raise ValueError(f"unknown format {name!r} (choose from {', '.join(RENDERERS)})")
+        if name not in formats:
+            formats.append(name)
+    return formats
+
+
+def output_path(latex_file: Path, name: str) -> Path:
+    """Output file of a format, next to and named after the LaTeX output"""
+    latex_file = Path(latex_file)
+    return latex_file.with_name(latex_file.stem + RENDERERS[name].suffix)
+
+
+def write_outputs(parser: Any, formats: Iterable[str], workers: Optional[int] = None) -> List[RenderOutput]:
+    """Render the loaded parser in every format, one writer thread per format
+
+    Each file is streamed through stream_if_changed, so an unchanged output
+    keeps its mtime. Results come back in the order of formats.
+    """
+    formats = list(formats)
+    tracer = parser.tracer
+
+    def write(name: str) -> RenderOutput:
+        path = output_path(parser.output_file, name)
+        start = time.perf_counter()
+        with tracer.span(f'write:{name}', 'write') as span:
+            written = stream_if_changed(path, RENDERERS[name].iter_document(parser))
+            if span:
+                span.args.update(bytes=path.stat().st_size, written=written)
+        return RenderOutput(name, str(path), written, time.perf_counter() - start)
+
+    workers = max(1, min(workers or len(formats), len(formats)))
+    if workers == 1:
+        return [write(name) for name in formats]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(write, formats))
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+JSON Resume input - Reads jsonresume.org (schema v1) documents as CV sources
+A bundle may hold a resume.json instead of, or next to, the CV_json files: its
+sections are mapped onto the dictionaries those files would hold, and a source
+file present in the bundle takes precedence over the section read from the
+resume. The mapping is the inverse of the jsonresume output of cv_render.
+
+    python cv_resume.py resume.json -o CV_json/
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from cv_model import SOURCE_FILES
+from dict_scanner import parse_source
+
+
+RESUME_FILE = 'resume.json'
+# A folder holding either file is a bundle
+BUNDLE_MARKERS = ('profile.json', RESUME_FILE)
+# Every file a bundle is read from
+BUNDLE_FILES = tuple(filename for _, filename in SOURCE_FILES) + (RESUME_FILE,)
+# Top-level keys of the schema; a JSON object with none of them is not a resume
+RESUME_KEYS = frozenset({'basics', 'work', 'volunteer', 'education', 'awards', 'certificates', 'publications',
+                         'skills', 'languages', 'interests', 'references', 'projects'})
+# Category holding the skills and interests given without keywords
+UNGROUPED_SKILLS = 'Skills'
+UNGROUPED_INTERESTS = 'Interests'
+
+_MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_ISO_DATE_RE = re.compile(r'(\d{4})(?:-(\d{2}))?(?:-\d{2})?')
+_URL_SCHEME_RE = re.compile(r'^https?://(www\.)?', re.IGNORECASE)
+
+
+def is_bundle(folder: Path) -> bool:
+    """Whether a folder holds a CV bundle, in CV_json files or as a JSON Resume"""
+    return folder.is_dir() and any((folder / marker).exists() for marker in BUNDLE_MARKERS)
+
+
+def is_resume_file(path: Union[str, Path]) -> bool:
+    """Whether a --json-dir file is a JSON Resume document rather than an archive or packed file"""
+    return Path(path).suffix.lower() == '.json'
+
+
+def is_json_resume(data: Any) -> bool:
+    return isinstance(data, dict) and not RESUME_KEYS.isdisjoint(data)
+
+
+def text_date(iso: Any) -> str:
+    """"2023-12" or "2023-12-05" -> "Dec 2023", "2020" -> "2020"; other text is kept as it is"""
+    if not isinstance(iso, str):
+        return ''
+    match = _ISO_DATE_RE.fullmatch(iso.strip())
+    if not match:
+        return iso.strip()
+    year, month = match.groups()
+    if month and 1 <= int(month) <= 12:
+        return f"{_MONTH_NAMES[int(month) - 1]} {year}"
+    return year
+
+
+def text_dates(entry: Dict[str, Any]) -> str:
+    """"Mar 2020 - Nov 2023" from startDate and endDate; a start without an end runs to "Present" """
+    start, end = text_date(entry.get('startDate')), text_date(entry.get('endDate'))
+    if start and start != end:
+        return f"{start} - {end or 'Present'}"
+    return end
+
+
+def _text(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _texts(values: Any) -> List[str]:
+    return [value.strip() for value in values if isinstance(value, str) and value.strip()] \
+        if isinstance(values, list) else []
+
+
+def _entries(resume: Dict[str, Any], key: str) -> List[Dict[str, Any]]:
+    values = resume.get(key)
+    return [value for value in values if isinstance(value, dict)] if isinstance(values, list) else []
+
+
+def _unique(result: Dict[str, Any], key: str, qualifier: str) -> str:
+    """A dictionary key not used yet: "Engineer", then "Engineer (Acme)", then "Engineer (Acme) 2" """
+    if key not in result:
+        return key
+    if qualifier:
+        key = f"{key} ({qualifier})"
+    candidate, number = key, 2
+    while candidate in result:
+        candidate = f"{key} {number}"
+        number += 1
+    return candidate
+
+
+def _highlights(entry: Dict[str, Any], summary_key: str) -> List[str]:
+    """Highlights of an entry, its summary standing in when there are none"""
+    return _texts(entry.get('highlights')) or _texts([entry.get(summary_key)])
+
+
+def _profile(basics: Dict[str, Any]) -> Dict[str, Any]:
+    profile = {'name': _text(basics.get('name')), 'tagline': _text(basics.get('label'))}  # type: Dict[str, Any]
+    contact = {}  # type: Dict[str, Any]
+    for field in ('email', 'phone'):
+        if _text(basics.get(field)):
+            contact[field] = _text(basics[field])
+    location = basics.get('location')
+    if isinstance(location, dict):
+        parts = [_text(location.get(field)) for field in ('city', 'region')]
+        if not parts[1]:
+            parts[1] = _text(location.get('countryCode'))
+        if any(parts):
+            contact['location'] = ', '.join(part for part in parts if part)
+    profiles = basics.get('profiles') if isinstance(basics.get('profiles'), list) else []
+    for network in profiles:
+        if isinstance(network, dict) and _text(network.get('network')).lower() == 'linkedin':
+            url = _text(network.get('url')) or f"linkedin.com/in/{_text(network.get('username'))}"
+            contact['linkedin'] = _URL_SCHEME_RE.sub('', url)
+            break
+    if contact:
+        profile['contact'] = contact
+    if _text(basics.get('summary')):
+        profile['summary'] = _text(basics['summary'])
+    return profile
+
+
+def _categories(entries: List[Dict[str, Any]], ungrouped: str) -> Dict[str, List[str]]:
+    """name -> keywords; entries without keywords are listed by name under one category"""
+    categories = {}  # type: Dict[str, List[str]]
+    loose = []  # type: List[str]
+    for entry in entries:
+        name, keywords = _text(entry.get('name')), _texts(entry.get('keywords'))
+        if name and keywords:
+            categories.setdefault(name, []).extend(keywords)
+        elif name:
+            loose.append(name)
+        elif keywords:
+            loose.extend(keywords)
+    if loose:
+        categories.setdefault(ungrouped, []).extend(loose)
+    return categories
+
+
+def from_json_resume(resume: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Parser attribute -> source dictionary for every section the resume holds
+
+    Skills all become hard skills, since the schema has a single skills
+    list; a language's fluency is split into level and descriptor at its
+    first space, which the LaTeX output joins back as it was.
+    """
+    sections = {}  # type: Dict[str, Dict[str, Any]]
+    if isinstance(resume.get('basics'), dict):
+        sections['profile'] = _profile(resume['basics'])
+
+    if 'work' in resume:
+        experiences = {}  # type: Dict[str, Any]
+        for work in _entries(resume, 'work'):
+            title, company = _text(work.get('position')), _text(work.get('name'))
+            experience = {'title': title or company, 'company': company, 'dates': text_dates(work),
+                          'location': _text(work.get('location')), 'highlights': _highlights(work, 'summary'),
+                          'tags': _texts(work.get('keywords'))}
+            experiences[_unique(experiences, title or company, company)] = experience
+        sections['experiences'] = experiences
+
+    if 'education' in resume:
+        diplomas = {}  # type: Dict[str, Any]
+        for education in _entries(resume, 'education'):
+            school = _text(education.get('institution'))
+            title = ', '.join(part for part in (_text(education.get('studyType')), _text(education.get('area')))
+                              if part) or school
+            diplomas[_unique(diplomas, title, school)] = {
+                'school': school, 'years': text_dates(education), 'location': _text(education.get('location'))}
+        sections['diplomas'] = diplomas
+
+    if 'skills' in resume:
+        sections['hard_skills'] = _categories(_entries(resume, 'skills'), UNGROUPED_SKILLS)
+    if 'languages' in resume:
+        languages = {}  # type: Dict[str, Any]
+        for language in _entries(resume, 'languages'):
+            level, _, descriptor = _text(language.get('fluency')).partition(' ')
+            if _text(language.get('language')):
+                languages[_text(language['language'])] = {'level': level, 'descriptor': descriptor.strip()}
+        sections['languages'] = languages
+    if 'interests' in resume:
+        sections['interests'] = _categories(_entries(resume, 'interests'), UNGROUPED_INTERESTS)
+
+    if 'projects' in resume:
+        projects = {}  # type: Dict[str, Any]
+        for project in _entries(resume, 'projects'):
+            title = _text(project.get('name'))
+            entry = {'title': title, 'dates': text_dates(project), 'highlights': _highlights(project, 'description'),
+                     'tags': _texts(project.get('keywords'))}  # type: Dict[str, Any]
+            roles = _texts(project.get('roles'))
+            if roles:
+                entry['role'] = ', '.join(roles)
+            if _text(project.get('url')):
+                entry['url'] = _text(project['url'])
+            projects[_unique(projects, title, _text(project.get('entity')))] = entry
+        sections['side_projects'] = projects
+    return sections
+
+
+def resume_sections(content: bytes) -> Dict[str, Dict[str, Any]]:
+    """Parse the bytes of a resume.json into source dictionaries, raising on anything but a JSON Resume"""
+    _, data = parse_source(content.decode('utf-8'))
+    if not is_json_resume(data):
+        raise ValueError(f"not a JSON Resume document: expected one of the keys {', '.join(sorted(RESUME_KEYS))}")
+    return from_json_resume(data)
+
+
+def write_sources(sections: Dict[str, Dict[str, Any]], directory: Union[str, Path],
+                  overwrite: bool = False) -> List[Path]:
+    """Write sections as strict-JSON CV_json files; existing files are kept unless overwrite"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for attribute, filename in SOURCE_FILES:
+        path = directory / filename
+        if attribute not in sections or (path.exists() and not overwrite):
+            continue
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(sections[attribute], f, indent=4, ensure_ascii=False)
+            f.write('\n')
+        written.append(path)
+    return written
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Command line entry point for converting a JSON Resume into CV_json files"""
+    arg_parser = argparse.ArgumentParser(description="Convert a JSON Resume document into CV_json source files")
+    arg_parser.add_argument("resume", help="JSON Resume document (jsonresume.org schema v1)")
+    arg_parser.add_argument("-o", "--output-dir", required=True, help="Folder to write the source files to")
+    arg_parser.add_argument("--overwrite", action="store_true", help="Replace source files that already exist")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        sections = resume_sections(Path(args.resume).read_bytes())
+    except (OSError, ValueError) as e:
+        arg_parser.error(f"{args.resume}: {e}")
+    written = write_sources(sections, args.output_dir, args.overwrite)
+    for path in written:
+        print(f"Wrote {path}")
+    skipped = len(sections) - len(written)
+    if skipped:
+        print(f"Kept {skipped} existing file(s), use --overwrite to replace them")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
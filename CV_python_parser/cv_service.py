@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Local render service - Keeps candidate bundles loaded and serves rendered CVs over HTTP
+A small asyncio HTTP/1.1 server (localhost, standard library only). Rendering
+runs in a process pool whose workers keep the most recently used bundles loaded;
+finished documents are kept in an LRU keyed by input hash and template parameters.
+
+Endpoints:
+  GET  /render/<candidate>?param=value   rendered .tex (params: TemplateParams fields)
+  POST /render/<candidate>               same, with the params as a JSON object body
+  GET  /candidates                       known candidate bundles
+  GET  /stats                            cache hit rate and latency percentiles
+  GET  /health                           liveness check
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from cv_cache import DEFAULT_CACHE_DIR
+from cv_parser_simple import SimpleCVParser
+from cv_resume import BUNDLE_FILES, is_bundle
+from cv_template import TemplateParams, load_template_params
+from cv_trace import percentile
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_PARSERS = 32
+LATENCY_WINDOW = 4096
+
+_CANDIDATE_RE = re.compile(r'^[\w.-]+$')
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+SourceState = Tuple[Tuple[str, int, int], ...]
+
+
+def source_state(json_dir: str) -> SourceState:
+    """Name, size and mtime of every source file of a bundle"""
+    state = []
+    for filename in BUNDLE_FILES:
+        try:
+            stat = os.stat(os.path.join(json_dir, filename))
+            state.append((filename, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            state.append((filename, -1, -1))
+    return tuple(state)
+
+
+def input_hash(json_dir: str) -> str:
+    """SHA-1 over the bytes of every source file of a bundle"""
+    digest = hashlib.sha1()
+    for filename in BUNDLE_FILES:
+        digest.update(filename.encode('utf-8') + b'\0')
+        try:
+            with open(os.path.join(json_dir, filename), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'\0missing')
+    return digest.hexdigest()
+
+
+# Worker-process state: LRU of loaded parsers by bundle, with the source state each was loaded from
+_worker_parsers = OrderedDict()  # type: OrderedDict[str, Tuple[SourceState, SimpleCVParser]]
+
+
+def render_in_worker(json_dir: str, params: TemplateParams, use_cache: bool = True,
+                     cache_dir: str = DEFAULT_CACHE_DIR, max_parsers: int = DEFAULT_MAX_PARSERS) -> str:
+    """Render a bundle inside a pool worker, reloading only source files that changed
+
+    At most max_parsers bundles stay loaded per worker; the least recently
+    rendered one is dropped and parsed again (from the parsed-data cache) if
+    it comes back.
+    """
+    state = source_state(json_dir)
+    # Loader progress goes to stderr so it cannot mix with responses
+    with contextlib.redirect_stdout(sys.stderr):
+        if json_dir not in _worker_parsers:
+            parser = SimpleCVParser(json_dir=json_dir, use_cache=use_cache, cache_dir=cache_dir)
+            parser.load_all_data()
+        else:
+            previous, parser = _worker_parsers[json_dir]
+            changed = {new[0] for old, new in zip(previous, state) if old != new}
+            if changed:
+                parser.reload_data_files(changed)
+    _worker_parsers[json_dir] = (state, parser)
+    _worker_parsers.move_to_end(json_dir)
+    while len(_worker_parsers) > max_parsers:
+        _worker_parsers.popitem(last=False)
+    parser.template_params = params
+    return ''.join(parser.iter_document())
+
+
+class RenderCache:
+    """LRU of rendered documents bounded by entry count"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # type: OrderedDict
+
+    def get(self, key: Any) -> Optional[str]:
+        document = self.entries.get(key)
+        if document is not None:
+            self.entries.move_to_end(key)
+        return document
+
+    def put(self, key: Any, document: str):
+        self.entries[key] = document
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(document) for document in self.entries.values())
+
+
+class ServiceStats:
+    """Request counters and a sliding window of latencies"""
+
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.render_latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        latencies = sorted(self.latencies)
+        renders = sorted(self.render_latencies)
+        return {
+            'requests': self.requests,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.50) * 1000,
+                'p99': percentile(latencies, 0.99) * 1000,
+                'max': latencies[-1] * 1000 if latencies else 0.0,
+            },
+            'render_ms': {
+                'p50': percentile(renders, 0.50) * 1000,
+                'p99': percentile(renders, 0.99) * 1000,
+            },
+        }
+
+
+class BundleState(NamedTuple):
+    """Source state and content hash last seen for a bundle"""
+    state: SourceState
+    input_hash: str
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class RenderService:
+    """Resolves candidates, serves renders from the LRU and runs misses on the pool"""
+
+    def __init__(self, bundles_root: Optional[str] = None, json_dir: Optional[str] = None,
+                 executor: Optional[Executor] = None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 use_cache: bool = True, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_parsers: int = DEFAULT_MAX_PARSERS):
+        self.bundles_root = Path(bundles_root) if bundles_root else None
+        self.json_dir = Path(json_dir) if json_dir else None
+        self.executor = executor
+        self.cache = RenderCache(max_entries)
+        self.stats = ServiceStats()
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.max_parsers = max_parsers
+        self.bundles = {}  # type: Dict[str, BundleState]
+        self.in_flight = {}  # type: Dict[Any, asyncio.Future]
+
+    def candidates(self) -> Dict[str, str]:
+        """Candidate name -> bundle folder"""
+        found = {}
+        if self.json_dir is not None:
+            found['default'] = str(self.json_dir)
+        if self.bundles_root is not None and self.bundles_root.is_dir():
+            for bundle in sorted(self.bundles_root.iterdir()):
+                if is_bundle(bundle):
+                    found[bundle.name] = str(bundle)
+        return found
+
+    def resolve(self, candidate: str) -> str:
+        """Bundle folder of a candidate, refusing anything that is not a plain name"""
+        if not _CANDIDATE_RE.match(candidate) or candidate in ('.', '..'):
+            raise HttpError(400, f"invalid candidate name: {candidate!r}")
+        if candidate == 'default' and self.json_dir is not None:
+            return str(self.json_dir)
+        if self.bundles_root is not None:
+            bundle = self.bundles_root / candidate
+            if is_bundle(bundle):
+                return str(bundle)
+        raise HttpError(404, f"unknown candidate: {candidate}")
+
+    def bundle_hash(self, json_dir: str) -> str:
+        """Content hash of a bundle, recomputed only when a source file's stat changed"""
+        state = source_state(json_dir)
+        known = self.bundles.get(json_dir)
+        if known is None or known.state != state:
+            known = BundleState(state, input_hash(json_dir))
+            self.bundles[json_dir] = known
+        return known.input_hash
+
+    async def render(self, candidate: str, params: TemplateParams) -> Tuple[str, str]:
+        """Return (document, cache status) for a candidate and template parameters"""
+        json_dir = self.resolve(candidate)
+        loop = asyncio.get_running_loop()
+        # Stats and hashing are blocking file I/O; a thread keeps the event loop serving
+        key = (json_dir, await loop.run_in_executor(None, self.bundle_hash, json_dir), params)
+
+        document = self.cache.get(key)
+        if document is not None:
+            self.stats.hits += 1
+            return document, 'hit'
+
+        # Identical requests arriving during a render share its result
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(pending), 'coalesced'
+
+        self.stats.misses += 1
+        future = loop.run_in_executor(self.executor, render_in_worker, json_dir, params,
+                                      self.use_cache, self.cache_dir, self.max_parsers)
+        self.in_flight[key] = future
+        start = time.perf_counter()
+        try:
+            document = await future
+        finally:
+            del self.in_flight[key]
+        self.stats.render_latencies.append(time.perf_counter() - start)
+        self.cache.put(key, document)
+        return document, 'miss'
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, str, bytes, Dict[str, str]]:
+        """Route one request; returns status, content type, payload and extra headers"""
+        url = urlsplit(target)
+        path = unquote(url.path)
+        if path == '/health':
+            return 200, 'text/plain', b'ok\n', {}
+        if path == '/stats':
+            stats = self.stats.as_dict()
+            stats['cache'] = {'entries': len(self.cache.entries), 'bytes': self.cache.total_bytes}
+            stats['bundles_loaded'] = len(self.bundles)
+            return 200, 'application/json', json.dumps(stats, indent=2).encode('utf-8'), {}
+        if path == '/candidates':
+            return 200, 'application/json', json.dumps(self.candidates()).encode('utf-8'), {}
+        if not path.startswith('/render/'):
+            raise HttpError(404, f"no such endpoint: {path}")
+
+        overrides = dict(parse_qsl(url.query))
+        if method == 'POST':
+            try:
+                values = json.loads(body.decode('utf-8') or '{}')
+            except ValueError as e:
+                raise HttpError(400, f"invalid JSON body: {e}")
+            if not isinstance(values, dict):
+                raise HttpError(400, "invalid JSON body: expected an object of template parameters")
+            overrides.update(values)
+        elif method != 'GET':
+            raise HttpError(405, f"method not allowed: {method}")
+        try:
+            # Values are checked by load_template_params; an unsafe or malformed one is the client's error
+            params = load_template_params(**{name: str(value) for name, value in overrides.items()})
+        except (TypeError, ValueError) as e:
+            raise HttpError(400, str(e))
+
+        start = time.perf_counter()
+        document, status = await self.render(path[len('/render/'):], params)
+        headers = {'X-Cache': status, 'X-Render-Ms': f"{(time.perf_counter() - start) * 1000:.2f}"}
+        return 200, 'application/x-tex; charset=utf-8', document.encode('utf-8'), headers
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection, honouring keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+
+                start = time.perf_counter()
+                self.stats.requests += 1
+                try:
+                    status, content_type, payload, extra = await self.dispatch(method, target, body)
+                except HttpError as e:
+                    self.stats.errors += 1
+                    status, content_type, payload, extra = e.status, 'text/plain', f"{e}\n".encode('utf-8'), {}
+                except Exception as e:
+                    self.stats.errors += 1
+                    status, content_type, payload, extra = (
+                        500, 'text/plain', f"{type(e).__name__}: {e}\n".encode('utf-8'), {})
+                self.stats.latencies.append(time.perf_counter() - start)
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                        f"Content-Type: {content_type}",
+                        f"Content-Length: {len(payload)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head.extend(f"{name}: {value}" for name, value in extra.items())
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service: RenderService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """Run the HTTP server until cancelled"""
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Serving CV renders on http://{host}:{port}/ (candidates: {', '.join(service.candidates()) or 'none'})")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Command line entry point for the render service"""
+    arg_parser = argparse.ArgumentParser(description="Serve rendered CVs from memory over local HTTP")
+    arg_parser.add_argument("--bundles", help="Folder containing one CV_json-shaped folder per candidate")
+    arg_parser.add_argument("--json-dir", default="../CV_json", help="Bundle served as the 'default' candidate")
+    arg_parser.add_argument("--host", default=DEFAULT_HOST, help="Address to bind (default: localhost only)")
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    arg_parser.add_argument("--workers", type=int, default=2,
+                            help="Render worker processes (0 renders on a thread in the server process)")
+    arg_parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                            help="Rendered documents kept in the LRU")
+    arg_parser.add_argument("--max-parsers", type=int, default=DEFAULT_MAX_PARSERS,
+                            help="Loaded bundles kept per worker process (least recently used dropped first)")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always re-parse the source files")
+    arg_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Folder for the parsed-data cache")
+    args = arg_parser.parse_args()
+
+    if args.workers > 0:
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=1)
+    service = RenderService(args.bundles, args.json_dir, executor, args.max_entries,
+                            use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                            max_parsers=args.max_parsers)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("Render service stopped")
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
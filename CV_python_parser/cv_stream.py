@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Helpers for streaming LaTeX output as chunks instead of whole strings
+"""
+
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Union
+
+
+Chunks = Iterable[str]
+
+
+def join_chunks(parts: Iterable[Union[str, Chunks]], separator: str = '\n') -> Iterator[str]:
+    """Stream equivalent of separator.join(parts)
+
+    Each part is either a string or an iterable of string chunks; iterable
+    parts are streamed through without being joined first.
+    """
+    first = True
+    for part in parts:
+        if not first:
+            yield separator
+        first = False
+        if isinstance(part, str):
+            yield part
+        else:
+            yield from part
+
+
+def peek_chunks(chunks: Chunks) -> Optional[Iterator[str]]:
+    """Return an iterator over chunks, or None if they are all empty
+
+    Lets callers keep the "if section: ..." checks without rendering the
+    whole section into one string first.
+    """
+    chunks = iter(chunks)
+    for chunk in chunks:
+        if chunk:
+            return chain((chunk,), chunks)
+    return None
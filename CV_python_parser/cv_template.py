@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Precompiled LaTeX document templates
+The static preamble and section blocks are compiled once per process into
+pre-joined text segments with named slots; a render only interleaves slot values.
+Page layouts are assembled from the blocks by cv_plan
+"""
+
+import json
+import re
+from functools import lru_cache
+from string import Template
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from cv_stream import peek_chunks
+
+
+SlotValue = Union[None, str, Iterable[str]]
+
+
+class TemplateParams(NamedTuple):
+    """Per-template settings substituted when the skeleton is compiled"""
+    header_comment: str = "Updated CV tailored for Founding CTO role at JobTalk.ai"
+    class_options: str = "9pt,a4paper,ragged2e"
+    margin_left: str = "1.5cm"
+    margin_right: str = "1.5cm"
+    margin_top: str = "1.5cm"
+    margin_bottom: str = "1.5cm"
+    heading_colour: str = "1282a2"
+    accent_colour: str = "006c67"
+    emphasis_colour: str = "001f54"
+    body_colour: str = "0a1128"
+    bibliography: str = "sample.bib"
+
+
+_LENGTH = (re.compile(r'\d+(\.\d+)?(pt|mm|cm|in|em|ex)'), 'a TeX length such as "1.5cm"')
+_COLOUR = (re.compile(r'[0-9A-Fa-f]{6}'), 'a 6-digit hex colour such as "1282a2"')
+# Parameter -> (pattern its whole value must match, description for the error)
+_PARAM_PATTERNS = {
+    # Anything on one line: str.splitlines() breaks, which TeX may also treat as line ends
+    'header_comment': (re.compile(r'[^\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]*'), 'a single line of text'),
+    'class_options': (re.compile(r'[\w.=-]+(,[\w.=-]+)*'), 'comma-separated class options'),
+    'margin_left': _LENGTH,
+    'margin_right': _LENGTH,
+    'margin_top': _LENGTH,
+    'margin_bottom': _LENGTH,
+    'heading_colour': _COLOUR,
+    'accent_colour': _COLOUR,
+    'emphasis_colour': _COLOUR,
+    'body_colour': _COLOUR,
+    'bibliography': (re.compile(r'[\w./-]+'), 'a file name'),
+}  # type: Dict[str, Tuple[Any, str]]
+
+
+# Skeleton syntax:
+#   ${param}     replaced by a TemplateParams field when compiling
+#   <<slot>>     inline slot, replaced by its value on every render
+#   <<?slot>>    optional line slot on its own line; vanishes with its line
+#                break when the value is empty or None
+DOCUMENT_SKELETON = r'''%%%%%%%%%%%%%%%%%
+% ${header_comment}
+%%%%%%%%%%%%%%%%%
+
+\documentclass[${class_options}]{altacv}
+\usepackage[T1]{fontenc}
+\usepackage[utf8]{inputenc}
+\usepackage{paracol}
+\usepackage{hyperref}
+\usepackage{fontawesome}
+
+% Page geometry
+\geometry{%
+  left=${margin_left},
+  right=${margin_right},
+  top=${margin_top},
+  bottom=${margin_bottom},
+  marginparwidth=0pt,
+  marginparsep=0pt
+}
+
+% Fonts
+\ifxetexorluatex
+  \setmainfont{Carlito}
+\else
+  \usepackage[utf8]{inputenc}
+  \usepackage[T1]{fontenc}
+  \usepackage[default]{lato}
+\fi
+
+% Colours
+\definecolor{VividPurple}{HTML}{${heading_colour}}
+\definecolor{VividPurplee}{HTML}{${accent_colour}}
+\definecolor{SlateGrey}{HTML}{${emphasis_colour}}
+\definecolor{LightGrey}{HTML}{${body_colour}}
+\colorlet{heading}{VividPurple}
+\colorlet{accent}{VividPurplee}
+\colorlet{emphasis}{SlateGrey}
+\colorlet{body}{LightGrey}
+
+% Bullet styles
+\renewcommand{\itemmarker}{{\small\textbullet}}
+\renewcommand{\ratingmarker}{\faCircle}
+
+\addbibresource{${bibliography}}
+
+% ----------------------------------------------------------------------
+%                               HEADER
+% ----------------------------------------------------------------------
+\begin{document}
+<<?personal_info>>
+\begin{fullwidth}
+\makecvheader
+\end{fullwidth}
+
+% Ensure smaller font for itemize
+\AtBeginEnvironment{itemize}{\small}
+
+<<?profile>>
+<<?layout>>
+\end{document}'''
+
+PERSONAL_INFO_SKELETON = r'''\name{<<name>>}
+\tagline{<<tagline>>}
+
+\personalinfo{
+<<?contact>>
+}
+'''
+
+PROFILE_SKELETON = r'''% ----------------------------------------------------------------------
+%                               PROFILE
+% ----------------------------------------------------------------------
+\cvsection[]{Profil}
+<<summary>>
+
+\vspace{4pt}
+'''
+
+# Page layouts are assembled from these by cv_plan; a block is one section placed
+# in a column, <<?space>> being the vertical space the layout puts before it
+BANNER_RULE = '% ----------------------------------------------------------------------'
+
+SECTION_BLOCK_SKELETONS = {
+    'experience': r'''<<?space>>
+\cvsection{Professional experience}
+<<?body>>''',
+    'diplomas': r'''<<?space>>
+\cvsection{Diplomas}
+<<?body>>''',
+    'side_projects': r'''<<?space>>
+\cvsection{Side projects}
+<<?body>>''',
+    'interests': r'''<<?space>>
+\cvsection{Interests}
+<<?body>>''',
+    'hard_skills': r'''<<?space>>
+\cvsection{Hard Skills}
+<<?body>>''',
+    'soft_skills': r'''<<?space>>
+\cvsection{Soft Skills}
+<<?body>>''',
+    'languages': r'''
+<<?space>>
+% ----------------------------------------------------------------------
+%                             LANGUAGES
+% ----------------------------------------------------------------------
+\cvsection{Languages}
+<<?body>>''',
+}
+
+LANGUAGES_LIST_SKELETON = r'''\begin{itemize}
+<<?languages>>
+\end{itemize}'''
+
+_SLOT_RE = re.compile(r'<<(\w+)>>')
+_LINE_SLOT_RE = re.compile(r'<<\?(\w+)>>')
+
+
+class CompiledTemplate:
+    """A skeleton split into pre-joined line runs and optional line slots
+
+    Segments are ('run', parts) for consecutive fixed lines, where parts mix
+    static text with ('slot', name) entries, and ('lines', name) for optional
+    line slots. Rendering is '\n'.join over the segments that are not empty.
+    """
+
+    def __init__(self, segments: List[Tuple[str, Any]]):
+        self.segments = tuple(segments)
+        slots = []
+        for kind, value in self.segments:
+            if kind == 'lines':
+                slots.append(value)
+            else:
+                slots.extend(part[1] for part in value if not isinstance(part, str))
+        self.slots = tuple(slots)
+
+    def render(self, slots: Dict[str, SlotValue]) -> Iterator[str]:
+        """Yield the template with every slot replaced by its value"""
+        emitted = False
+        for kind, value in self.segments:
+            if kind == 'run':
+                if emitted:
+                    yield '\n'
+                emitted = True
+                for part in value:
+                    if isinstance(part, str):
+                        yield part
+                    else:
+                        yield from _chunks(slots.get(part[1]))
+                continue
+            # Optional lines vanish together with their line break when empty
+            chunks = peek_chunks(_chunks(slots.get(value)))
+            if chunks is not None:
+                if emitted:
+                    yield '\n'
+                emitted = True
+                yield from chunks
+
+    def render_string(self, slots: Dict[str, SlotValue]) -> str:
+        """Render the template into a single string"""
+        return ''.join(self.render(slots))
+
+
+def _chunks(value: SlotValue) -> Iterable[str]:
+    """View a slot value as an iterable of chunks"""
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return value
+
+
+def compile_skeleton(skeleton: str) -> CompiledTemplate:
+    """Split a skeleton (parameters already substituted) into segments"""
+    segments = []  # type: List[Tuple[str, Any]]
+    run = []  # type: List[str]
+
+    def flush_run():
+        if run:
+            parts = []  # type: List[Any]
+            position = 0
+            text = '\n'.join(run)
+            for match in _SLOT_RE.finditer(text):
+                parts.append(text[position:match.start()])
+                parts.append(('slot', match.group(1)))
+                position = match.end()
+            parts.append(text[position:])
+            segments.append(('run', tuple(part for part in parts if part != '')))
+            del run[:]
+
+    for line in skeleton.split('\n'):
+        line_slot = _LINE_SLOT_RE.fullmatch(line)
+        if line_slot:
+            flush_run()
+            segments.append(('lines', line_slot.group(1)))
+        else:
+            run.append(line)
+    flush_run()
+    return CompiledTemplate(segments)
+
+
+@lru_cache(maxsize=64)
+def compile_document_template(params: TemplateParams = TemplateParams()) -> CompiledTemplate:
+    """Compile the document preamble and skeleton for one set of parameters"""
+    return compile_skeleton(Template(DOCUMENT_SKELETON).substitute(params._asdict()))
+
+
+def check_template_param(name: str, value: Any):
+    """Raise ValueError unless value is safe to substitute for the parameter name
+
+    Parameters land verbatim in the preamble, so each one is held to the
+    shape its slot expects: a line break in the header comment would start
+    a live LaTeX line, and a bad length or colour only fails inside pdflatex.
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Template parameter {name} must be a string, got {type(value).__name__}")
+    pattern, expected = _PARAM_PATTERNS.get(name, (None, ''))
+    if pattern is not None and not pattern.fullmatch(value):
+        raise ValueError(f"Template parameter {name} must be {expected}, got {value!r}")
+
+
+def load_template_params(path: Optional[str] = None, **overrides: Any) -> TemplateParams:
+    """Build TemplateParams from an optional JSON file plus keyword overrides, checking every value"""
+    values = {}  # type: Dict[str, Any]
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            values.update(json.load(f))
+    values.update({key: value for key, value in overrides.items() if value is not None})
+    unknown = set(values) - set(TemplateParams._fields)
+    if unknown:
+        raise ValueError(f"Unknown template parameters: {', '.join(sorted(unknown))}")
+    for name, value in values.items():
+        check_template_param(name, value)
+    return TemplateParams(**values)
+
+
+# Parameter-free skeletons are compiled once at import
+PERSONAL_INFO_TEMPLATE = compile_skeleton(PERSONAL_INFO_SKELETON)
+PROFILE_TEMPLATE = compile_skeleton(PROFILE_SKELETON)
+LANGUAGES_LIST_TEMPLATE = compile_skeleton(LANGUAGES_LIST_SKELETON)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pipeline instrumentation and logging
+Spans around loading, section formatting, document rendering and writing record
+durations, byte counts and call counts; they export as Chrome trace-event JSON
+(chrome://tracing, Perfetto) and as a summary table. A disabled tracer hands out
+one shared no-op span, so instrumented code costs an attribute check when off.
+"""
+
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+
+LOGGER_NAME = "cv"
+
+
+class _CurrentStdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at emit time, so redirect_stdout still applies"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def _make_logger() -> logging.Logger:
+    log = logging.getLogger(LOGGER_NAME)
+    if not log.handlers:
+        handler = _CurrentStdoutHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        # Progress messages are console output, not records for the root logger
+        log.propagate = False
+    return log
+
+
+logger = _make_logger()
+
+
+def set_quiet(quiet: bool = True):
+    """Silence progress messages (warnings and errors are still shown)"""
+    logger.setLevel(logging.WARNING if quiet else logging.INFO)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class TraceEvent(NamedTuple):
+    """One finished span"""
+    name: str
+    category: str
+    start_ns: int
+    duration_ns: int
+    pid: int
+    tid: int
+    args: Dict[str, Any]
+
+
+class SpanStats(NamedTuple):
+    """Aggregate of every span with the same name"""
+    calls: int
+    total_ns: int
+    max_ns: int
+    bytes: int
+
+
+class _Span:
+    """Context manager recording one span; args may be filled in while it runs"""
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __enter__(self) -> '_Span':
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.category, self.start,
+                           time.perf_counter_ns() - self.start, self.args)
+
+
+class _NullSpan:
+    """The span handed out by a disabled tracer; falsy so callers can skip extra work"""
+    args = {}  # type: Dict[str, Any]
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects spans from any thread of the current process"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.events = []  # type: List[TraceEvent]
+        self._lock = threading.Lock()
+
+    def span(self, name: str, category: str = 'pipeline', **args: Any):
+        """Context manager timing a block; a no-op when the tracer is disabled"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def record(self, name: str, category: str, start_ns: int, duration_ns: int,
+               args: Optional[Dict[str, Any]] = None):
+        event = TraceEvent(name, category, start_ns, duration_ns, os.getpid(),
+                           threading.get_ident(), dict(args or {}))
+        with self._lock:
+            self.events.append(event)
+
+    def timed(self, name: str, make_chunks: Callable[[], Iterable[str]],
+              category: str = 'pipeline') -> Iterator[str]:
+        """Stream chunks from make_chunks(), recording the time spent producing them
+
+        Only time inside the producer counts, not time the consumer spends
+        between chunks, so a streamed section is measured the same way as a
+        string-returning one. make_chunks runs lazily, inside the measurement.
+        """
+        start = time.perf_counter_ns()
+        spent = 0
+        size = 0
+        resumed = start
+        iterator = iter(make_chunks())
+        while True:
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            spent += time.perf_counter_ns() - resumed
+            size += len(chunk.encode('utf-8'))
+            yield chunk
+            resumed = time.perf_counter_ns()
+        spent += time.perf_counter_ns() - resumed
+        self.record(name, category, start, spent, {'bytes': size})
+
+    def merge(self, events: Iterable[TraceEvent]):
+        """Add events recorded elsewhere, e.g. by batch worker processes"""
+        with self._lock:
+            self.events.extend(TraceEvent(*event) for event in events)
+
+    def stats(self) -> Dict[str, SpanStats]:
+        """Per-name call count, total and max duration and byte count"""
+        stats = {}  # type: Dict[str, SpanStats]
+        for event in self.events:
+            calls, total, longest, size = stats.get(event.name, (0, 0, 0, 0))
+            stats[event.name] = SpanStats(calls + 1, total + event.duration_ns,
+                                          max(longest, event.duration_ns),
+                                          size + event.args.get('bytes', 0))
+        return stats
+
+    def summary_table(self) -> str:
+        """Spans sorted by total time, as a fixed-width text table"""
+        rows = sorted(self.stats().items(), key=lambda item: -item[1].total_ns)
+        lines = [f"{'span':<36} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'bytes':>12}"]
+        for name, stat in rows:
+            lines.append(f"{name:<36} {stat.calls:>7} {stat.total_ns / 1e6:>10.3f} "
+                         f"{stat.total_ns / stat.calls / 1e6:>9.3f} {stat.max_ns / 1e6:>9.3f} {stat.bytes:>12}")
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """The events in Chrome trace-event format (complete "X" events, microseconds)"""
+        return {
+            'traceEvents': [{
+                'name': event.name,
+                'cat': event.category,
+                'ph': 'X',
+                'ts': event.start_ns / 1000,
+                'dur': event.duration_ns / 1000,
+                'pid': event.pid,
+                'tid': event.tid,
+                'args': event.args,
+            } for event in self.events],
+            'displayTimeUnit': 'ms',
+        }
+
+    def write_chrome_trace(self, path: str):
+        Path(path).write_text(json.dumps(self.chrome_trace()), encoding='utf-8')
+
+
+# Shared disabled tracer used when no instrumentation is requested
+NULL_TRACER = Tracer(enabled=False)
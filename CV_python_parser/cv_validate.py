@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Source validation - Checks every bundle file against a declared schema
+Each source file has a schema of required keys, value types and list lengths.
+Problems are reported as file:line:column with the path of the offending value;
+errors make a bundle invalid, warnings (unknown or repeated keys) do not. Sections
+read from a resume.json are checked after mapping, without positions.
+
+    python cv_validate.py ../CV_json candidates/ candidates.cvpack --report issues.json
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Union
+
+from cv_archive import BundleSource, is_archive, open_archive
+from cv_cache import DEFAULT_CACHE_DIR, ParsedDataCache, write_atomic
+from cv_model import SOURCE_FILES
+from cv_pack import PackedCandidate, open_pack
+from cv_resume import BUNDLE_FILES, RESUME_FILE, is_bundle, is_resume_file, resume_sections
+from dict_scanner import DictScanError, line_column, locate_source
+
+
+# Bump when a schema or check changes so cached results are not reused
+SCHEMA_VERSION = "2"
+ERROR = 'error'
+WARNING = 'warning'
+
+# Files a bundle cannot do without; every other source file is optional
+REQUIRED_FILES = ('profile.json',)
+
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+# Path of keys and list indices -> (line, column) of that value, None when unknown
+Locate = Callable[[Tuple[Any, ...]], Optional[Tuple[int, int]]]
+_TYPE_NAMES = {str: 'a string', int: 'an integer', float: 'a number', dict: 'a dictionary', list: 'a list'}
+
+
+class Field(NamedTuple):
+    """Expected shape of one value
+
+    Lengths count characters of a string, items of a list and keys of a
+    dictionary. items is the schema of every list item or, for a dictionary
+    with free-form keys, of every value; fields lists the known keys instead.
+    """
+    types: Tuple[type, ...] = (str,)
+    required: bool = False
+    min_length: int = 0
+    max_length: Optional[int] = None
+    items: Optional['Field'] = None
+    fields: Optional[Dict[str, 'Field']] = None
+
+
+TEXT = Field()
+TEXT_LIST = Field((list, tuple), items=Field(min_length=1))
+
+CONTACT = Field((dict,), fields={
+    'email': TEXT, 'phone': TEXT, 'location': TEXT, 'linkedin': TEXT, 'age': Field((int, str)),
+})
+EXPERIENCE = Field((dict,), fields={
+    'title': TEXT,
+    'company': Field(required=True, min_length=1),
+    'dates': Field(required=True, min_length=1),
+    'location': TEXT,
+    'highlights': Field((list, tuple), required=True, min_length=1, items=Field(min_length=1)),
+    'tags': TEXT_LIST,
+})
+DIPLOMA = Field((dict,), fields={
+    'school': Field(required=True, min_length=1),
+    'years': Field(required=True, min_length=1),
+    'location': TEXT,
+})
+SIDE_PROJECT = Field((dict,), fields={
+    'title': TEXT,
+    'role': TEXT,
+    'dates': Field(required=True, min_length=1),
+    'location': TEXT,
+    'highlights': Field((list, tuple), required=True, min_length=1, items=Field(min_length=1)),
+    'tags': TEXT_LIST,
+    'url': TEXT,
+})
+LANGUAGE = Field((dict,), fields={'level': Field(required=True, min_length=1), 'descriptor': TEXT})
+
+# Source file -> schema of the dictionary it assigns
+FILE_SCHEMAS = {
+    'profile.json': Field((dict,), fields={
+        'name': Field(required=True, min_length=1),
+        'tagline': TEXT,
+        'contact': CONTACT,
+        'summary': TEXT,
+        'objective': TEXT,
+    }),
+    'Professional_experience.json': Field((dict,), items=EXPERIENCE),
+    'diplomas.json': Field((dict,), items=DIPLOMA),
+    'hard_skills.json': Field((dict,), items=TEXT_LIST),
+    'soft_skills.json': Field((dict,), items=TEXT_LIST),
+    'languages.json': Field((dict,), items=LANGUAGE),
+    'Interest.json': Field((dict,), items=TEXT_LIST),
+    'side_projects.json': Field((dict,), items=SIDE_PROJECT),
+}  # type: Dict[str, Field]
+
+
+class Issue(NamedTuple):
+    """One problem in a source file; line and column are 0 where positions are unknown (packed files)"""
+    file: str
+    line: int
+    column: int
+    path: str
+    message: str
+    severity: str = ERROR
+
+    def location(self, folder: str = '') -> str:
+        """file:line:column, prefixed with the bundle folder when given"""
+        name = f"{folder}/{self.file}" if folder else self.file
+        return f"{name}:{self.line}:{self.column}" if self.line else name
+
+    def format(self, folder: str = '') -> str:
+        where = f" {self.path}:" if self.path else ""
+        return f"{self.location(folder)}: {self.severity}:{where} {self.message}"
+
+
+class BundleReport(NamedTuple):
+    """Validation outcome of one bundle; source is its folder, pack or archive"""
+    name: str
+    source: str
+    issues: Tuple[Issue, ...] = ()
+
+    @property
+    def errors(self) -> List[Issue]:
+        return [issue for issue in self.issues if issue.severity == ERROR]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'source': self.source,
+            'valid': self.ok,
+            'errors': len(self.errors),
+            'warnings': len(self.issues) - len(self.errors),
+            'issues': [issue._asdict() for issue in self.issues],
+        }
+
+
+def format_path(path: Tuple[Any, ...]) -> str:
+    """Readable path of a value: "Senior Engineer".highlights[2]"""
+    parts = []  # type: List[str]
+    for key in path:
+        if isinstance(key, int) and not isinstance(key, bool):
+            parts.append(f"[{key}]")
+            continue
+        text = key if isinstance(key, str) and _IDENTIFIER_RE.match(key) else json.dumps(key, ensure_ascii=False)
+        parts.append(f".{text}" if parts else text)
+    return ''.join(parts)
+
+
+def _type_name(types: Tuple[type, ...]) -> str:
+    return ' or '.join(_TYPE_NAMES.get(kind, kind.__name__) for kind in types if kind is not tuple)
+
+
+def _nowhere(path: Tuple[Any, ...]) -> Optional[Tuple[int, int]]:
+    return None
+
+
+def check_value(filename: str, schema: Field, value: Any, path: Tuple[Any, ...], locate: Locate,
+                issues: List[Issue]):
+    """Append the issues of value, and of everything it holds, against schema"""
+
+    def report(message: str, severity: str = ERROR, at: Tuple[Any, ...] = path):
+        # Positions are only worked out for values that have an issue
+        line, column = locate(at) or locate(path) or (0, 0)
+        issues.append(Issue(filename, line, column, format_path(at), message, severity))
+
+    # bool is an int subclass, but True is never a valid age or count
+    if type(value) not in schema.types:
+        report(f"expected {_type_name(schema.types)}, found {type(value).__name__}")
+        return
+    if isinstance(value, (str, list, tuple, dict)):
+        unit = 'characters' if isinstance(value, str) else 'keys' if isinstance(value, dict) else 'items'
+        if len(value) < schema.min_length:
+            report("must not be empty" if schema.min_length == 1 and not value
+                   else f"needs at least {schema.min_length} {unit}, found {len(value)}")
+        elif schema.max_length is not None and len(value) > schema.max_length:
+            report(f"allows at most {schema.max_length} {unit}, found {len(value)}")
+
+    if isinstance(value, dict):
+        if schema.fields is not None:
+            for key, field in schema.fields.items():
+                if field.required and key not in value:
+                    report(f"missing required key {key!r}")
+        for key, item in value.items():
+            if not isinstance(key, str):
+                report(f"key {key!r} is not a string", at=path + (key,))
+            elif schema.fields is not None:
+                if key in schema.fields:
+                    check_value(filename, schema.fields[key], item, path + (key,), locate, issues)
+                else:
+                    report(f"unknown key {key!r}, ignored", WARNING, path + (key,))
+            elif schema.items is not None:
+                check_value(filename, schema.items, item, path + (key,), locate, issues)
+    elif isinstance(value, (list, tuple)) and schema.items is not None:
+        for index, item in enumerate(value):
+            check_value(filename, schema.items, item, path + (index,), locate, issues)
+
+
+def validate_data(filename: str, data: Dict[str, Any], locate: Locate = _nowhere) -> List[Issue]:
+    """Issues of an already parsed source file; locate gives the (line, column) of a path"""
+    issues = []  # type: List[Issue]
+    schema = FILE_SCHEMAS.get(filename)
+    if schema is not None:
+        check_value(filename, schema, data, (), locate, issues)
+    return issues
+
+
+def _decode(filename: str, content: bytes) -> Union[str, Issue]:
+    """Text of a source file, or the issue saying where it is not UTF-8"""
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError as e:
+        line, column = line_column(content[:e.start].decode('utf-8', 'replace'), e.start)
+        return Issue(filename, line, column, '', f"not valid UTF-8: {e.reason}")
+
+
+def validate_source(filename: str, content: bytes) -> List[Issue]:
+    """Issues of the raw bytes of a source file, from encoding and syntax to schema"""
+    text = _decode(filename, content)
+    if isinstance(text, Issue):
+        return [text]
+    try:
+        located = locate_source(text)
+    except DictScanError as e:
+        return [Issue(filename, e.line, e.column, '', e.reason)]
+    issues = [Issue(filename, *located.position(path), format_path(path),
+                    "duplicate key, the last value wins", WARNING)
+              for path in located.duplicates]
+    return issues + validate_data(filename, located.data, located.position)
+
+
+def validate_resume(content: bytes) -> Tuple[List[Issue], Dict[str, Dict[str, Any]]]:
+    """Issues of a resume.json that cannot be read, and the source dictionaries it maps to by file name"""
+    text = _decode(RESUME_FILE, content)
+    if isinstance(text, Issue):
+        return [text], {}
+    try:
+        sections = resume_sections(content)
+    except DictScanError as e:
+        return [Issue(RESUME_FILE, e.line, e.column, '', e.reason)], {}
+    except ValueError as e:
+        return [Issue(RESUME_FILE, 0, 0, '', str(e))], {}
+    return [], {filename: sections[attribute] for attribute, filename in SOURCE_FILES if attribute in sections}
+
+
+def _missing_files(present: Iterable[str]) -> List[Issue]:
+    present = set(present)
+    return [Issue(filename, 0, 0, '', "required file is missing")
+            for filename in REQUIRED_FILES if filename not in present]
+
+
+def _check_files(contents: Dict[str, bytes]) -> Tuple[Issue, ...]:
+    issues, mapped = validate_resume(contents[RESUME_FILE]) if RESUME_FILE in contents else ([], {})
+    if not issues:
+        # An unreadable resume is reported once, not again as every file it would stand for
+        issues = _missing_files(set(contents) | set(mapped))
+    for _, filename in SOURCE_FILES:
+        if filename in contents:
+            issues.extend(validate_source(filename, contents[filename]))
+        elif filename in mapped:
+            # Reported against the resume, naming the section it was read as
+            issues.extend(issue._replace(file=RESUME_FILE, message=f"{issue.message} (read as {filename})")
+                          for issue in validate_data(filename, mapped[filename]))
+    return tuple(issues)
+
+
+def _read_folder(directory: Path) -> Dict[str, bytes]:
+    return {filename: (directory / filename).read_bytes()
+            for filename in BUNDLE_FILES if (directory / filename).exists()}
+
+
+def validate_folder(directory: Union[str, Path], cache: Optional[ParsedDataCache] = None) -> BundleReport:
+    """Validate a CV_json-style folder
+
+    With a cache, the issues of the whole bundle are stored under its files'
+    sizes and mtimes, so an unchanged bundle costs one stat per file.
+    """
+    directory = Path(directory)
+    try:
+        if cache is None:
+            issues = _check_files(_read_folder(directory))
+        else:
+            stats = []
+            for filename in BUNDLE_FILES:
+                try:
+                    stat = (directory / filename).stat()
+                    stats.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+                except FileNotFoundError:
+                    pass
+            key = f"{directory.resolve()}|{'|'.join(stats)}"
+            issues = cache.load_keyed(key, lambda: _check_files(_read_folder(directory)))
+    except OSError as e:
+        issues = (Issue(directory.name, 0, 0, '', f"cannot be read: {e}"),)
+    return BundleReport(directory.name, str(directory), issues)
+
+
+def validate_sources(source: BundleSource, origin: str = '',
+                     cache: Optional[ParsedDataCache] = None) -> BundleReport:
+    """Validate a bundle read from an archive; cached by the digest of its files"""
+    if cache is None:
+        return BundleReport(source.name, origin, _check_files(source.files))
+    digest = hashlib.sha1()
+    for filename in sorted(source.files):
+        digest.update(filename.encode('utf-8') + b'\0')
+        digest.update(hashlib.sha1(source.files[filename]).digest())
+    issues = cache.load_keyed(digest.hexdigest(), partial(_check_files, source.files))
+    return BundleReport(source.name, origin, issues)
+
+
+def validate_packed(packed: PackedCandidate, origin: str = '') -> BundleReport:
+    """Validate a candidate of a packed file; types and lengths only, positions are not stored"""
+    issues = _missing_files(filename for attribute, filename in SOURCE_FILES if attribute in packed)
+    for attribute, filename in SOURCE_FILES:
+        if attribute in packed:
+            try:
+                issues.extend(validate_data(filename, packed.section(attribute)))
+            except Exception as e:
+                issues.append(Issue(filename, 0, 0, '', f"cannot be decoded: {e}"))
+    return BundleReport(packed.name, origin, tuple(issues))
+
+
+def validate_bundle(json_dir: Union[str, Path], candidate: Optional[str] = None,
+                    cache: Optional[ParsedDataCache] = None) -> BundleReport:
+    """Validate the bundle the parser would load from json_dir (folder, packed file, archive or JSON Resume)"""
+    json_dir = Path(json_dir)
+    try:
+        if not json_dir.is_file():
+            return validate_folder(json_dir, cache)
+        if is_archive(json_dir):
+            return validate_sources(open_archive(json_dir).read(candidate), str(json_dir), cache)
+        if is_resume_file(json_dir):
+            report = validate_sources(BundleSource(json_dir.stem, {RESUME_FILE: json_dir.read_bytes()}),
+                                      str(json_dir), cache)
+            # Issues name the file itself rather than the resume.json it stands for
+            return report._replace(issues=tuple(issue._replace(file=json_dir.name) if issue.file == RESUME_FILE
+                                                else issue for issue in report.issues))
+        return validate_packed(open_pack(json_dir).candidate(candidate), str(json_dir))
+    except (OSError, ValueError, KeyError) as e:
+        return BundleReport(candidate or json_dir.name, str(json_dir),
+                            (Issue(json_dir.name, 0, 0, '', f"cannot be read: {e}"),))
+
+
+def validate_path(path: Union[str, Path], cache: Optional[ParsedDataCache] = None) -> Iterator[BundleReport]:
+    """Reports for a bundle folder, a folder of bundles, a packed file, an archive or a JSON Resume"""
+    path = Path(path)
+    if path.is_dir():
+        if is_bundle(path):
+            yield validate_folder(path, cache)
+            return
+        for bundle in sorted(path.iterdir()):
+            if is_bundle(bundle):
+                yield validate_folder(bundle, cache)
+            elif bundle.is_file() and is_resume_file(bundle):
+                yield validate_bundle(bundle, cache=cache)
+    elif is_archive(path):
+        for source in open_archive(path).stream():
+            yield validate_sources(source, str(path), cache)
+    elif is_resume_file(path):
+        yield validate_bundle(path, cache=cache)
+    else:
+        for packed in open_pack(path):
+            yield validate_packed(packed, str(path))
+
+
+def validation_cache(cache_dir: str = DEFAULT_CACHE_DIR, enabled: bool = True) -> ParsedDataCache:
+    """Cache of per-bundle issues, kept apart from parsed data by its version"""
+    return ParsedDataCache(cache_dir, enabled=enabled, version=f"validate-{SCHEMA_VERSION}")
+
+
+def write_report(path: Union[str, Path], reports: Iterable[BundleReport], checked: int):
+    """Write the machine-readable report: counts plus every bundle that has issues"""
+    reports = [report for report in reports if report.issues]
+    invalid = sum(1 for report in reports if not report.ok)
+    payload = {
+        'schema_version': SCHEMA_VERSION,
+        'checked': checked,
+        'valid': checked - invalid,
+        'invalid': invalid,
+        'bundles': [report.to_json() for report in reports],
+    }
+    write_atomic(Path(path), (json.dumps(payload, indent=2, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+def print_report(report: BundleReport, limit: Optional[int] = None, file: TextIO = sys.stdout):
+    """Print the issues of one bundle, at most limit of them"""
+    source = Path(report.source)
+    folder = report.source if source.is_dir() else str(source.parent) if is_resume_file(source) else report.name
+    issues = report.issues if limit is None else report.issues[:limit]
+    for issue in issues:
+        print(f"  {issue.format(folder)}", file=file)
+    if len(issues) < len(report.issues):
+        print(f"  ... {len(report.issues) - len(issues)} more", file=file)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """Command line entry point for validating bundles"""
+    arg_parser = argparse.ArgumentParser(description="Check CV bundles against the source file schemas")
+    arg_parser.add_argument("paths", nargs="+",
+                            help="Bundle folders, folders of bundles, packed files, zip/tar archives "
+                                 "or JSON Resume files")
+    arg_parser.add_argument("--report", metavar="FILE", help="Write a JSON report of every bundle with issues")
+    arg_parser.add_argument("--no-warnings", action="store_true", help="Only print errors")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always re-check the source files")
+    arg_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Folder for cached results")
+    args = arg_parser.parse_args(argv)
+
+    cache = validation_cache(args.cache_dir, enabled=not args.no_cache)
+    reports = []  # type: List[BundleReport]
+    try:
+        for path in args.paths:
+            for report in validate_path(path, cache):
+                reports.append(report)
+                shown = report.errors if args.no_warnings else report.issues
+                if shown:
+                    print(f"{report.name}: {'ok' if report.ok else 'INVALID'}")
+                    print_report(report._replace(issues=tuple(shown)))
+    except (OSError, ValueError, KeyError) as e:
+        arg_parser.error(str(e))
+
+    invalid = sum(1 for report in reports if not report.ok)
+    print(f"{len(reports) - invalid}/{len(reports)} bundles valid")
+    if args.report:
+        write_report(args.report, reports, len(reports))
+        print(f"Wrote report to {args.report}")
+    return 0 if invalid == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Job-targeted CV variants - Selects the highlights and tags that match a job description
+An inverted index over the candidate's highlights, tags and skills is built once;
+each job description is tokenized and scored against the postings only, and the
+filtered CV is rendered through the parser's regular section formatters
+"""
+
+import argparse
+import math
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from cv_cache import DEFAULT_CACHE_DIR, stream_if_changed
+from cv_parser_simple import SimpleCVParser
+from cv_template import load_template_params
+
+
+# Sections whose entries carry highlights and tags
+ENTRY_SECTIONS = ('experiences', 'side_projects')
+# Sections made of categories of skill strings
+SKILL_SECTIONS = ('hard_skills', 'soft_skills')
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*')
+_STOPWORDS = frozenset('''
+a about above after all also an and any are as at be been being but by can could did do does
+for from had has have having he her here his how i if in into is it its just may me more most
+my no not of on or our out over own per same she should so some such than that the their them
+then there these they this those through to too under up very via was we were what when where
+which while who will with within without would you your
+'''.split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords; a trailing plural "s" is folded"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class IndexedItem(NamedTuple):
+    """One indexed string: a highlight, a tag or a skill"""
+    section: str
+    entry: str
+    field: str
+    position: int
+    text: str
+
+
+class CandidateIndex:
+    """Inverted index from token to (item id, BM25 term weight) postings
+
+    Weights are computed once at build time, so scoring a query only walks the
+    postings of its own tokens and never touches the CV text again.
+    """
+
+    def __init__(self, items: List[IndexedItem], postings: Dict[str, List[Tuple[int, float]]]):
+        self.items = items
+        self.postings = postings
+
+    @classmethod
+    def build(cls, data: Dict[str, Any]) -> 'CandidateIndex':
+        """Index the highlights, tags and skills of the parser's section records"""
+        items = []  # type: List[IndexedItem]
+        for section in ENTRY_SECTIONS:
+            for entry in data.get(section) or ():
+                for field in ('highlights', 'tags'):
+                    for position, text in enumerate(getattr(entry, field)):
+                        items.append(IndexedItem(section, entry.key, field, position, str(text)))
+        for section in SKILL_SECTIONS:
+            for category in data.get(section) or ():
+                if category.items is not None:
+                    for position, text in enumerate(category.items):
+                        items.append(IndexedItem(section, category.name, 'skills', position, str(text)))
+
+        frequencies = [Counter(tokenize(item.text)) for item in items]
+        lengths = [sum(counts.values()) for counts in frequencies]
+        average_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+        document_frequency = Counter(token for counts in frequencies for token in counts)
+
+        postings = {}  # type: Dict[str, List[Tuple[int, float]]]
+        total = len(items)
+        for item_id, counts in enumerate(frequencies):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[item_id] / (average_length or 1.0))
+            for token, tf in counts.items():
+                df = document_frequency[token]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                postings.setdefault(token, []).append((item_id, idf * tf * (BM25_K1 + 1) / (tf + norm)))
+        return cls(items, postings)
+
+    def score(self, query: Union[str, Iterable[str]]) -> Dict[int, float]:
+        """Score items against a job description or a list of keywords"""
+        text = query if isinstance(query, str) else ' '.join(query)
+        scores = {}  # type: Dict[int, float]
+        for token, count in Counter(tokenize(text)).items():
+            weight = 1 + math.log(count)
+            for item_id, term_weight in self.postings.get(token, ()):
+                scores[item_id] = scores.get(item_id, 0.0) + weight * term_weight
+        return scores
+
+
+class Variant(NamedTuple):
+    """Filtered section records for one job, plus the matched items"""
+    data: Dict[str, Any]
+    matched: List[Tuple[float, IndexedItem]]
+
+
+def top_k(values: Sequence[Any], scores: List[float], k: Optional[int]) -> Tuple[Any, ...]:
+    """The k best-scoring values in their original order; ties keep the earlier value"""
+    if k is None or len(values) <= k:
+        return tuple(values)
+    ranked = sorted(range(len(values)), key=lambda i: (-scores[i], i))[:k]
+    return tuple(values[i] for i in sorted(ranked))
+
+
+class VariantEngine:
+    """Builds the index for one candidate and renders job-targeted variants"""
+
+    def __init__(self, parser: SimpleCVParser):
+        self.parser = parser
+        # Variants are short-lived; keep their fragments in memory only
+        parser.fragments.persist = False
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the index after the parser data was (re)loaded"""
+        self.base = {attribute: getattr(self.parser, attribute)
+                     for attribute in ENTRY_SECTIONS + SKILL_SECTIONS}
+        self.index = CandidateIndex.build(self.base)
+        # item positions per (section, entry, field), for mapping scores back
+        self.slots = {}  # type: Dict[Tuple[str, str, str], List[int]]
+        for item_id, item in enumerate(self.index.items):
+            self.slots.setdefault((item.section, item.entry, item.field), []).append(item_id)
+
+    def select(self, query: Union[str, Iterable[str]], highlights: Optional[int] = 3,
+               tags: Optional[int] = 5, skills: Optional[int] = None) -> Variant:
+        """Keep the top highlights and tags of every entry (and optionally skills per category)"""
+        scores = self.index.score(query)
+        limits = {'highlights': highlights, 'tags': tags, 'skills': skills}
+        data = {}  # type: Dict[str, Any]
+
+        for section in ENTRY_SECTIONS:
+            filtered = []
+            for entry in self.base[section] or ():
+                kept = {}
+                for field in ('highlights', 'tags'):
+                    item_ids = self.slots.get((section, entry.key, field))
+                    if item_ids:
+                        kept[field] = top_k(getattr(entry, field), [scores.get(i, 0.0) for i in item_ids],
+                                            limits[field])
+                filtered.append(entry._replace(**kept))
+            data[section] = tuple(filtered)
+
+        for section in SKILL_SECTIONS:
+            if skills is None:
+                data[section] = self.base[section]
+                continue
+            filtered = []
+            for category in self.base[section] or ():
+                item_ids = self.slots.get((section, category.name, 'skills'))
+                if item_ids:
+                    category = category._replace(
+                        items=top_k(category.items, [scores.get(i, 0.0) for i in item_ids], skills))
+                filtered.append(category)
+            data[section] = tuple(filtered)
+
+        matched = sorted(((score, self.index.items[i]) for i, score in scores.items()),
+                         key=lambda pair: -pair[0])
+        return Variant(data, matched)
+
+    def iter_document(self, variant: Variant) -> Iterator[str]:
+        """Render a variant through the parser's formatters, restoring its data afterwards"""
+        saved = {attribute: getattr(self.parser, attribute) for attribute in variant.data}
+        for attribute, value in variant.data.items():
+            setattr(self.parser, attribute, value)
+        try:
+            yield from self.parser.iter_document()
+        finally:
+            for attribute, value in saved.items():
+                setattr(self.parser, attribute, value)
+
+    def render(self, variant: Variant) -> str:
+        return ''.join(self.iter_document(variant))
+
+
+def read_jobs(paths: List[str], jobs_dir: Optional[str], keywords: Optional[str]) -> List[Tuple[str, str]]:
+    """Collect (name, text) pairs from job files, a folder of .txt files and a keyword list"""
+    jobs = []
+    for path in paths:
+        if path == '-':
+            jobs.append(('stdin', sys.stdin.read()))
+        else:
+            jobs.append((Path(path).stem, Path(path).read_text(encoding='utf-8')))
+    if jobs_dir:
+        for path in sorted(Path(jobs_dir).glob('*.txt')):
+            jobs.append((path.stem, path.read_text(encoding='utf-8')))
+    if keywords:
+        jobs.append(('keywords', keywords.replace(',', ' ')))
+    return jobs
+
+
+def main():
+    """Command line entry point for job-targeted variants"""
+    arg_parser = argparse.ArgumentParser(description="Render CV variants tailored to job descriptions")
+    arg_parser.add_argument("--json-dir", default="../CV_json", help="Candidate bundle")
+    arg_parser.add_argument("--job", action="append", default=[],
+                            help="Job description text file ('-' for stdin); may be repeated")
+    arg_parser.add_argument("--jobs-dir", help="Folder of job description .txt files")
+    arg_parser.add_argument("--keywords", help="Comma-separated keywords used as a job description")
+    arg_parser.add_argument("--output-dir", default="variants", help="Folder for the rendered variants")
+    arg_parser.add_argument("--top-highlights", type=int, default=3, help="Highlights kept per entry")
+    arg_parser.add_argument("--top-tags", type=int, default=5, help="Tags kept per entry")
+    arg_parser.add_argument("--top-skills", type=int, default=None,
+                            help="Skills kept per category (default: all)")
+    arg_parser.add_argument("--template-config", help="JSON file of template parameters")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always re-parse the source files")
+    arg_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Folder for the parsed-data cache")
+    args = arg_parser.parse_args()
+
+    jobs = read_jobs(args.job, args.jobs_dir, args.keywords)
+    if not jobs:
+        arg_parser.error("give at least one of --job, --jobs-dir or --keywords")
+    try:
+        template_params = load_template_params(args.template_config)
+    except (OSError, ValueError) as e:
+        arg_parser.error(f"invalid template config: {e}")
+
+    parser = SimpleCVParser(json_dir=args.json_dir, use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                            template_params=template_params)
+    parser.load_all_data()
+
+    start = time.perf_counter()
+    engine = VariantEngine(parser)
+    print(f"Indexed {len(engine.index.items)} items ({len(engine.index.postings)} distinct tokens) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    for name, text in jobs:
+        variant = engine.select(text, args.top_highlights, args.top_tags, args.top_skills)
+        stream_if_changed(output_dir / f"{name}.tex", engine.iter_document(variant))
+        best = ', '.join(dict.fromkeys(item.text for _, item in variant.matched if item.field == 'tags'))
+        print(f"  {name}: {len(variant.matched)} matching items" + (f" (tags: {best[:80]})" if best else ""))
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {len(jobs)} variants to {output_dir} in {elapsed:.2f}s "
+          f"({elapsed / len(jobs) * 1000:.1f} ms per variant)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Watch mode - Regenerates the LaTeX file (and optionally the PDF) on source edits
+The parser stays resident, so a cycle only re-parses the files that changed and
+re-renders their sections; everything else comes from the in-memory caches
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from cv_cache import stream_if_changed
+from cv_compile import LatexCompiler, job_for
+from cv_resume import BUNDLE_FILES
+from cv_trace import logger
+
+
+DEFAULT_DEBOUNCE = 0.15
+DEFAULT_POLL_INTERVAL = 0.25
+
+# inotify event mask: content written, file created, deleted or renamed in/out
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_INOTIFY_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+FileState = Optional[Tuple[int, int]]
+
+
+class CycleReport(NamedTuple):
+    """Timings of one rebuild cycle"""
+    changed: List[str]
+    load_seconds: float
+    render_seconds: float
+    compile_seconds: float
+    written: bool
+    compiled: Optional[bool]
+
+    @property
+    def total_seconds(self) -> float:
+        return self.load_seconds + self.render_seconds + self.compile_seconds
+
+
+def _open_inotify(directory: Path) -> Optional[int]:
+    """Return an inotify descriptor watching directory, or None where unavailable"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(str(directory)), _INOTIFY_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class SourceWatcher:
+    """Detects changes to a fixed set of files in one directory
+
+    Uses inotify when available to sleep until the directory changes, and
+    plain stat polling otherwise. Either way the changed files are found by
+    comparing size and mtime snapshots, so spurious events are harmless.
+    """
+
+    def __init__(self, directory: str, filenames: List[str],
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True):
+        self.directory = Path(directory)
+        self.filenames = list(filenames)
+        self.poll_interval = poll_interval
+        self.inotify_fd = _open_inotify(self.directory) if use_inotify else None
+        self.state = self.snapshot()
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self.inotify_fd is not None else "polling"
+
+    def snapshot(self) -> Dict[str, FileState]:
+        """Size and mtime of every watched file, None for missing files"""
+        state = {}  # type: Dict[str, FileState]
+        for filename in self.filenames:
+            try:
+                stat = os.stat(self.directory / filename)
+                state[filename] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                state[filename] = None
+        return state
+
+    def _changed_files(self) -> Set[str]:
+        state = self.snapshot()
+        changed = {filename for filename in self.filenames if state[filename] != self.state[filename]}
+        self.state = state
+        return changed
+
+    def _sleep(self, seconds: float):
+        """Sleep up to seconds, waking early on an inotify event"""
+        if self.inotify_fd is None:
+            time.sleep(min(seconds, self.poll_interval))
+            return
+        readable, _, _ = select.select([self.inotify_fd], [], [], seconds)
+        if readable:
+            # The events themselves are not needed, only the wake-up
+            try:
+                while os.read(self.inotify_fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Block until watched files change or timeout expires; return their names"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._changed_files()
+            if changed:
+                return changed
+            if deadline is None:
+                self._sleep(self.poll_interval if self.inotify_fd is None else 3600.0)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            self._sleep(remaining)
+
+    def wait_debounced(self, debounce: float = DEFAULT_DEBOUNCE) -> Set[str]:
+        """Wait for a change, then keep collecting until debounce seconds pass quietly"""
+        changed = self.wait()
+        while True:
+            more = self.wait(debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+
+def rebuild(parser, changed: Optional[Set[str]] = None,
+            compiler: Optional[LatexCompiler] = None) -> CycleReport:
+    """Reload changed files (all of them when changed is None), re-render and compile"""
+    start = time.perf_counter()
+    if changed is None:
+        parser.load_all_data()
+    else:
+        parser.reload_data_files(changed)
+    loaded = time.perf_counter()
+
+    written = stream_if_changed(parser.output_file, parser.iter_document())
+    rendered = time.perf_counter()
+
+    compiled = None
+    # An unchanged .tex file means an unchanged PDF, so the compile is skipped
+    if compiler and (written or changed is None):
+        result = compiler.compile(job_for(parser.output_file))
+        if not result.ok:
+            logger.warning(f"Compile failed: {result.error} (log: {result.log_file})")
+        compiled = result.ok
+    finished = time.perf_counter()
+
+    return CycleReport(sorted(changed or []), loaded - start, rendered - loaded,
+                       finished - rendered, written, compiled)
+
+
+def print_report(report: CycleReport):
+    """Print the latency of one cycle"""
+    what = ', '.join(report.changed) or 'all sources'
+    outcome = "written" if report.written else "unchanged"
+    line = (f"[watch] {what}: {report.total_seconds * 1000:.0f} ms "
+            f"(load {report.load_seconds * 1000:.0f} ms, render {report.render_seconds * 1000:.0f} ms")
+    if report.compiled is not None:
+        line += f", compile {report.compile_seconds * 1000:.0f} ms"
+        if not report.compiled:
+            outcome += ", compile FAILED"
+    logger.info(f"{line}) - {outcome}")
+
+
+def watch(parser, compiler: Optional[LatexCompiler] = None, debounce: float = DEFAULT_DEBOUNCE,
+          poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True,
+          max_cycles: Optional[int] = None):
+    """Build once, then rebuild on every debounced burst of source edits until interrupted"""
+    watcher = SourceWatcher(parser.json_dir, list(BUNDLE_FILES),
+                            poll_interval=poll_interval, use_inotify=use_inotify)
+    logger.info(f"Watching {parser.json_dir} ({watcher.backend}), press Ctrl+C to stop")
+    try:
+        print_report(rebuild(parser, None, compiler))
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            changed = watcher.wait_debounced(debounce)
+            print_report(rebuild(parser, changed, compiler))
+            cycles += 1
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+    finally:
+        watcher.close()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Single-pass scanner for the CV_json dictionary format
+Reads "name = {...}" files (comments, implicit string concatenation, trailing
+commas, missing commas between lines) straight into Python objects without
+building an AST. Files holding a plain JSON object are recognised by their
+first character and handed to the json module instead.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+_TOKEN_RE = re.compile(r'''
+     (?P<gap>(?:[ \t\r\f]+|\#[^\n]*|\n)+)
+    |(?P<string>[rRuU]?(?:"""(?:[^"\\]|\\.|"(?!""))*"""
+                         |\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\'
+                         |"(?:[^"\\\n]|\\.)*"
+                         |'(?:[^'\\\n]|\\.)*'))
+    |(?P<number>-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+    |(?P<name>[A-Za-z_]\w*)
+    |(?P<op>[{}\[\](),:=/])
+    |(?P<error>.)
+''', re.VERBOSE | re.DOTALL)
+
+_ESCAPE_RE = re.compile(r'\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|[0-7]{1,3}|\n|.)', re.DOTALL)
+
+_SIMPLE_ESCAPES = {
+    'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', "'": "'", '"': '"',
+    'a': '\a', 'b': '\b', 'f': '\f', 'v': '\v', '\n': '',
+}
+
+_NAMED_CONSTANTS = {'True': True, 'False': False, 'None': None}
+_JSON_CONSTANTS = {'true': True, 'false': False, 'null': None}
+_BOM = '\ufeff'
+
+
+class DictScanError(ValueError):
+    """Syntax error raised while scanning a dictionary file"""
+
+    def __init__(self, message: str, text: str, pos: int):
+        self.reason = message
+        self.line, self.column = line_column(text, pos)
+        super().__init__(f"{message} at line {self.line}, column {self.column}")
+
+
+def line_column(text: str, pos: int) -> Tuple[int, int]:
+    """1-based line and column of an offset into text"""
+    return text.count('\n', 0, pos) + 1, pos - (text.rfind('\n', 0, pos) + 1) + 1
+
+
+def _decode_escape(match) -> str:
+    """Translate one backslash escape sequence"""
+    code = match.group(1)
+    if code in _SIMPLE_ESCAPES:
+        return _SIMPLE_ESCAPES[code]
+    if code[0] in 'xuU':
+        return chr(int(code[1:], 16))
+    if code[0] in '01234567':
+        return chr(int(code, 8))
+    # Unknown escapes keep their backslash, like Python does
+    return match.group(0)
+
+
+def _decode_string(token: str) -> str:
+    """Turn a string literal token into its value"""
+    raw = token[0] in 'rR'
+    if token[0] in 'rRuU':
+        token = token[1:]
+    quote_len = 3 if token[:3] in ('"""', "'''") else 1
+    body = token[quote_len:-quote_len]
+    if raw or '\\' not in body:
+        return body
+    return _ESCAPE_RE.sub(_decode_escape, body)
+
+
+class _Scanner:
+    """Recursive descent over a lazily produced token stream"""
+
+    def __init__(self, text: str, locate: bool = False, constants: Dict[str, Any] = _NAMED_CONSTANTS):
+        self.text = text
+        self.constants = constants
+        # With locate, the offset of every dict key and list item by its path of keys and indices
+        self.positions = {} if locate else None  # type: Optional[Dict[Tuple[Any, ...], int]]
+        self.path = []  # type: List[Any]
+        self.duplicates = []  # type: List[Tuple[Any, ...]]
+        self.tokens = _TOKEN_RE.finditer(text)
+        self.kind = ''
+        self.value = ''
+        self.pos = 0
+        self.newline = False
+        self.advance()
+
+    def advance(self):
+        """Move to the next meaningful token, remembering line breaks"""
+        self.newline = False
+        for match in self.tokens:
+            kind = match.lastgroup
+            if kind == 'gap':
+                # Whitespace and comments only matter when they break a line
+                if '\n' in match.group():
+                    self.newline = True
+            else:
+                self.kind = kind
+                self.value = match.group()
+                self.pos = match.start()
+                return
+        self.kind = 'end'
+        self.value = ''
+        self.pos = len(self.text)
+
+    def error(self, message: str):
+        raise DictScanError(message, self.text, self.pos)
+
+    def found(self) -> str:
+        """The current token as an error message names it"""
+        return 'end of file' if self.kind == 'end' else repr(self.value)
+
+    def expect(self, op: str):
+        if self.kind != 'op' or self.value != op:
+            self.error(f"Expected '{op}' but found {self.found()}")
+        self.advance()
+
+    def at_op(self, op: str) -> bool:
+        return self.kind == 'op' and self.value == op
+
+    def separator(self, closing: str, after_string: bool) -> bool:
+        """Consume an item separator; return False once the container closes
+
+        Besides commas this accepts the two repairs the legacy loader made:
+        a line break between items and "a" / "b" between strings.
+        """
+        if self.kind == 'op':
+            if self.value == ',' or (self.value == '/' and after_string):
+                self.advance()
+                return not self.at_op(closing)
+            if self.value == closing:
+                return False
+        if self.newline and self.kind != 'end':
+            return True
+        self.error(f"Expected ',' or '{closing}' but found {self.found()}")
+
+    def parse_value(self) -> Any:
+        kind = self.kind
+        if kind == 'string':
+            value = _decode_string(self.value)
+            self.advance()
+            # Implicit concatenation only applies to literals on the same line
+            while self.kind == 'string' and not self.newline:
+                value += _decode_string(self.value)
+                self.advance()
+            return value
+        if kind == 'op':
+            if self.value == '{':
+                return self.parse_dict()
+            if self.value == '(':
+                items, separated = self.parse_sequence(')')
+                if len(items) == 1 and not separated:
+                    return items[0]
+                return tuple(items)
+            if self.value == '[':
+                return self.parse_sequence(']')[0]
+        if kind == 'number':
+            text = self.value
+            self.advance()
+            if '.' in text or 'e' in text or 'E' in text:
+                return float(text)
+            return int(text)
+        if kind == 'name' and self.value in self.constants:
+            value = self.constants[self.value]
+            self.advance()
+            return value
+        self.error(f"Unexpected {self.found()}")
+
+    def parse_sequence(self, closing: str) -> Tuple[list, bool]:
+        """Parse list or tuple items; also report whether any separator was seen"""
+        self.advance()
+        items = []
+        separated = False
+        while not self.at_op(closing):
+            is_string = self.kind == 'string'
+            if self.positions is not None:
+                self.path.append(len(items))
+                self.positions[tuple(self.path)] = self.pos
+                items.append(self.parse_value())
+                self.path.pop()
+            else:
+                items.append(self.parse_value())
+            separated = separated or not self.at_op(closing)
+            if not self.separator(closing, is_string):
+                break
+        self.advance()
+        return items, separated
+
+    def parse_dict(self) -> Dict[Any, Any]:
+        self.advance()
+        result = {}
+        while not self.at_op('}'):
+            key_pos = self.pos
+            key = self.parse_value()
+            self.expect(':')
+            is_string = self.kind == 'string'
+            if self.positions is not None:
+                self.path.append(key)
+                path = tuple(self.path)
+                if key in result:
+                    self.duplicates.append(path)
+                self.positions[path] = key_pos
+                result[key] = self.parse_value()
+                self.path.pop()
+            else:
+                result[key] = self.parse_value()
+            if not self.separator('}', is_string):
+                break
+        self.advance()
+        return result
+
+
+class LocatedDict(NamedTuple):
+    """A parsed file with the offset of every key and list item, by path"""
+    name: str
+    data: Dict[str, Any]
+    offsets: Dict[Tuple[Any, ...], int]
+    duplicates: List[Tuple[Any, ...]]
+    text: str
+
+    def position(self, path: Tuple[Any, ...]) -> Optional[Tuple[int, int]]:
+        """(line, column) of the key or item at path, None for an unknown path"""
+        pos = self.offsets.get(path)
+        return None if pos is None else line_column(self.text, pos)
+
+
+def parse_dict_assignment(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Parse a "name = {...}" file and return the name and dictionary
+
+    Top-level values written as parenthesised string groups are joined
+    into a single string, matching the legacy loader.
+    """
+    return _parse_assignment(_Scanner(text))
+
+
+def locate_dict_assignment(text: str) -> LocatedDict:
+    """parse_dict_assignment that also records where each key and item is and which keys repeat
+
+    A path is the tuple of keys and list indices leading to a value, such as
+    ("Senior Engineer", "highlights", 2); the root dictionary is ().
+    """
+    scanner = _Scanner(text, locate=True)
+    name, data = _parse_assignment(scanner)
+    return LocatedDict(name, data, scanner.positions, scanner.duplicates, text)
+
+
+def _parse_assignment(scanner: _Scanner) -> Tuple[str, Dict[str, Any]]:
+    if scanner.kind != 'name':
+        scanner.error("Could not find dictionary assignment")
+    name = scanner.value
+    scanner.advance()
+    scanner.expect('=')
+    if not scanner.at_op('{'):
+        scanner.error("Expected a dictionary")
+    if scanner.positions is not None:
+        scanner.positions[()] = scanner.pos
+    result = scanner.parse_dict()
+
+    for key, value in result.items():
+        if isinstance(value, tuple):
+            result[key] = ''.join(str(item) for item in value)
+
+    return name, result
+
+
+def is_json_text(text: str) -> bool:
+    """Whether text is a strict JSON object rather than a "name = {...}" assignment"""
+    return text.lstrip(_BOM + ' \t\r\n').startswith('{')
+
+
+def _json_object(text: str) -> Dict[str, Any]:
+    """Decode a JSON object with the C decoder, raising DictScanError with the position of a syntax error"""
+    skipped = 1 if text.startswith(_BOM) else 0
+    try:
+        return json.loads(text[skipped:])
+    except json.JSONDecodeError as e:
+        raise DictScanError(e.msg, text, e.pos + skipped) from None
+
+
+def parse_source(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Parse a source file in either format, returning its name ('' for JSON) and dictionary
+
+    Machine-generated JSON takes the json module's fast path; anything else
+    is read as a "name = {...}" assignment by parse_dict_assignment.
+    """
+    if is_json_text(text):
+        return '', _json_object(text)
+    return parse_dict_assignment(text)
+
+
+def locate_source(text: str) -> LocatedDict:
+    """locate_dict_assignment for either format
+
+    The data of a JSON file comes from the json module, so its syntax is
+    checked strictly; the scanner only runs to find where keys and items are.
+    """
+    if not is_json_text(text):
+        return locate_dict_assignment(text)
+    data = _json_object(text)
+    # The byte-order mark is blanked rather than dropped so offsets still match text
+    scanner = _Scanner(text.replace(_BOM, ' ', 1), locate=True, constants=_JSON_CONSTANTS)
+    scanner.positions[()] = scanner.pos
+    scanner.parse_dict()
+    return LocatedDict('', data, scanner.positions, scanner.duplicates, text)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Inline markup for highlights and summaries
+Tokenizes **bold**, *italic*, `code` and [text](url) once into a flat node
+list, then emits LaTeX (or HTML, or plain text) escaping only the text nodes
+"""
+
+import html
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from latex_escape import ESCAPE_CACHE_SIZE, escape_text
+
+
+# A node is (kind, value):
+#   ('text', str)      plain text, escaped on output
+#   ('code', str)      inline code, escaped and set in typewriter
+#   ('bold', None)     start of a bold span
+#   ('italic', None)   start of an italic span
+#   ('link', url)      start of a link whose label follows
+#   ('end', kind)      end of the innermost bold/italic/link span
+InlineNode = Tuple[str, Optional[str]]
+
+_INLINE_RE = re.compile(r'''(?=[*`\[])(?:
+     \*\*(?P<bold>.*?)\*\*
+    |`(?P<code>[^`]+)`
+    |\[(?P<link>[^\]]+)\]\((?P<url>[^)\s]+)\)
+    |(?<![\w*])\*(?P<italic>[^*\s](?:[^*]*[^*\s])?)\*(?![\w*]))
+''', re.VERBOSE)
+
+# Any character that can open a markup span
+_MARKUP_CHARS_RE = re.compile(r'[*`\[]')
+
+# Characters that still need escaping inside \href{...}
+_URL_ESCAPES = {'%': r'\%', '#': r'\#', '\\': r'\\'}
+_URL_RE = re.compile(r'[%#\\]')
+
+_LATEX_OPENERS = {'bold': '\\textbf{', 'italic': '\\textit{'}
+_HTML_TAGS = {'bold': 'strong', 'italic': 'em', 'link': 'a'}
+
+
+def parse_inline(text: str, nodes: Optional[List[InlineNode]] = None) -> List[InlineNode]:
+    """Split text into a flat list of markup nodes (see InlineNode)"""
+    if nodes is None:
+        nodes = []
+    if not _MARKUP_CHARS_RE.search(text):
+        nodes.append(('text', text))
+        return nodes
+
+    # split() returns the leading text, then per match the five groups and the text after it
+    pieces = _INLINE_RE.split(text)
+    if pieces[0]:
+        nodes.append(('text', pieces[0]))
+    for i in range(1, len(pieces), 6):
+        bold, code, label, url, italic, tail = pieces[i:i + 6]
+        if code is not None:
+            nodes.append(('code', code))
+        elif bold is not None:
+            nodes.append(('bold', None))
+            parse_inline(bold, nodes)
+            nodes.append(('end', 'bold'))
+        elif url is not None:
+            nodes.append(('link', url))
+            parse_inline(label, nodes)
+            nodes.append(('end', 'link'))
+        else:
+            nodes.append(('italic', None))
+            parse_inline(italic, nodes)
+            nodes.append(('end', 'italic'))
+        if tail:
+            nodes.append(('text', tail))
+    return nodes
+
+
+def escape_url(url: str) -> str:
+    """Escape the characters hyperref cannot take verbatim in a URL argument"""
+    return _URL_RE.sub(lambda match: _URL_ESCAPES[match.group()], url)
+
+
+def nodes_to_latex(nodes: List[InlineNode]) -> str:
+    """Emit LaTeX for a node list, escaping only text and code nodes"""
+    parts = []
+    for kind, value in nodes:
+        if kind == 'text':
+            parts.append(escape_text(value))
+        elif kind == 'end':
+            parts.append('}')
+        elif kind == 'code':
+            parts.append(f"\\texttt{{{escape_text(value)}}}")
+        elif kind == 'link':
+            parts.append(f"\\href{{{escape_url(value)}}}{{")
+        else:
+            parts.append(_LATEX_OPENERS[kind])
+    return ''.join(parts)
+
+
+def render_inline(text: Any) -> str:
+    """Convert a markup string to escaped LaTeX; other values are written with str()"""
+    if not isinstance(text, str):
+        return str(text)
+    return render_inline_string(text)
+
+
+@lru_cache(maxsize=ESCAPE_CACHE_SIZE)
+def render_inline_string(text: str) -> str:
+    """render_inline for a string, memoized so each distinct string is tokenized only once"""
+    if not _MARKUP_CHARS_RE.search(text):
+        return escape_text(text)
+    return nodes_to_latex(parse_inline(text))
+
+
+def nodes_to_html(nodes: List[InlineNode]) -> str:
+    """Emit HTML for a node list, escaping text, code and URLs"""
+    parts = []
+    for kind, value in nodes:
+        if kind == 'text':
+            parts.append(html.escape(value, quote=False))
+        elif kind == 'end':
+            parts.append(f"</{_HTML_TAGS[value]}>")
+        elif kind == 'code':
+            parts.append(f"<code>{html.escape(value, quote=False)}</code>")
+        elif kind == 'link':
+            parts.append(f'<a href="{html.escape(value)}">')
+        else:
+            parts.append(f"<{_HTML_TAGS[kind]}>")
+    return ''.join(parts)
+
+
+def render_inline_html(text: Any) -> str:
+    """Convert a markup string to escaped HTML; other values are written with str(), escaped"""
+    if not isinstance(text, str):
+        return html.escape(str(text), quote=False)
+    return _render_html_string(text)
+
+
+@lru_cache(maxsize=ESCAPE_CACHE_SIZE)
+def _render_html_string(text: str) -> str:
+    if not _MARKUP_CHARS_RE.search(text):
+        return html.escape(text, quote=False)
+    return nodes_to_html(parse_inline(text))
+
+
+def render_inline_text(text: str) -> str:
+    """Drop the markup of a string, keeping code and link labels as plain text"""
+    if not isinstance(text, str):
+        return str(text)
+    if not _MARKUP_CHARS_RE.search(text):
+        return text
+    return ''.join(value for kind, value in parse_inline(text) if kind in ('text', 'code'))
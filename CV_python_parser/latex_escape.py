@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Table-driven LaTeX escaping
+One compiled-regex pass per string plus a bounded memo cache for the strings
+(tags, skill names, dates) that repeat across sections and candidates
+"""
+
+import re
+from functools import lru_cache
+from typing import Any
+
+
+# Unicode characters that pdflatex with inputenc/utf8 cannot typeset directly
+UNICODE_REPLACEMENTS = {
+    '\u2013': '--',                  # en dash
+    '\u2014': '---',                 # em dash
+    '\u2026': r'\ldots{}',           # ellipsis
+    '\u2192': r'$\rightarrow$',      # right arrow
+    '\u2190': r'$\leftarrow$',       # left arrow
+    '\u2194': r'$\leftrightarrow$',  # left-right arrow
+    '\u21d2': r'$\Rightarrow$',      # double right arrow
+    '\u00d7': r'$\times$',           # multiplication sign
+    '\u2265': r'$\geq$',             # greater-than or equal
+    '\u2264': r'$\leq$',             # less-than or equal
+    '\u2248': r'$\approx$',          # almost equal
+    '\u00b1': r'$\pm$',              # plus-minus
+}
+
+# Characters escaped in text that already contains LaTeX commands
+LATEX_TEXT_ESCAPES = {
+    '_': r'\_',
+    '^': r'\^{}',
+    '~': r'\textasciitilde{}',
+    '$': r'\$',
+    '%': r'\%',
+    '#': r'\#',
+    '&': r'\&',
+}
+
+# Characters escaped in plain text
+PLAIN_TEXT_ESCAPES = dict(LATEX_TEXT_ESCAPES, **{
+    '\\': r'\textbackslash{}',
+    '{': r'\{',
+    '}': r'\}',
+})
+
+_LATEX_TABLE = dict(LATEX_TEXT_ESCAPES, **UNICODE_REPLACEMENTS)
+_PLAIN_TABLE = dict(PLAIN_TEXT_ESCAPES, **UNICODE_REPLACEMENTS)
+
+# One character class per mode; every match is looked up in the matching table
+_LATEX_RE = re.compile('[' + re.escape(''.join(_LATEX_TABLE)) + ']')
+_PLAIN_RE = re.compile('[' + re.escape(''.join(_PLAIN_TABLE)) + ']')
+
+# Commands that mark a string as already formatted LaTeX
+_LATEX_COMMANDS = [
+    '\\textbar{}', '\\textbf{', '\\textcolor{', '\\cvtag{', '\\cvevent{', '\\href{',
+    '\\faExternalLink', '\\faMortarBoard', '\\vspace{', '\\cvsection{', '\\begin{',
+    '\\end{', '\\item', '\\switchcolumn', '\\newpage',
+]
+_LATEX_COMMAND_RE = re.compile('|'.join(re.escape(command) for command in _LATEX_COMMANDS))
+
+ESCAPE_CACHE_SIZE = 16384
+
+
+def _latex_replacement(match) -> str:
+    return _LATEX_TABLE[match.group()]
+
+
+def _plain_replacement(match) -> str:
+    return _PLAIN_TABLE[match.group()]
+
+
+def escape_latex(text: Any) -> str:
+    """Escape special LaTeX characters and convert common Unicode symbols
+
+    Strings go through the memoized escape_string; other values, lists
+    included, are converted with str() and left unescaped.
+    """
+    if not isinstance(text, str):
+        return str(text)
+    return escape_string(text)
+
+
+@lru_cache(maxsize=ESCAPE_CACHE_SIZE)
+def escape_string(text: str) -> str:
+    """escape_latex for a string, memoized"""
+    if '\\' in text and _LATEX_COMMAND_RE.search(text):
+        # Already LaTeX formatted, just escape basic characters
+        return _LATEX_RE.sub(_latex_replacement, text)
+    return _PLAIN_RE.sub(_plain_replacement, text)
+
+
+def escape_text(text: str) -> str:
+    """Escape text that is known to hold no LaTeX markup, backslashes included
+
+    Not memoized; callers such as render_inline cache at a coarser level.
+    """
+    return _PLAIN_RE.sub(_plain_replacement, text)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Stub pdflatex - Stands in for a TeX installation when testing the compile stage
+Understands the pdflatex options used by cv_compile.py (-ini, -fmt, -jobname,
+-output-directory, -interaction, -halt-on-error), "dumps" a format by storing
+the preamble, and writes a small placeholder PDF plus a .log file.
+
+Like pdflatex it writes a .aux (citations, \\bibdata, labels, and the \\bibcite
+entries of an existing .bbl), a .bcf for biblatex documents and, with hyperref,
+a .out of bookmarks, so the pass loop converges as with a real TeX: two passes
+from scratch, one more after the bibliography. With --bibtex or --biber it
+stands in for that tool instead and turns the cited keys into a .bbl:
+
+    python cv_parser_simple.py --compile "python stub_pdflatex.py" \\
+        --bibtex "python stub_pdflatex.py --bibtex" --biber "python stub_pdflatex.py --biber"
+
+Environment variables:
+  STUB_LATEX_DELAY           seconds every run takes (default 0.05)
+  STUB_LATEX_PREAMBLE_DELAY  extra seconds spent "loading packages" when no
+                             format file is used (default 0.2)
+A document containing \\stubfail fails to compile, for error-path tests.
+"""
+
+import hashlib
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+def _search_dirs(variable: str) -> List[Path]:
+    """Folders listed in a kpathsea-style path variable, current folder first"""
+    dirs = [Path('.')]
+    for entry in os.environ.get(variable, '').split(os.pathsep):
+        if entry:
+            dirs.append(Path(entry.rstrip('/')))
+    return dirs
+
+
+def _find(name: str, variable: str) -> Optional[Path]:
+    for directory in _search_dirs(variable):
+        candidate = directory / name
+        if candidate.exists():
+            return candidate
+    return None
+
+
+_CITE_RE = re.compile(r'\\(?:no)?cite[a-z]*\*?(?:\[[^\]]*\])*\{([^}]*)\}')
+_BIBLIOGRAPHY_RE = re.compile(r'\\bibliography\{([^}]*)\}')
+_BIBSTYLE_RE = re.compile(r'\\bibliographystyle\{([^}]*)\}')
+_RESOURCE_RE = re.compile(r'\\addbibresource(?:\[[^\]]*\])?\{([^}]*)\}')
+_LABEL_RE = re.compile(r'\\label\{([^}]*)\}')
+_SECTION_RE = re.compile(r'\\(?:cvsection|section)\*?(?:\[[^\]]*\])?\{([^}]*)\}')
+_BIB_ENTRY_RE = re.compile(r'@\w+\s*\{\s*([^,\s]+)\s*,')
+
+
+def _read(path: Path) -> str:
+    return path.read_text(encoding='utf-8') if path.exists() else ''
+
+
+def write_auxiliary(text: str, output_dir: Path, jobname: str):
+    """The files a pass leaves for the next one, from the document and the current .bbl"""
+    cited = [key.strip() for group in _CITE_RE.findall(text) for key in group.split(',') if key.strip()]
+    biblatex = _RESOURCE_RE.search(text) is not None
+    bbl = _read(output_dir / f"{jobname}.bbl")
+    aux = ['\\relax']
+    if biblatex:
+        aux.extend(f'\\abx@aux@cite{{0}}{{{key}}}' for key in cited)
+        aux.extend(f'\\abx@aux@number{{{key}}}{{{n}}}'
+                   for n, key in enumerate(re.findall(r'\\entry\{([^}]*)\}', bbl), 1))
+        bcf = ['<bcf:controlfile>']
+        bcf.extend(f'  <bcf:datasource type="file">{name.strip()}</bcf:datasource>'
+                   for resources in _RESOURCE_RE.findall(text) for name in resources.split(','))
+        bcf.extend(f'  <bcf:citekey order="{n}">{key}</bcf:citekey>' for n, key in enumerate(cited, 1))
+        bcf.append('</bcf:controlfile>')
+        (output_dir / f"{jobname}.bcf").write_text('\n'.join(bcf) + '\n', encoding='utf-8')
+    else:
+        aux.extend(f'\\citation{{{key}}}' for key in cited)
+        aux.extend(f'\\bibstyle{{{style}}}' for style in _BIBSTYLE_RE.findall(text))
+        aux.extend(f'\\bibdata{{{data}}}' for data in _BIBLIOGRAPHY_RE.findall(text))
+        aux.extend(f'\\bibcite{{{key}}}{{{n}}}' for n, key in enumerate(re.findall(r'\\bibitem\{([^}]*)\}', bbl), 1))
+    aux.extend(f'\\newlabel{{{label}}}{{{{{n}}}{{1}}}}' for n, label in enumerate(_LABEL_RE.findall(text), 1))
+    aux.append('\\gdef \\@abspage@last{1}')
+    (output_dir / f"{jobname}.aux").write_text('\n'.join(aux) + '\n', encoding='utf-8')
+    if '{hyperref}' in text:
+        bookmarks = [f'\\BOOKMARK [1][-]{{section.{n}}}{{{title}}}{{}}% {n}'
+                     for n, title in enumerate(_SECTION_RE.findall(text), 1)]
+        (output_dir / f"{jobname}.out").write_text('\n'.join(bookmarks) + '\n', encoding='utf-8')
+
+
+def bibliography(tool: str, options: dict, inputs: List[str]) -> int:
+    """Stand-in for bibtex or biber: a .bbl holding the cited keys found in the databases"""
+    jobname = Path(inputs[-1]).stem if inputs else ''
+    if not jobname:
+        print(f"{tool}: need exactly one file argument.")
+        return 1
+    time.sleep(float(os.environ.get('STUB_LATEX_DELAY', '0.05')))
+    if tool == 'biber':
+        control = _read(Path(f"{jobname}.bcf"))
+        cited = re.findall(r'<bcf:citekey order="\d+">([^<]*)<', control)
+        databases = re.findall(r'<bcf:datasource type="file">([^<]*)<', control)
+        search = [Path('.')] + ([Path(options['input-directory'])] if options.get('input-directory') else [])
+    else:
+        aux = _read(Path(f"{jobname}.aux"))
+        cited = re.findall(r'^\\citation\{([^}]*)\}', aux, re.MULTILINE)
+        databases = [f"{name.strip()}.bib" for data in re.findall(r'^\\bibdata\{([^}]*)\}', aux, re.MULTILINE)
+                     for name in data.split(',')]
+        search = _search_dirs('BIBINPUTS')
+    known = set()
+    for database in databases:
+        found = next((directory / database for directory in search if (directory / database).exists()), None)
+        if found is None:
+            print(f"{tool}: I couldn't open database file {database}")
+            return 2
+        known.update(_BIB_ENTRY_RE.findall(found.read_text(encoding='utf-8')))
+    keys = [key for key in dict.fromkeys(cited) if key in known or key == '*']
+    if tool == 'biber':
+        bbl = ['\\refsection{0}'] + [f'  \\entry{{{key}}}{{misc}}{{}}' for key in keys] + ['\\endrefsection']
+    else:
+        bbl = [f'\\begin{{thebibliography}}{{{len(keys)}}}'] + [f'\\bibitem{{{key}}} {key}' for key in keys]
+        bbl.append('\\end{thebibliography}')
+    Path(f"{jobname}.bbl").write_text('\n'.join(bbl) + '\n', encoding='utf-8')
+    for key in dict.fromkeys(cited):
+        if key not in known:
+            print(f"Warning--I didn't find a database entry for \"{key}\"")
+    print(f"{tool}: wrote {jobname}.bbl with {len(keys)} entries")
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    options = {}
+    inputs = []
+    for arg in argv:
+        if arg.startswith('-'):
+            key, _, value = arg.lstrip('-').partition('=')
+            options[key] = value
+        elif not arg.startswith('&'):
+            inputs.append(arg)
+    for tool in ('bibtex', 'biber'):
+        if tool in options:
+            return bibliography(tool, options, inputs)
+    if not inputs:
+        print("! Emergency stop: no input file")
+        return 1
+
+    source = Path(inputs[-1])
+    jobname = options.get('jobname') or source.stem
+    output_dir = Path(options.get('output-directory') or '.')
+    log_lines = [f"This is stub pdflatex, input {source}"]
+
+    def finish(code: int, message: str) -> int:
+        log_lines.append(message)
+        (output_dir / f"{jobname}.log").write_text('\n'.join(log_lines) + '\n', encoding='utf-8')
+        print(message)
+        return code
+
+    time.sleep(float(os.environ.get('STUB_LATEX_DELAY', '0.05')))
+    try:
+        text = source.read_text(encoding='utf-8')
+    except OSError:
+        return finish(1, f"! I can't find file `{source}'.")
+
+    if 'ini' in options:
+        preamble, dump, _ = text.partition('\\dump')
+        if not dump:
+            return finish(1, "! Emergency stop: *** (job aborted, no \\dump in ini mode)")
+        (output_dir / f"{jobname}.fmt").write_text(preamble, encoding='utf-8')
+        return finish(0, f"Beginning to dump on file {jobname}.fmt")
+
+    if options.get('fmt'):
+        fmt_file = _find(f"{options['fmt']}.fmt", 'TEXFORMATS')
+        if fmt_file is None:
+            return finish(1, f"I can't find the format file `{options['fmt']}.fmt'!")
+        text = fmt_file.read_text(encoding='utf-8') + text
+        log_lines.append(f"format={options['fmt']}")
+    else:
+        time.sleep(float(os.environ.get('STUB_LATEX_PREAMBLE_DELAY', '0.2')))
+
+    document_class = re.search(r'\\documentclass(?:\[[^\]]*\])?\{([^}]+)\}', text)
+    if document_class is None:
+        return finish(1, "! LaTeX Error: Missing \\begin{document}.")
+    if _find(f"{document_class.group(1)}.cls", 'TEXINPUTS') is None:
+        return finish(1, f"! LaTeX Error: File `{document_class.group(1)}.cls' not found.")
+    if '\\begin{document}' not in text or '\\end{document}' not in text:
+        return finish(1, "! Emergency stop: *** (job aborted, no legal \\end found)")
+    if '\\stubfail' in text:
+        return finish(1, "! Undefined control sequence. \\stubfail")
+
+    # The typeset result depends on what the previous pass left behind, as in TeX
+    digest = hashlib.sha1('\0'.join([text, _read(output_dir / f"{jobname}.aux"),
+                                      _read(output_dir / f"{jobname}.bbl")]).encode('utf-8')).hexdigest()
+    write_auxiliary(text, output_dir, jobname)
+    (output_dir / f"{jobname}.pdf").write_bytes(
+        f"%PDF-1.4\n% stub output {digest}\n%%EOF\n".encode('ascii'))
+    return finish(0, f"Output written on {jobname}.pdf (1 page).")
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
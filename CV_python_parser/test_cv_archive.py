@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Archive tests - Bundles streamed from tar archives and rendered by cv_batch --archive
+
+    python -m unittest test_cv_archive
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+
+import cv_batch
+from cv_archive import SECTION_NAMES, open_archive
+from cv_parser_simple import SimpleCVParser
+from synthetic_bundle import PRESETS, generate_bundle, generate_files
+
+RESUME = {'basics': {'name': 'Bob Example'},
+          'work': [{'name': 'Acme', 'position': 'Engineer', 'startDate': '2020-01', 'highlights': ['Shipped']}]}
+
+
+class TarStreamTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory(prefix='cvtest-')
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        # alice: the section files, then a resume.json; bob: a resume.json alone
+        members = [(f"alice/{name}", content.encode('utf-8'))
+                   for name, content in generate_files(PRESETS['tiny']).items()]
+        members.append(('alice/resume.json', json.dumps(RESUME).encode('utf-8')))
+        members.append(('bob/resume.json', json.dumps(RESUME).encode('utf-8')))
+        self.archive = self.folder / 'bundles.tar.gz'
+        with tarfile.open(str(self.archive), 'w:gz') as tar:
+            for name, content in members:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+    def test_each_bundle_is_streamed_once(self):
+        sources = list(open_archive(self.archive).stream())
+        self.assertEqual([source.name for source in sources], ['alice', 'bob'])
+        self.assertEqual(set(sources[0].files), SECTION_NAMES)
+        self.assertEqual(set(sources[1].files), {'resume.json'})
+
+    def test_batch_renders_each_bundle_once(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = cv_batch.main(['--archive', str(self.archive), '--output-dir', str(self.folder / 'out'),
+                                  '--workers', '1', '--no-cache'])
+        self.assertEqual(code, 0, output.getvalue())
+        self.assertIn('Rendered 2/2', output.getvalue())
+        parser = SimpleCVParser(json_dir=str(generate_bundle(str(self.folder / 'alice'), PRESETS['tiny'])),
+                                use_cache=False)
+        parser.load_all_data()
+        alice = (self.folder / 'out' / 'alice.tex').read_text(encoding='utf-8')
+        self.assertEqual(alice, parser.build_complete_document())
+
+
+if __name__ == '__main__':
+    unittest.main()
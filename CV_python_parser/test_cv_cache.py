@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Cache tests - Permissions of the files written through temporary files and a rename
+
+    python -m unittest test_cv_cache
+"""
+
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+
+from cv_cache import stream_if_changed, write_atomic, write_if_changed
+from cv_pack import write_pack
+
+
+def mode(path: Path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+class OutputModeTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory(prefix='cvtest-')
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        umask = os.umask(0o022)
+        os.umask(umask)
+        self.new_file_mode = 0o666 & ~umask
+
+    def test_new_files_follow_the_umask(self):
+        write_atomic(self.folder / 'a.bin', b'payload')
+        write_if_changed(self.folder / 'b.bin', b'payload')
+        stream_if_changed(self.folder / 'cv.tex', iter(['\\documentclass{altacv}\n', 'body\n']))
+        write_pack(self.folder / 'cvs.pack', [('ada', [('profile', b'data')])])
+        for name in ('a.bin', 'b.bin', 'cv.tex', 'cvs.pack'):
+            self.assertEqual(mode(self.folder / name), self.new_file_mode, name)
+
+    def test_replaced_files_keep_their_mode(self):
+        target = self.folder / 'cv.tex'
+        for restricted in (0o640, 0o604):
+            target.write_text('old\n', encoding='utf-8')
+            target.chmod(restricted)
+            stream_if_changed(target, iter([f'new {restricted}\n']))
+            self.assertEqual(mode(target), restricted)
+            write_atomic(target, b'newer')
+            self.assertEqual(mode(target), restricted)
+
+
+if __name__ == '__main__':
+    unittest.main()
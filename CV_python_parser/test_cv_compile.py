@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Compile stage tests - LatexCompiler passes, limits and bibliography runs against stub_pdflatex.py
+
+    python -m unittest test_cv_compile
+"""
+
+import os
+import shlex
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from cv_compile import LatexCompiler, job_for
+from cv_trace import logger
+
+STUB = Path(__file__).resolve().parent / 'stub_pdflatex.py'
+STUB_COMMAND = f"{shlex.quote(sys.executable)} {shlex.quote(str(STUB))}"
+
+DOCUMENT = r"""\documentclass{minimal}
+\begin{document}
+%s
+\end{document}
+"""
+BIB = """@misc{knuth84, title = {The TeXbook}}
+@misc{lamport94, title = {LaTeX}}
+"""
+
+
+class CompileTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory(prefix='cvtest-')
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        (self.folder / 'minimal.cls').write_text('', encoding='utf-8')
+        (self.folder / 'refs.bib').write_text(BIB, encoding='utf-8')
+        environment = mock.patch.dict(os.environ, STUB_LATEX_DELAY='0', STUB_LATEX_PREAMBLE_DELAY='0')
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def compiler(self, **options) -> LatexCompiler:
+        options.setdefault('use_format', False)
+        return LatexCompiler(STUB_COMMAND, cache_dir=str(self.folder / 'cache'),
+                             bibtex=f"{STUB_COMMAND} --bibtex", biber=f"{STUB_COMMAND} --biber", **options)
+
+    def compile(self, body: str, compiler: LatexCompiler = None):
+        tex_file = self.folder / 'cv.tex'
+        tex_file.write_text(DOCUMENT % body, encoding='utf-8')
+        return (compiler or self.compiler()).compile(job_for(tex_file))
+
+    def tools(self, result):
+        return [timing.tool for timing in result.passes]
+
+    def test_two_passes_from_scratch(self):
+        result = self.compile(r'Text with a \label{intro}.')
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(self.tools(result), ['latex', 'latex'])
+        self.assertTrue(Path(result.pdf_file).exists())
+
+    def test_rebuild_reuses_auxiliary_files(self):
+        compiler = self.compiler()
+        self.compile('Text.', compiler)
+        result = self.compile('Text, edited.', compiler)
+        self.assertTrue(result.reused_aux)
+        self.assertEqual(result.latex_passes, 1)
+
+    def test_dumped_format(self):
+        result = self.compile('Text.', self.compiler(use_format=True))
+        self.assertTrue(result.ok, result.error)
+        self.assertTrue(result.used_format)
+
+    def test_max_passes_cutoff(self):
+        with self.assertLogs(logger, 'WARNING') as logs:
+            result = self.compile('Text.', self.compiler(max_passes=1))
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(result.latex_passes, 1)
+        self.assertIn('still changing after 1 passes', logs.output[0])
+
+    def test_timeout(self):
+        with mock.patch.dict(os.environ, STUB_LATEX_DELAY='5'):
+            result = self.compile('Text.', self.compiler(timeout=0.5))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error, 'timed out after 0.5s')
+
+    def test_error_reported(self):
+        result = self.compile(r'\stubfail')
+        self.assertFalse(result.ok)
+        self.assertIn('Undefined control sequence', result.error)
+
+    def test_no_bibliography_tool_without_citations(self):
+        result = self.compile(r'\bibliographystyle{plain}\bibliography{refs}')
+        self.assertNotIn('bibtex', self.tools(result))
+
+    def test_bibtex_after_citations(self):
+        result = self.compile(r'\cite{knuth84}\bibliographystyle{plain}\bibliography{refs}')
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(self.tools(result), ['latex', 'bibtex', 'latex', 'latex'])
+        bbl = next((self.folder / 'cache').rglob('aux.bbl'))
+        self.assertIn(r'\bibitem{knuth84}', bbl.read_text(encoding='utf-8'))
+
+    def test_bibtex_rerun_only_when_citations_change(self):
+        compiler = self.compiler()
+        self.compile(r'\cite{knuth84}\bibliography{refs}', compiler)
+        unchanged = self.compile(r'Edited. \cite{knuth84}\bibliography{refs}', compiler)
+        self.assertEqual(self.tools(unchanged), ['latex'])
+        cited = self.compile(r'Edited. \cite{knuth84,lamport94}\bibliography{refs}', compiler)
+        self.assertIn('bibtex', self.tools(cited))
+
+    def test_biber_for_biblatex(self):
+        result = self.compile(r'\addbibresource{refs.bib}\cite{lamport94}\printbibliography')
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(self.tools(result), ['latex', 'biber', 'latex', 'latex'])
+
+    def test_bibliography_tool_failure(self):
+        result = self.compile(r'\cite{knuth84}\bibliography{missing}')
+        self.assertFalse(result.ok)
+        self.assertTrue(result.error.startswith('bibtex exit code 2'), result.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
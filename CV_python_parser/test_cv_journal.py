@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Batch journal tests - Journal round trips, torn lines and resumed sharded batch runs
+
+    python -m unittest test_cv_journal
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+
+import cv_batch
+from cv_journal import Journal, JournalEntry, merge_journals, parse_shard, read_journal, shard_of
+from synthetic_bundle import PRESETS, generate_bundle
+
+NAMES = ['ada', 'grace', 'linus', 'margaret', 'ken']
+
+
+def entry(name: str, ok: bool = True) -> JournalEntry:
+    return JournalEntry(name, f"/out/{name}.tex", f"hash-{name}", ok, 0.25, '' if ok else 'boom')
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory(prefix='cvtest-')
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        self.path = self.folder / 'journal.jsonl'
+
+    def write(self, entries, shard=(0, 1)):
+        journal = Journal(self.path, shard)
+        journal.start(item.name for item in entries)
+        journal.record(entries)
+        journal.close()
+
+    def tear_last_line(self):
+        content = self.path.read_bytes()
+        self.path.write_bytes(content[:-len(content.splitlines()[-1]) // 2 - 1])
+
+    def test_round_trip(self):
+        self.write([entry('ada'), entry('grace', ok=False)])
+        done = Journal(self.path).done
+        self.assertEqual(done, {'ada': entry('ada'), 'grace': entry('grace', ok=False)})
+
+    def test_truncated_last_line_is_skipped(self):
+        self.write([entry('ada'), entry('grace')])
+        self.tear_last_line()
+        self.assertEqual(list(Journal(self.path).done), ['ada'])
+
+    def test_append_after_truncated_line(self):
+        self.write([entry('ada'), entry('grace')])
+        self.tear_last_line()
+        journal = Journal(self.path)
+        journal.record([entry('grace')])
+        journal.close()
+        self.assertEqual(list(Journal(self.path).done), ['ada', 'grace'])
+        self.assertEqual([record['event'] for record in read_journal(self.path)], ['start', 'item', 'item'])
+
+    def test_merge_reports_unfinished_items_and_shards(self):
+        self.write([entry('ada'), entry('grace', ok=False)], shard=(0, 2))
+        summary = merge_journals([self.path])
+        self.assertEqual((summary.total, summary.succeeded, summary.failed), (2, 1, 1))
+        self.assertEqual(summary.missing_shards, ['1/2'])
+        partial = self.folder / 'partial.jsonl'
+        journal = Journal(partial, (1, 2))
+        journal.start(['linus', 'ken'])
+        journal.record([entry('linus')])
+        journal.close()
+        summary = merge_journals([self.path, partial])
+        self.assertEqual((summary.missing, summary.missing_shards), (['ken'], []))
+
+    def test_shards(self):
+        self.assertEqual(parse_shard('1/4'), (1, 4))
+        for text in ('4/4', '-1/2', '1', 'a/b', '0/0'):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+        owners = [shard_of(name, 3) for name in NAMES]
+        self.assertEqual(owners, [shard_of(name, 3) for name in NAMES])
+        self.assertTrue(all(0 <= owner < 3 for owner in owners))
+
+
+class ResumedBatchTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory(prefix='cvtest-')
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        for seed, name in enumerate(NAMES):
+            generate_bundle(str(self.folder / 'bundles' / name), PRESETS['tiny'], seed)
+        self.journal = self.folder / 'journal.jsonl'
+
+    def run_batch(self, *options) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = cv_batch.main(['--bundles', str(self.folder / 'bundles'), '--output-dir',
+                                  str(self.folder / 'out'), '--workers', '1', '--no-cache',
+                                  '--journal', str(self.journal)] + list(options))
+        self.assertEqual(code, 0, output.getvalue())
+        return output.getvalue()
+
+    def rendered(self):
+        """Names of the items the last run of the journal rendered"""
+        records = list(read_journal(self.journal))
+        last_start = max(i for i, record in enumerate(records) if record.get('event') == 'start')
+        return sorted(record['name'] for record in records[last_start:] if record.get('event') == 'item')
+
+    def test_resume_skips_done_items(self):
+        self.run_batch()
+        self.assertEqual(self.rendered(), sorted(NAMES))
+        self.assertIn('Skipped 5 items already done', self.run_batch())
+        self.assertEqual(self.rendered(), [])
+
+    def test_resume_after_partial_run(self):
+        self.run_batch()
+        # A crash mid-run: the last two items and the end-of-run record never made it to disk
+        lines = self.journal.read_text(encoding='utf-8').splitlines(keepends=True)
+        lost = [json.loads(line)['name'] for line in lines[-3:-1]]
+        self.journal.write_text(''.join(lines[:-3]) + lines[-3][:20], encoding='utf-8')
+        self.assertIn('Skipped 3 items already done', self.run_batch())
+        self.assertEqual(self.rendered(), sorted(lost))
+
+    def test_changed_and_removed_outputs_are_rendered_again(self):
+        self.run_batch()
+        (self.folder / 'bundles' / 'ada' / 'profile.json').write_text(
+            'profile = {"name": "Ada Lovelace", "tagline": "Analyst"}\n', encoding='utf-8')
+        (self.folder / 'out' / 'ken.tex').unlink()
+        self.run_batch()
+        self.assertEqual(self.rendered(), ['ada', 'ken'])
+
+    def test_shards_split_the_items(self):
+        for index in range(3):
+            self.run_batch('--shard', f"{index}/3")
+        summary = merge_journals([self.journal])
+        self.assertEqual((summary.total, summary.failed, summary.missing, summary.reassigned),
+                         (len(NAMES), 0, [], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
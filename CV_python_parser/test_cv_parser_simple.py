@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Parser tests - Sections streamed or cached, and the document they add up to
+
+    python -m unittest test_cv_parser_simple
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+
+from cv_parser_simple import SimpleCVParser
+from synthetic_bundle import PRESETS, generate_bundle
+
+
+class SectionStreamingTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory(prefix='cvtest-')
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        self.json_dir = str(generate_bundle(str(self.folder / 'bundle'), PRESETS['small']))
+
+    def parser(self, fragment_cache: bool) -> SimpleCVParser:
+        parser = SimpleCVParser(json_dir=self.json_dir, cache_dir=str(self.folder / 'cache'),
+                                fragment_cache=fragment_cache)
+        parser.load_all_data()
+        return parser
+
+    def test_sections_stream_without_the_fragment_cache(self):
+        chunks = list(self.parser(fragment_cache=False).iter_section('experience'))
+        self.assertGreater(len(chunks), PRESETS['small'].experiences)
+        self.assertFalse(list((self.folder / 'cache').glob('*.fragment')))
+
+    def test_cached_sections_are_one_string(self):
+        chunks = list(self.parser(fragment_cache=True).iter_section('experience'))
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(list((self.folder / 'cache').glob('*.fragment')))
+
+    def test_same_document_either_way(self):
+        self.assertEqual(self.parser(fragment_cache=False).build_complete_document(),
+                         self.parser(fragment_cache=True).build_complete_document())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Layout plan tests - The default plan against the document the parser rendered before plans
+
+    python -m unittest test_cv_plan
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+
+from cv_parser_simple import SimpleCVParser
+from cv_plan import DEFAULT_LAYOUT, LayoutError, compile_layout, validate_layout
+from synthetic_bundle import PRESETS, generate_bundle
+
+# The tiny synthetic bundle as rendered by the fixed two-page skeleton layouts replaced
+BASELINE = Path(__file__).resolve().parent / 'testdata' / 'default_layout.tex'
+
+
+class DefaultPlanTest(unittest.TestCase):
+    def test_default_plan_reproduces_baseline(self):
+        with tempfile.TemporaryDirectory() as folder:
+            generate_bundle(folder, PRESETS['tiny'])
+            parser = SimpleCVParser(json_dir=folder, use_cache=False)
+            parser.load_all_data()
+            self.assertEqual(parser.build_complete_document(), BASELINE.read_text(encoding='utf-8'))
+
+    def test_user_titles_are_centred(self):
+        layout = {'name': 'one', 'pages': [{'title': 'EXPERIENCE', 'columns': [['experience']]}]}
+        (banner, _), = validate_layout(layout)[2]
+        self.assertEqual(banner, '%' + ' ' * 35 + 'EXPERIENCE')
+
+    def test_banner_must_be_one_comment_line(self):
+        for banner in ('SIDE PROJECTS', '%\n\\input{x}', '%\r'):
+            page = dict(DEFAULT_LAYOUT['pages'][1], banner=banner)
+            with self.assertRaises(LayoutError):
+                compile_layout(dict(DEFAULT_LAYOUT, pages=[page]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Render service tests - Loaded parsers kept per worker process
+
+    python -m unittest test_cv_service
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+
+import cv_service
+from cv_parser_simple import set_quiet
+from cv_template import TemplateParams
+from synthetic_bundle import PRESETS, generate_bundle
+
+
+class WorkerParsersTest(unittest.TestCase):
+    def setUp(self):
+        set_quiet()
+        folder = tempfile.TemporaryDirectory(prefix='cvtest-')
+        self.addCleanup(folder.cleanup)
+        self.folder = Path(folder.name)
+        self.bundles = [str(generate_bundle(str(self.folder / name), PRESETS['tiny'], seed))
+                        for seed, name in enumerate(('alice', 'bob', 'carol'))]
+        cv_service._worker_parsers.clear()
+        self.addCleanup(cv_service._worker_parsers.clear)
+
+    def render(self, json_dir: str) -> str:
+        return cv_service.render_in_worker(json_dir, TemplateParams(), cache_dir=str(self.folder / 'cache'),
+                                           max_parsers=2)
+
+    def test_least_recently_used_parser_is_dropped(self):
+        alice, bob, carol = self.bundles
+        self.render(alice)
+        self.render(bob)
+        self.render(alice)
+        self.render(carol)
+        self.assertEqual(list(cv_service._worker_parsers), [alice, carol])
+
+    def test_dropped_bundle_renders_the_same(self):
+        alice, bob, carol = self.bundles
+        first = self.render(alice)
+        self.render(bob)
+        self.render(carol)
+        self.assertNotIn(alice, cv_service._worker_parsers)
+        self.assertEqual(self.render(alice), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
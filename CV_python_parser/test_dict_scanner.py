@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Dictionary scanner tests - Syntax errors on truncated and malformed files
+
+    python -m unittest test_dict_scanner
+"""
+
+import unittest
+
+from dict_scanner import DictScanError, parse_dict_assignment
+
+
+class ScanErrorTest(unittest.TestCase):
+    def reason(self, text: str) -> str:
+        with self.assertRaises(DictScanError) as caught:
+            parse_dict_assignment(text)
+        return caught.exception.reason
+
+    def test_truncated_file_reports_end_of_file(self):
+        self.assertEqual(self.reason('profile = {"name": "Ada"'),
+                         "Expected ',' or '}' but found end of file")
+        self.assertEqual(self.reason('profile = {"name"'), "Expected ':' but found end of file")
+        self.assertEqual(self.reason('profile = {"name":'), "Unexpected end of file")
+
+    def test_unexpected_token_is_quoted(self):
+        self.assertEqual(self.reason('profile = {"name"; "Ada"}'), "Expected ':' but found ';'")
+        self.assertEqual(self.reason('profile = {"years": [2019 2020]}'),
+                         "Expected ',' or ']' but found '2020'")
+
+    def test_error_position(self):
+        with self.assertRaises(DictScanError) as caught:
+            parse_dict_assignment('profile = {\n    "name": "Ada"\n')
+        self.assertEqual((caught.exception.line, caught.exception.column), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
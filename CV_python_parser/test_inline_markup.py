@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Inline markup tests - LaTeX and HTML rendering of highlights, strings or not
+
+    python -m unittest test_inline_markup
+"""
+
+import unittest
+
+from inline_markup import render_inline, render_inline_html
+
+
+class RenderInlineTest(unittest.TestCase):
+    def test_markup(self):
+        self.assertEqual(render_inline('**50 %** faster with `C++`'), r'\textbf{50 \%} faster with \texttt{C++}')
+        self.assertEqual(render_inline_html('*fast* & [docs](https://x.org)'),
+                         '<em>fast</em> &amp; <a href="https://x.org">docs</a>')
+
+    def test_non_strings_are_converted_with_str(self):
+        for value in (['a', 'b'], {'text': 'a'}, 3):
+            self.assertEqual(render_inline(value), str(value))
+            self.assertEqual(render_inline_html(value), str(value))
+        self.assertEqual(render_inline_html(['<b>']), "['&lt;b&gt;']")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Escaping tests - escape_latex on strings and on the non-string values a source file may hold
+
+    python -m unittest test_latex_escape
+"""
+
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'benchmarks'))
+
+from cv_parser_simple import SimpleCVParser
+from latex_escape import escape_latex
+from synthetic_bundle import PRESETS, generate_bundle
+
+
+class EscapeLatexTest(unittest.TestCase):
+    def test_strings(self):
+        self.assertEqual(escape_latex('R&D at 50% — C#'), r'R\&D at 50\% --- C\#')
+        self.assertEqual(escape_latex(r'\textbf{A_B}'), r'\textbf{A\_B}')
+
+    def test_non_strings_are_converted_with_str(self):
+        for value in (['Paris', 'Remote'], {'city': 'Paris'}, 2023, None):
+            self.assertEqual(escape_latex(value), str(value))
+
+    def test_list_valued_fields_fit_and_render(self):
+        with tempfile.TemporaryDirectory(prefix='cvtest-') as folder:
+            experience = generate_bundle(folder, PRESETS['tiny']) / 'Professional_experience.json'
+            source = experience.read_text(encoding='utf-8')
+            source = re.sub(r'"location":\s*"[^"]*"', '"location": ["Paris", "Remote"]', source, count=1)
+            source = re.sub(r'"dates":\s*"[^"]*"', '"dates": ["2020", "2023"]', source, count=1)
+            source = re.sub(r'"company":\s*"[^"]*"', '"company": ["Acme", "Beta"]', source, count=1)
+            experience.write_text(source, encoding='utf-8')
+            parser = SimpleCVParser(json_dir=folder, use_cache=False)
+            parser.load_all_data()
+            parser.fit_to_pages(2)
+            document = parser.build_complete_document()
+        self.assertIn("{['Acme', 'Beta']}{['2020', '2023']}{['Paris', 'Remote']}", document)
+
+
+if __name__ == '__main__':
+    unittest.main()